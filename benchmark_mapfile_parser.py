@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""Misst Durchsatz und Speicherbedarf des Parsers auf synthetischen Map-Files.
+
+Jede Stufe läuft in einem eigenen Prozess, damit der maximale Speicherbedarf (peak RSS) je Stufe gemessen werden
+kann. Die Ergebnisse werden als JSON gespeichert und lassen sich mit --compare gegen einen früheren Lauf
+vergleichen.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+
+from mapfile_parser import MapfileParser
+from mapfile_generator import MapfileGenerator, parse_size
+
+try:
+    import resource
+except ImportError:
+    # Unter Windows steht der peak RSS nicht zur Verfügung
+    resource = None
+
+STAGES = [
+    "extract_memory_map",
+    "split_sections",
+    "generator_sections",
+    "generator_sections_from_lines",
+    "parse",
+    "get_class_info",
+    "cli_sections",
+    "cli_details",
+]
+
+
+def peak_rss():
+    """Maximaler Speicherbedarf des aktuellen Prozesses in Bytes oder None."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux gibt Kilobytes zurück, macOS Bytes
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def run_stage(stage, mapfile):
+    """Führt eine einzelne Stufe aus und gibt die Laufzeit in Sekunden zurück. Die Vorbereitung der Stufe wird
+    nicht mitgemessen."""
+    if stage in ("extract_memory_map", "split_sections", "generator_sections", "generator_sections_from_lines"):
+        with open(mapfile, "r") as fp:
+            content = fp.read()
+
+        start = time.perf_counter()
+        _, memory_map, _ = MapfileParser.extract_memory_map(None, content)
+        if stage == "extract_memory_map":
+            return time.perf_counter() - start
+
+        if stage == "generator_sections_from_lines":
+            # Der Tokenizer ersetzt split_sections und generator_sections in einem Durchlauf
+            start = time.perf_counter()
+            for _ in MapfileParser.generator_sections_from_lines(memory_map):
+                pass
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        sections = MapfileParser.split_sections(memory_map)
+        if stage == "split_sections":
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in MapfileParser.generator_sections(sections):
+            pass
+        return time.perf_counter() - start
+
+    if stage in ("parse", "get_class_info"):
+        mapfile_parser = MapfileParser.from_path(mapfile)
+        start = time.perf_counter()
+        mapfile_parser.parse()
+        if stage == "parse":
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        mapfile_parser.get_class_info()
+        return time.perf_counter() - start
+
+    if stage in ("cli_sections", "cli_details"):
+        import mapfile_parser_cli
+
+        mode = stage[len("cli_"):]
+        start = time.perf_counter()
+        mapfile_parser_cli.main([mode, mapfile, "--no-cache", "-o", os.devnull])
+        return time.perf_counter() - start
+
+    raise ValueError("Unknown stage %s" % stage)
+
+
+def measure_stage(stage, mapfile, workdir):
+    """Startet eine Stufe in einem neuen Prozess und gibt dessen Messwerte zurück."""
+    output = subprocess.check_output(
+        [sys.executable, os.path.abspath(__file__), "--run-stage", stage, mapfile],
+        cwd=workdir,
+    )
+    return json.loads(output.decode().splitlines()[-1])
+
+
+def count_placements(mapfile):
+    mapfile_parser = MapfileParser.from_path(mapfile)
+    return sum(len(i[3]) for i in mapfile_parser.iter_sections())
+
+
+def benchmark(mapfile, stages, workdir):
+    size = os.path.getsize(mapfile)
+    placements = count_placements(mapfile)
+
+    results = {}
+    for stage in stages:
+        measurement = measure_stage(stage, mapfile, workdir)
+        seconds = measurement["seconds"]
+        results[stage] = {
+            "seconds": seconds,
+            "mb_per_s": size / seconds / 1e6 if seconds else None,
+            "placements_per_s": placements / seconds if seconds else None,
+            "peak_rss": measurement["peak_rss"],
+        }
+        print("%-29s %8.3f s %8.1f MB/s %10.0f placements/s  peak RSS %s MB" % (
+            stage, seconds, results[stage]["mb_per_s"], results[stage]["placements_per_s"],
+            "-" if measurement["peak_rss"] is None else "%.1f" % (measurement["peak_rss"] / 1e6)))
+
+    return {"mapfile": {"bytes": size, "placements": placements}, "stages": results}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(result, baseline):
+    """Gibt das Verhältnis der Laufzeiten zu einem früheren Lauf aus."""
+    for stage, values in result["stages"].items():
+        previous = baseline["stages"].get(stage)
+        if previous is None or not values["seconds"]:
+            continue
+        print("%-29s %6.2fx (%.3f s -> %.3f s)" % (
+            stage, previous["seconds"] / values["seconds"], previous["seconds"], values["seconds"]))
+
+
+def main(arguments):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', help="Size of the generated map file, e.g. 1M, 100M, 1G",
+                        default="10M", type=parse_size)
+    parser.add_argument('--seed', help="Seed of the map file generator", default=0, type=int)
+    parser.add_argument('--mapfile', help="Use an existing map file instead of generating one", type=str)
+    parser.add_argument('--stage', help="Only run the given stage (repeatable)", action='append', choices=STAGES)
+    parser.add_argument('-o', '--output', help="Write the results as JSON to this file", type=str)
+    parser.add_argument('--compare', help="JSON results of an earlier run to compare with", type=str)
+    parser.add_argument('--run-stage', help=argparse.SUPPRESS, nargs=2, metavar=("STAGE", "MAPFILE"))
+    args = parser.parse_args(arguments)
+
+    if args.run_stage:
+        # Wird von measure_stage in einem eigenen Prozess aufgerufen
+        seconds = run_stage(*args.run_stage)
+        print(json.dumps({"seconds": seconds, "peak_rss": peak_rss()}))
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        mapfile = args.mapfile
+        if mapfile is None:
+            mapfile = os.path.join(workdir, "benchmark.map")
+            with open(mapfile, "w") as fp:
+                MapfileGenerator(size=args.size, seed=args.seed).write(fp)
+
+        result = benchmark(os.path.abspath(mapfile), args.stage or STAGES, workdir)
+
+    result["revision"] = git_revision()
+    result["python"] = platform.python_version()
+    result["seed"] = args.seed
+
+    if args.output:
+        with open(args.output, "w") as fp:
+            json.dump(result, fp, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r") as fp:
+            compare(result, json.load(fp))
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
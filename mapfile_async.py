@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""Zerlegen von Map-Files in einem asyncio Event Loop.
+
+Das Lesen der Datei und das Ablegen der Einträge laufen in Threads, das Zerlegen der Sektionen in einem
+konfigurierbaren Executor (z.B. concurrent.futures.ProcessPoolExecutor). Der Event Loop wird dadurch auch bei großen
+Map-Files nicht blockiert.
+
+Beispiel:
+
+    async_parser = AsyncMapfileParser(executor)
+    async for event in async_parser.iter_file("app.map"):
+        if isinstance(event, SectionHeader):
+            ...
+"""
+import io
+import asyncio
+import collections
+import concurrent.futures
+
+from mapfile_parser import STDIN, MapfileParser
+
+# Kopfzeile einer Sektion. Alle Kopfzeilen werden vor den Einträgen geliefert.
+SectionHeader = collections.namedtuple("SectionHeader", ["name", "address", "size"])
+
+# Die zerlegten Einträge einer Sektion als PlacementTable
+SectionPlacements = collections.namedtuple("SectionPlacements", ["name", "placements"])
+
+
+def _tokenize_chunk(chunk):
+    """Zerlegt den Text der Einträge einer Sektion im Executor. Bei Dateien ist chunk vom Typ bytes und wird wie in
+    MapfileParser._chunk_lines dekodiert."""
+    if isinstance(chunk, bytes):
+        chunk = io.TextIOWrapper(io.BytesIO(chunk)).read()
+    return list(MapfileParser.generator_tokenize(chunk, in_section=True))
+
+
+class AsyncMapfileParser:
+    """Liest Map-Files ohne den Event Loop zu blockieren.
+
+    executor zerlegt die Sektionen, ohne Angabe wird der Standard Executor des Event Loops verwendet. Es werden
+    höchstens window Sektionen gleichzeitig zerlegt, so dass nicht das ganze Map-File im Speicher landet.
+    parse_filter und split_archives entsprechen den Argumenten von MapfileParser.parse.
+    """
+
+    def __init__(self, executor=None, window=4, parse_filter=None, split_archives=False):
+        self._executor = executor
+        self._window = window
+        self._filter = parse_filter
+        self._split_archives = split_archives
+
+    async def parse_file(self, path):
+        """Liest das Map-File path vollständig ein und gibt den MapfileParser zurück."""
+        mapfile_parser = MapfileParser.from_path(path)
+        async for _ in self.iter_file(path, mapfile_parser):
+            pass
+        return mapfile_parser
+
+    async def iter_file(self, path, mapfile_parser=None):
+        """Ein asynchroner Generator der zuerst für jede Sektion einen SectionHeader und danach für jede Sektion in
+        der Reihenfolge des Map-Files ein SectionPlacements liefert.
+
+        Die Sektionen werden in mapfile_parser abgelegt, falls angegeben. Wird der Generator geschlossen oder die
+        Task abgebrochen, werden noch nicht begonnene Sektionen im Executor abgebrochen und die Datei geschlossen.
+        Die Standardeingabe wird nicht unterstützt, da die Kopfzeilen vor den Einträgen gesucht werden.
+        """
+        if path == STDIN:
+            raise ValueError("stdin can not be parsed asynchronously")
+        if mapfile_parser is None:
+            mapfile_parser = MapfileParser.from_path(path)
+
+        # Nur die Kopfzeilen, die Einträge werden danach Sektion für Sektion zerlegt
+        await asyncio.to_thread(mapfile_parser.parse, lazy=True, parse_filter=self._filter,
+                                split_archives=self._split_archives)
+        for name, address, size in mapfile_parser.get_section_list():
+            yield SectionHeader(name, address, size)
+
+        loop = asyncio.get_running_loop()
+        chunks = mapfile_parser.iter_unparsed_chunks()
+        # Die Datei wird nur von diesem Thread gelesen und geschlossen, auch wenn ein Lesevorgang beim Abbruch noch
+        # läuft
+        reader = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        pending = collections.deque()
+        try:
+            while True:
+                item = await loop.run_in_executor(reader, next, chunks, None)
+                if item is not None:
+                    name, chunk = item
+                    pending.append((name, loop.run_in_executor(self._executor, _tokenize_chunk, chunk)))
+                    if len(pending) < self._window:
+                        continue
+                if not pending:
+                    break
+
+                name, future = pending.popleft()
+                tokens = await future
+                table = await asyncio.to_thread(mapfile_parser.load_section_tokens, name, tokens)
+                yield SectionPlacements(name, table)
+        finally:
+            for _, future in pending:
+                future.cancel()
+            reader.submit(chunks.close)
+            reader.shutdown(wait=False)
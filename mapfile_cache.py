@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+import os
+import pickle
+import hashlib
+import logging
+import tempfile
+
+from mapfile_parser import PARSER_VERSION
+
+
+class MapfileCache:
+    """Ein Cache auf der Festplatte für bereits zerlegte Map-Files.
+
+    Der Schlüssel eines Eintrags setzt sich aus dem Hash des Inhalts des Map-Files und der Version des Parsers
+    zusammen. Die Einträge werden im Binärformat von pickle abgelegt, davor steht eine Prüfsumme über die Daten.
+    Überschreitet der Cache die Größe max_size werden die am längsten nicht verwendeten Einträge gelöscht.
+    """
+
+    SUFFIX = ".mapcache"
+
+    # Version des Dateiformats (Prüfsumme und Daten), wird zusätzlich zu PARSER_VERSION im Dateinamen geführt
+    FORMAT_VERSION = 2
+
+    # Länge der Prüfsumme (blake2b) am Anfang jeder Datei
+    DIGEST_SIZE = 16
+
+    def __init__(self, cache_dir=None, max_size=512 << 20):
+        self._cache_dir = cache_dir if cache_dir is not None else self.default_dir()
+        self._max_size = max_size
+
+    @staticmethod
+    def default_dir():
+        """Gibt das Standardverzeichnis des Caches zurück (XDG_CACHE_HOME/mapfile_parser)."""
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        return os.path.join(base, "mapfile_parser")
+
+    def _filename(self, key):
+        filename = "v%i.%i-%s%s" % (PARSER_VERSION, self.FORMAT_VERSION, key, self.SUFFIX)
+        return os.path.join(self._cache_dir, filename)
+
+    def load(self, key):
+        """Gibt den gespeicherten Eintrag zum Schlüssel key zurück oder None falls keiner existiert.
+
+        Beschädigte Einträge (falsche Prüfsumme oder Fehler beim Entpacken) werden gelöscht und wie ein fehlender
+        Eintrag behandelt. Den Aufbau des Eintrags prüft der Aufrufer, siehe discard.
+        """
+        filename = self._filename(key)
+        try:
+            with open(filename, "rb") as fp:
+                data = fp.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logging.warning("Ignoring unreadable cache entry %s: %s", filename, e)
+            return None
+
+        digest, payload = data[: self.DIGEST_SIZE], data[self.DIGEST_SIZE :]
+        try:
+            if hashlib.blake2b(payload, digest_size=self.DIGEST_SIZE).digest() != digest:
+                raise ValueError("checksum mismatch")
+            value = pickle.loads(payload)
+        except Exception as e:
+            # Neben UnpicklingError sind bei beschädigten Daten auch z.B. AttributeError oder ImportError möglich
+            logging.warning("Discarding broken cache entry %s: %s", filename, e)
+            self.discard(key)
+            return None
+
+        # Die Änderungszeit dient als Zeitpunkt des letzten Zugriffs für die LRU Verdrängung
+        try:
+            os.utime(filename)
+        except OSError:
+            pass
+
+        logging.info("Loaded parse result from cache %s", filename)
+        return value
+
+    def store(self, key, value):
+        """Speichert den Eintrag value unter dem Schlüssel key und verdrängt bei Bedarf alte Einträge."""
+        os.makedirs(self._cache_dir, exist_ok=True)
+
+        # Erst in eine temporäre Datei schreiben damit parallele Aufrufe nie einen halben Eintrag lesen
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        fd, tmp_filename = tempfile.mkstemp(dir=self._cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                fp.write(hashlib.blake2b(payload, digest_size=self.DIGEST_SIZE).digest())
+                fp.write(payload)
+            os.replace(tmp_filename, self._filename(key))
+        except BaseException:
+            os.unlink(tmp_filename)
+            raise
+
+        self.evict(keep=self._filename(key))
+
+    def discard(self, key):
+        """Löscht den Eintrag zum Schlüssel key, z.B. wenn sein Inhalt nicht den erwarteten Aufbau hat."""
+        try:
+            os.unlink(self._filename(key))
+        except FileNotFoundError:
+            pass
+
+    def evict(self, keep=None):
+        """Löscht die am längsten nicht verwendeten Einträge bis der Cache kleiner als max_size ist. Der Eintrag
+        mit dem Dateinamen keep wird nie gelöscht."""
+        entries = []
+        with os.scandir(self._cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(self.SUFFIX) and entry.path != keep:
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total_size = sum(i[1] for i in entries)
+        if keep is not None and os.path.exists(keep):
+            total_size += os.path.getsize(keep)
+
+        for _, size, path in sorted(entries):
+            if total_size <= self._max_size:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+            logging.info("Evicted cache entry %s", path)
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+import collections
+
+# Größenänderung eines Schlüssels zwischen zwei Map-Files
+Delta = collections.namedtuple("Delta", ["key", "old_size", "new_size", "delta"])
+
+
+class MapfileDiff:
+    """Vergleicht zwei bereits zerlegte Map-Files (MapfileParser nach parse).
+
+    Die Einträge werden über den Schlüssel (Sektion, Objektdatei, Name) mit Hilfe von Dictionaries einander
+    zugeordnet. Der Aufwand wächst damit linear mit der Anzahl der Einträge. Alle Ergebnisse sind absteigend nach
+    dem Betrag der Änderung sortiert.
+    """
+
+    def __init__(self, old, new):
+        self._old = old
+        self._new = new
+        self._old_symbols = None
+        self._new_symbols = None
+
+    @staticmethod
+    def symbol_sizes(mapfile_parser):
+        """Gibt ein Dictionary (Sektion, Objektdatei, Name) -> Größe zurück. Mehrfach vorkommende Schlüssel werden
+        aufsummiert."""
+        result = {}
+        for section, table in mapfile_parser.iter_placement_tables():
+            # Zuerst über die Indizes der StringTable zusammenfassen, erst danach in Strings wandeln
+            sizes = collections.defaultdict(int)
+            for objfile, name, size in zip(table.objfiles, table.names, table.sizes):
+                sizes[objfile, name] += size
+
+            strings = table.strings.strings
+            for (objfile, name), size in sizes.items():
+                key = (section, strings[objfile], strings[name])
+                result[key] = result.get(key, 0) + size
+        return result
+
+    @staticmethod
+    def compare(old, new, include_unchanged=False):
+        """Vergleicht zwei Dictionaries Schlüssel -> Größe und gibt die Liste der Deltas sortiert zurück."""
+        result = []
+        for key, old_size in old.items():
+            new_size = new.get(key, 0)
+            if include_unchanged or new_size != old_size:
+                result.append(Delta(key, old_size, new_size, new_size - old_size))
+
+        for key, new_size in new.items():
+            if key not in old:
+                result.append(Delta(key, 0, new_size, new_size))
+
+        result.sort(key=lambda i: abs(i.delta), reverse=True)
+        return result
+
+    @staticmethod
+    def group(symbol_sizes, key_function):
+        """Fasst das Ergebnis von symbol_sizes über key_function zusammen."""
+        result = collections.defaultdict(int)
+        for key, size in symbol_sizes.items():
+            result[key_function(key)] += size
+        return result
+
+    def _symbols(self):
+        if self._old_symbols is None:
+            self._old_symbols = self.symbol_sizes(self._old)
+            self._new_symbols = self.symbol_sizes(self._new)
+        return self._old_symbols, self._new_symbols
+
+    def sections(self, include_unchanged=False):
+        """Änderung der Größe jeder Sektion laut Kopfzeile. Der Schlüssel ist der Name der Sektion."""
+        old = {i[0]: i[2] for i in self._old.get_section_list()}
+        new = {i[0]: i[2] for i in self._new.get_section_list()}
+        return self.compare(old, new, include_unchanged)
+
+    def objfiles(self, include_unchanged=False):
+        """Änderung der Größe jeder Objektdatei über alle Sektionen. Der Schlüssel ist der Pfad der Objektdatei."""
+        old, new = self._symbols()
+        by_objfile = lambda key: key[1]
+        return self.compare(self.group(old, by_objfile), self.group(new, by_objfile), include_unchanged)
+
+    def symbols(self, include_unchanged=False):
+        """Änderung der Größe jedes Eintrags. Der Schlüssel ist das Tuple (Sektion, Objektdatei, Name)."""
+        old, new = self._symbols()
+        return self.compare(old, new, include_unchanged)
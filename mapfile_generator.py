@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""Erzeugt synthetische Map-Files des GNU Linkers für Tests und Benchmarks.
+
+Die erzeugten Map-Files sind deterministisch (gleicher seed, gleiche Datei) und enthalten die Konstrukte die in
+realen Map-Files vorkommen: LOAD Zeilen, Selektoren, Einträge mit umgebrochenen Namen, lange C++ Namen, COMMON
+Einträge, *fill* Einträge, BYTE Einträge und Sektionen mit load address.
+"""
+import sys
+import random
+import argparse
+import itertools
+import collections
+
+# Statistik über ein erzeugtes Map-File
+GeneratorStats = collections.namedtuple("GeneratorStats", ["bytes", "sections", "placements"])
+
+# Name, Speicherbereich, Anteil an den Einträgen, Selektor
+SECTIONS = [
+    (".isr_vector", "FLASH", 0.001, "*(.isr_vector)"),
+    (".text", "FLASH", 0.6, "*(.text*)"),
+    (".rodata", "FLASH", 0.15, "*(.rodata*)"),
+    (".ARM.exidx", "FLASH", 0.04, "*(.ARM.exidx* .gnu.linkonce.armexidx.*)"),
+    (".data", "RAM", 0.05, "*(.data*)"),
+    (".bss", "RAM", 0.159, "*(.bss*)"),
+]
+
+REGIONS = [("FLASH", 0x08000000, 0x78000000, "xr"), ("RAM", 0x80000000, 0x7FFF0000, "xrw")]
+
+# Geschätzte Anzahl an Zeichen je Eintrag, dient der Umrechnung einer Zielgröße in eine Anzahl an Einträgen
+BYTES_PER_PLACEMENT = 190
+
+NAMESPACES = ["drivers", "app", "net", "fs", "util", "hal", "rtos", "crypto"]
+CLASSES = ["Uart", "Spi", "Socket", "Buffer", "Parser", "Scheduler", "Timer", "Allocator", "Session"]
+METHODS = ["write", "read", "init", "process", "handleInterrupt", "update", "reset", "configure"]
+ARGUMENTS = ["", "unsigned char const*, unsigned int", "int", "std::basic_string<char, std::char_traits<char>, "
+             "std::allocator<char> > const&", "void*", "unsigned long long, bool"]
+
+
+class MapfileGenerator:
+    """Erzeugt ein Map-File mit placements Einträgen oder, falls size gesetzt ist, mit etwa size Zeichen.
+
+    sections ist die Anzahl der Sektionen, ohne Angabe werden die Sektionen aus SECTIONS erzeugt. Die Einträge
+    werden beim Schreiben zeilenweise erzeugt, der Speicherbedarf hängt nicht von der Größe des Map-Files ab.
+    """
+
+    def __init__(self, placements=10000, size=None, seed=0, objfiles=500, archives=20, loads=200,
+                 fill_ratio=0.05, common_ratio=0.05, byte_ratio=0.01, cpp_ratio=0.3, sections=None):
+        if size is not None:
+            placements = max(size // BYTES_PER_PLACEMENT, 1)
+        if sections is not None and sections < 1:
+            raise ValueError("At least one section is required")
+
+        self._placements = placements
+        self._sections = sections
+        self._random = random.Random(seed)
+        self._loads = loads
+        self._fill_ratio = fill_ratio
+        self._common_ratio = common_ratio
+        self._byte_ratio = byte_ratio
+        self._cpp_ratio = cpp_ratio
+
+        self._archives = ["/opt/toolchain/arm-none-eabi/lib/thumb/v7e-m/lib%s%i.a" % (NAMESPACES[i % 8], i)
+                          for i in range(archives)]
+        self._objfiles = []
+        for i in range(objfiles):
+            if i % 3 == 0:
+                archive = self._archives[i % archives]
+                self._objfiles.append("%s(%s_%i.c.obj)" % (archive, METHODS[i % 8], i))
+            else:
+                self._objfiles.append("CMakeFiles/firmware.dir/src/%s/%s/file_%i.cpp.obj"
+                                      % (NAMESPACES[i % 8], CLASSES[i % 9].lower(), i))
+
+    def _cpp_name(self):
+        """Gibt einen gemangelten und den zugehörigen lesbaren C++ Namen zurück."""
+        rnd = self._random
+        namespace = rnd.choice(NAMESPACES)
+        cls = rnd.choice(CLASSES) + str(rnd.randrange(1000))
+        method = rnd.choice(METHODS)
+        arguments = rnd.choice(ARGUMENTS)
+        mangled = "_ZN%i%s%i%s%i%sE%s" % (len(namespace), namespace, len(cls), cls, len(method), method,
+                                          "v" if not arguments else "Pv")
+        return mangled, "%s::%s::%s(%s)" % (namespace, cls, method, arguments)
+
+    @staticmethod
+    def _placement(name, address, size, objfile):
+        if len(name) >= 15:
+            # Lange Namen stehen in einer eigenen Zeile
+            return " %s\n                0x%08x %10s %s\n" % (name, address, hex(size), objfile)
+        return " %-14s 0x%08x %10s %s\n" % (name, address, hex(size), objfile)
+
+    def _generator_records(self, name, count):
+        """Ein Generator der count zufällige Einträge der Sektion name als Tuple (Art, Größe, Name, Objektdatei,
+        Symbol) liefert. Art ist "fill", "byte" oder "placement", bei "byte" ist Symbol der Wert des Bytes.
+
+        Die Zufallszahlen werden in derselben Reihenfolge gezogen wie bei der Ausgabe. Mit demselben Zustand des
+        Zufallsgenerators liefert ein zweiter Durchlauf also dieselben Einträge, siehe write.
+        """
+        rnd = self._random
+        input_section = ".bss" if name == ".bss" else name
+
+        for _ in range(count):
+            kind = rnd.random()
+            size = rnd.choice((2, 4, 8, 12, 16, 24, 32, 48, 64, 128, 256, 1024))
+
+            if kind < self._fill_ratio:
+                yield "fill", rnd.randrange(1, 4), None, None, None
+                continue
+
+            kind -= self._fill_ratio
+            if kind < self._byte_ratio:
+                yield "byte", 1, None, None, rnd.randrange(256)
+                continue
+
+            kind -= self._byte_ratio
+            objfile = rnd.choice(self._objfiles)
+            if name == ".bss" and kind < self._common_ratio:
+                symbol = "g_%s_%i" % (rnd.choice(METHODS), rnd.randrange(100000))
+                yield "placement", size, "COMMON", objfile, symbol
+            elif rnd.random() < self._cpp_ratio:
+                mangled, demangled = self._cpp_name()
+                yield "placement", size, "%s.%s" % (input_section, mangled), objfile, demangled
+            else:
+                symbol = "%s_%s_%i" % (rnd.choice(NAMESPACES), rnd.choice(METHODS), rnd.randrange(100000))
+                yield "placement", size, "%s.%s" % (input_section, symbol), objfile, symbol
+
+    def _generator_section_lines(self, selector, address, records):
+        """Ein Generator der die Zeilen einer Sektion ab der Adresse address aus den Einträgen records liefert."""
+        yield "                0x%08x                . = ALIGN (0x4)\n" % address
+        yield " %s\n" % selector
+        for kind, size, name, objfile, symbol in records:
+            if kind == "fill":
+                yield " *fill*         0x%08x %10s \n" % (address, hex(size))
+            elif kind == "byte":
+                yield " *(.fixed_data)\n                0x%08x        0x1 BYTE 0x%02x\n" % (address, symbol)
+            else:
+                yield self._placement(name, address, size, objfile)
+                yield "                0x%08x                %s\n" % (address, symbol)
+            address += size
+
+    def _section_layout(self):
+        """Gibt die Sektionen als Liste von Tuples (Name, Speicherbereich, Anteil, Selektor) zurück. Über die
+        Sektionen aus SECTIONS hinaus werden weitere Sektionen im Flash angelegt, die Anteile an den Einträgen
+        werden so skaliert, dass ihre Summe wieder 1 ergibt."""
+        if self._sections is None:
+            return SECTIONS
+
+        layout = SECTIONS[: self._sections]
+        for i in range(len(layout), self._sections):
+            layout.append((".section_%i" % i, "FLASH", 1.0 / len(SECTIONS), "*(.section_%i*)" % i))
+        total = sum(i[2] for i in layout)
+        return [(name, region, share / total, selector) for name, region, share, selector in layout]
+
+    def write(self, fp):
+        """Schreibt das Map-File in die Textdatei fp und gibt eine GeneratorStats zurück."""
+        rnd = self._random
+        written = 0
+
+        def emit(text):
+            nonlocal written
+            fp.write(text)
+            written += len(text)
+
+        emit("Archive member included to satisfy reference by file (symbol)\n\n")
+        for objfile in self._objfiles[::30]:
+            emit("%s\n                              %s (%s)\n" % (objfile, rnd.choice(self._objfiles), "memcpy"))
+
+        emit("\nAllocating common symbols\nCommon symbol       size              file\n\n")
+        for i in range(20):
+            emit("g_common_%-10i 0x%-15x %s\n" % (i, 4 * (i + 1), rnd.choice(self._objfiles)))
+
+        emit("\nDiscarded input sections\n\n")
+        for i in range(50):
+            emit(self._placement(".text.unused_%i" % i, 0, 4 * (i + 1), rnd.choice(self._objfiles)))
+
+        emit("\nMemory Configuration\n\nName             Origin             Length             Attributes\n")
+        for region in REGIONS:
+            emit("%-16s 0x%08x         0x%08x         %s\n" % region)
+        emit("*default*        0x00000000         0xffffffff\n\nLinker script and memory map\n\n")
+
+        for objfile in self._objfiles[: self._loads]:
+            emit("LOAD %s\n" % (objfile.partition("(")[0]))
+        emit("                0x00000400                _Min_Stack_Size = 0x400\n\n")
+
+        addresses = {region[0]: region[1] for region in REGIONS}
+        placements = 0
+        layout = self._section_layout()
+        for name, region, share, selector in layout:
+            count = max(int(self._placements * share), 1)
+
+            # Die Größe steht in der Kopfzeile vor den Einträgen. Sie wird in einem ersten Durchlauf bestimmt, der
+            # zweite Durchlauf mit demselben Zustand des Zufallsgenerators schreibt die Zeilen.
+            state = rnd.getstate()
+            size = sum(i[1] for i in self._generator_records(name, count))
+            rnd.setstate(state)
+
+            header = "%-15s 0x%08x %10s" % (name, addresses[region], hex(size))
+            if name == ".data":
+                # Der Inhalt von .data wird im Flash abgelegt
+                header += " load address 0x%08x" % addresses["FLASH"]
+                addresses["FLASH"] += size
+
+            emit(header + "\n")
+            lines = self._generator_section_lines(selector, addresses[region], self._generator_records(name, count))
+            # Die Zeilen werden in Blöcken geschrieben, der Speicherbedarf bleibt unabhängig von der Sektion
+            for block in iter(lambda: "".join(itertools.islice(lines, 4096)), ""):
+                emit(block)
+            emit("\n")
+
+            addresses[region] += size
+            placements += count
+
+        emit("OUTPUT(firmware.elf elf32-littlearm)\nLOAD linker stubs\n")
+        return GeneratorStats(written, len(layout), placements)
+
+
+def parse_size(text):
+    """Wandelt eine Größenangabe wie "100M" oder "1G" in eine Anzahl Bytes um."""
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+    if text[-1:].upper() in units:
+        return int(float(text[:-1]) * units[text[-1:].upper()])
+    return int(text)
+
+
+def main(arguments):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('outfile', help="Output file", type=str)
+    parser.add_argument('--size', help="Approximate size of the map file, e.g. 1M, 100M, 1G",
+                        default="1M", type=parse_size)
+    parser.add_argument('--seed', help="Seed of the random generator", default=0, type=int)
+    parser.add_argument('--sections', help="Number of sections (default: the %i typical sections)" % len(SECTIONS),
+                        type=int)
+    parser.add_argument('--objfiles', help="Number of distinct object files", default=500, type=int)
+    parser.add_argument('--archives', help="Number of archives the object files are spread across", default=20,
+                        type=int)
+    parser.add_argument('--loads', help="Number of LOAD lines", default=200, type=int)
+    parser.add_argument('--fill-ratio', help="Share of *fill* placements", default=0.05, type=float)
+    parser.add_argument('--common-ratio', help="Share of COMMON placements in .bss", default=0.05, type=float)
+    parser.add_argument('--byte-ratio', help="Share of BYTE placements", default=0.01, type=float)
+    parser.add_argument('--cpp-ratio', help="Share of placements with a mangled C++ name", default=0.3, type=float)
+    args = parser.parse_args(arguments)
+
+    generator = MapfileGenerator(size=args.size, seed=args.seed, objfiles=args.objfiles, archives=args.archives,
+                                 loads=args.loads, fill_ratio=args.fill_ratio, common_ratio=args.common_ratio,
+                                 byte_ratio=args.byte_ratio, cpp_ratio=args.cpp_ratio, sections=args.sections)
+    with open(args.outfile, "w") as fp:
+        stats = generator.write(fp)
+    print("Wrote %i bytes, %i sections, %i placements" % stats)
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -1,13 +1,1038 @@
 # -*- coding: utf-8 -*-
 
+import io
 import re
+import sys
+import bz2
+import gzip
+import lzma
+import mmap
+import time
+import heapq
+import bisect
+import fnmatch
+import hashlib
 import logging
+import operator
+import functools
+import itertools
+import contextlib
+import collections
+import concurrent.futures
+from array import array
+
+# Version des Ergebnisses von MapfileParser.parse. Muss erhöht werden wenn sich der Aufbau von _sec_dict ändert,
+# damit keine veralteten Einträge aus dem Cache geladen werden.
+PARSER_VERSION = 6
+
+# Pfad unter dem das Map-File von der Standardeingabe gelesen wird
+STDIN = "-"
+
+# Magic Bytes komprimierter Map-Files und die Klasse zum Entpacken
+COMPRESSIONS = [
+    (b"\x1f\x8b", lambda fp: gzip.GzipFile(fileobj=fp, mode="rb")),
+    (b"\xfd7zXZ\x00", lzma.LZMAFile),
+    (b"BZh", bz2.BZ2File),
+]
+
+# Kopfzeile einer Sektion, z.B. ".fast           0x2ffc0380     0x6ac0 load address 0xc0000780"
+RE_SECTION = re.compile(r"^([\.\w]+)\s+(0x\w+)\s+(0x\w+).*$")
+
+# Zeile die nicht mit einem Leerzeichen beginnt (Kopfzeile, LOAD Zeile, Überschrift), für Text und für Bytes.
+# Wird von der Suche nach den Kopfzeilen in MapfileParser.parse(lazy=True) verwendet. Der Ausdruck beginnt mit dem
+# Zeilenumbruch davor, da die Suche nach einem festen Zeichen deutlich schneller ist als mit "^" und re.M. Die
+# Zeile selbst ist Gruppe 1, eine Zeile am Anfang des Textes muss gesondert geprüft werden.
+RE_TOP_LEVEL_LINE = re.compile(r"\n(\S.*)")
+RE_TOP_LEVEL_LINE_BYTES = re.compile(rb"\n(\S.*)")
+
+# Eine einzelne Zeile eines Eintrags, z.B. " COMMON         0xc056fd60       0x18 libOPEScored.a(IP_ARP.c.obj)".
+# Entspricht dem regulären Ausdruck in generator_placements, bezieht sich aber auf genau eine Zeile.
+RE_PLACEMENT_LINE = re.compile(r"\s([\*\.\w\s]+)\s+(0x\w+)[^\S\r\n]+(0x\w+)[^\S\n](.*)")
+
+# Schnelle Variante für den Normalfall eines Namens ohne Leerzeichen. Vermeidet das Backtracking des Namens.
+RE_PLACEMENT_LINE_FAST = re.compile(r"\s([\*\.\w]+)[^\S\n]+(0x\w+)[^\S\r\n]+(0x\w+)[^\S\n](.*)")
+
+# Zeile eines Eintrags ohne Namen, z.B. "                0xc0000344        0x1 BYTE 0xaa". Steht der Name in der
+# vorherigen Zeile, folgt der Rest des Eintrags in diesem Format.
+RE_ADDRESS_LINE = re.compile(r"\s+(0x\w+)[^\S\r\n]+(0x\w+)[^\S\n](.*)")
+
+# Zeile die nur aus dem Namen eines Eintrags besteht. Der Rest des Eintrags folgt in der nächsten Zeile.
+RE_NAME_LINE = re.compile(r"\s[\*\.\w\s]+")
+
+# Folgezeile eines Eintrags mit (optional) Adresse und Klassenname
+RE_CONTINUATION_LINE = re.compile(r"\s*(0x\w+)?\s*(.*)")
+
+# Die häufigen Zeilenfolgen der Memory Map in einem regulären Ausdruck, angewendet mit finditer auf ganze Textblöcke
+# (siehe generator_tokenize). Die Alternativen und ihre Gruppen:
+#   1      Zeile die nicht mit einem Leerzeichen beginnt (Kopfzeile, LOAD Zeile, OUTPUT)
+#   2-11   Eintrag in einer Zeile wie RE_PLACEMENT_LINE_FAST (3-6) oder mit dem Namen in einer eigenen Zeile gefolgt
+#          von einer Zeile wie RE_ADDRESS_LINE (3, 7-9), jeweils mit der Folgezeile wie RE_CONTINUATION_LINE (10
+#          und 11). Fehlt die Folgezeile, muss der nächste Eintrag oder eine Kopfzeile folgen.
+#   12     jede andere Zeile, sie wird einzeln klassifiziert
+# Die Alternative 2 erkennt nur durch Leerzeichen getrennte Felder. Sie liefert für die erkannten Zeilen dasselbe
+# Ergebnis wie die einzelnen regulären Ausdrücke, alle anderen Zeilen fallen auf die Alternative 12 zurück.
+RE_TOKEN = re.compile(
+    r"^(?:(\S.*)"
+    r"|( ([\*\.\w]+)(?: +(0x\w+) +(0x\w+) (.*)| *\n {2,}(0x\w+) +(0x\w+) (.*))"
+    r"(?:\n {2,}(?=\S)(0x\w+)? *(\S.*)?$|(?=\n ?\S)))"
+    r"|(.*))",
+    re.M,
+)
+
+# Beginn eines Eintrags innerhalb einer Sektion, eine Zeile mit genau einem Leerzeichen am Anfang (z.B. " .text" oder
+# " *(.text)"). Die Folgezeilen eines Eintrags sind weiter eingerückt. Trennstelle für die parallele Verarbeitung.
+RE_ENTRY_START = re.compile(r"\n \S")
+RE_ENTRY_START_BYTES = re.compile(rb"\n \S")
+
+# Ladeadresse in der Kopfzeile einer Sektion, z.B. ".data  0x20000000  0x8 load address 0x08000074"
+RE_LOAD_ADDRESS = re.compile(r"load address (0x\w+)")
+
+# Speicherbereich im Abschnitt "Memory Configuration", z.B. "FLASH            0x08000000         0x00010000         xr"
+RE_MEMORY_REGION = re.compile(r"(\S+)\s+(0x[0-9a-fA-F]+)\s+(0x[0-9a-fA-F]+)(?:[^\S\n]+(\S+))?")
+
+# In der Cross Reference Table beginnt die Objektdatei in dieser Spalte, längere Symbole stehen in einer eigenen Zeile
+CROSS_REFERENCE_FILE_COLUMN = 50
+
+
+# Ein einzelner Eintrag einer PlacementTable. Die Adresse in der nächsten Zeile ist None wenn sie nicht existiert.
+Placement = collections.namedtuple("Placement", ["name", "address", "size", "objfile", "address2nd", "classinfo"])
+
+
+# Ergebnis von _tokenize_job für einen Block mit Einträgen einer Sektion. placements und reused sind PlacementTables
+# mit eigener StringTable, reused_count ist die Anzahl der entfernten Einträge vor dem Filtern. Ob der letzte Eintrag
+# last doppelt verwendet wird, zeigt erst der nächste Block, er ist daher in keiner Tabelle enthalten. first_address
+# ist die Adresse des ersten Eintrags, bei einem leeren Block sind first_address und last None.
+TokenizedBlock = collections.namedtuple("TokenizedBlock", ["placements", "reused", "reused_count", "first_address",
+                                                           "last"])
+
+# Ergebnis von MapfileParser.aggregate
+Group = collections.namedtuple("Group", ["key", "size", "count"])
+
+# Ergebnis von MapfileParser.top, ein Eintrag mit dem Namen seiner Sektion
+RankedPlacement = collections.namedtuple("RankedPlacement", ["section", "placement"])
+
+# Ein Befund von MapfileParser.analyze_integrity. kind ist "gap" (Bereich ohne Eintrag, z.B. Alignment), "overlap"
+# (Eintrag beginnt vor dem Ende eines vorherigen), "fill" (Eintrag *fill*), "reused" (von
+# generator_remove_reused_placements entfernter Eintrag) oder "size_mismatch" (Größe der Sektion minus Summe der
+# Einträge in size). name und objfile sind bei Lücken und bei size_mismatch leer.
+IntegrityIssue = collections.namedtuple("IntegrityIssue", ["section", "kind", "address", "size", "name", "objfile"])
+
+# Ein Speicherbereich aus dem Abschnitt "Memory Configuration". attributes ist leer wenn keine angegeben sind.
+MemoryRegion = collections.namedtuple("MemoryRegion", ["name", "origin", "length", "attributes"])
+
+# Belegung eines Speicherbereichs, Ergebnis von MapfileParser.get_memory_regions. utilization ist used / length.
+RegionUsage = collections.namedtuple("RegionUsage", ["name", "origin", "length", "used", "free", "utilization"])
+
+# Eintrag aus "Archive member included to satisfy reference by file (symbol)"
+ArchiveMember = collections.namedtuple("ArchiveMember", ["member", "referenced_by", "symbol"])
+
+# Eintrag aus "Allocating common symbols"
+CommonSymbol = collections.namedtuple("CommonSymbol", ["symbol", "size", "objfile"])
+
+
+@contextlib.contextmanager
+def open_mapfile(path):
+    """Öffnet das Map-File path als Binärdatei. Mit gzip, xz oder bzip2 komprimierte Dateien werden an den Magic
+    Bytes erkannt und beim Lesen entpackt, ohne eine entpackte Kopie anzulegen. Der Pfad "-" steht für die
+    Standardeingabe, die nicht geschlossen wird."""
+    if path == STDIN:
+        raw = sys.stdin.buffer
+    else:
+        raw = open(path, "rb")
+
+    try:
+        if not hasattr(raw, "peek"):
+            raw = io.BufferedReader(raw)
+        magic = raw.peek(6)[:6]
+
+        for prefix, decompressor in COMPRESSIONS:
+            if magic.startswith(prefix):
+                with decompressor(raw) as fp:
+                    yield fp
+                return
+        yield raw
+    finally:
+        if path != STDIN:
+            raw.close()
+
+
+def split_archive(objfile):
+    """Zerlegt eine Objektdatei der Form "lib.a(obj.o)" in das Tuple (Archiv, Objektdatei). Liegt die
+    Objektdatei in keinem Archiv, ist das Archiv ein leerer String."""
+    if objfile.endswith(")"):
+        archive, separator, member = objfile[:-1].partition("(")
+        if separator:
+            return archive, member
+    return "", objfile
+
+
+def path_prefix(path, depth):
+    """Gibt die ersten depth Verzeichnisse des Pfades path zurück. Bei Objektdateien in einem Archiv wird der Pfad
+    des Archivs verwendet."""
+    archive, objfile = split_archive(path)
+    directories = (archive or objfile).replace("\\", "/").split("/")[:-1]
+    return "/".join(directories[:depth])
+
+
+class ParseFilter:
+    """Filter die MapfileParser.parse so früh wie möglich anwendet.
+
+    include und exclude sind Listen von Glob Mustern (z.B. ".text*") für die Namen der Sektionen. Ist include
+    angegeben, werden nur passende Sektionen gelesen. Ausgeschlossene Sektionen werden nicht zerlegt und fehlen im
+    Ergebnis. objfile und archive sind reguläre Ausdrücke die in der Objektdatei bzw. deren Archiv gesucht werden,
+    min_size ist die minimale Größe eines Eintrags. Einträge die diese Bedingungen nicht erfüllen werden nicht in
+    die PlacementTable aufgenommen.
+    """
+
+    def __init__(self, include=None, exclude=None, objfile=None, archive=None, min_size=0):
+        self.include = list(include or [])
+        self.exclude = list(exclude or [])
+        self.objfile = objfile
+        self.archive = archive
+        self.min_size = min_size
+
+        self._objfile_search = re.compile(objfile).search if objfile else None
+        self._archive_search = re.compile(archive).search if archive else None
+        # Ergebnis der regulären Ausdrücke je Objektdatei
+        self._objfiles = {}
+
+    def __repr__(self):
+        return "ParseFilter(include=%r, exclude=%r, objfile=%r, archive=%r, min_size=%r)" % (
+            self.include, self.exclude, self.objfile, self.archive, self.min_size)
+
+    def __getstate__(self):
+        return (self.include, self.exclude, self.objfile, self.archive, self.min_size)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def key(self):
+        """Gibt einen kurzen Hash über die Einstellungen zurück, z.B. als Teil des Schlüssels im Cache."""
+        return hashlib.blake2b(repr(self).encode("utf-8"), digest_size=8).hexdigest()
+
+    @property
+    def filters_placements(self):
+        """True wenn einzelne Einträge einer Sektion verworfen werden."""
+        return bool(self.objfile or self.archive or self.min_size)
+
+    def accepts_section(self, name):
+        if self.include and not any(fnmatch.fnmatchcase(name, i) for i in self.include):
+            return False
+        return not any(fnmatch.fnmatchcase(name, i) for i in self.exclude)
+
+    def accepts_placement(self, placement):
+        if placement[2] < self.min_size:
+            return False
+        return not (self.objfile or self.archive) or self._accepts_objfile(placement[3])
+
+    def _accepts_objfile(self, objfile):
+        result = self._objfiles.get(objfile)
+        if result is None:
+            result = True
+            if self._objfile_search is not None:
+                result = self._objfile_search(objfile) is not None
+            if result and self._archive_search is not None:
+                result = self._archive_search(split_archive(objfile)[0]) is not None
+            self._objfiles[objfile] = result
+        return result
+
+    def filter_placements(self, placements):
+        """Gibt die Liste der Einträge zurück die die Bedingungen erfüllen."""
+        min_size = self.min_size
+        if self.objfile or self.archive:
+            accepts_objfile = self._accepts_objfile
+            return [i for i in placements if i[2] >= min_size and accepts_objfile(i[3])]
+        return [i for i in placements if i[2] >= min_size]
+
+
+class ParseStats:
+    """Laufzeiten je Stufe und Zähler eines Aufrufs von MapfileParser.parse."""
+
+    COUNTERS = ["bytes_read", "sections", "placements", "reused_placements", "size_mismatches", "cache_hits",
+                "reused_sections"]
+
+    def __init__(self):
+        self.timings = {}
+        for counter in self.COUNTERS:
+            setattr(self, counter, 0)
+
+    @contextlib.contextmanager
+    def measure(self, stage):
+        """Misst die Laufzeit des with Blocks und addiert sie zur Stufe stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[stage] = self.timings.get(stage, 0.0) + time.perf_counter() - start
+
+    def as_dict(self):
+        result = {counter: getattr(self, counter) for counter in self.COUNTERS}
+        result["timings"] = dict(self.timings)
+        return result
+
+    def __str__(self):
+        lines = ["%-18s %10.3f s" % (stage, seconds) for stage, seconds in self.timings.items()]
+        lines += ["%-18s %12i" % (counter, getattr(self, counter)) for counter in self.COUNTERS]
+        return "\n".join(lines)
+
+
+class StringTable:
+    """Tabelle in der jeder String nur einmal abgelegt wird. Die Strings werden über ihren Index referenziert.
+
+    MapfileParser.parse legt je Aufruf eine StringTable an, die sich alle PlacementTables teilen. Der Speicher
+    für Pfade und Namen wächst damit mit der Anzahl verschiedener Strings und nicht mit der Anzahl der Einträge.
+    """
+
+    def __init__(self):
+        # Die Reihenfolge der Schlüssel entspricht den Indizes
+        self._index = {}
+        self._strings = []
+
+    @property
+    def strings(self):
+        """Liste aller Strings, der Index in der Liste entspricht dem Index des Strings."""
+        if len(self._strings) != len(self._index):
+            self._strings = list(self._index)
+        return self._strings
+
+    def intern(self, string):
+        """Gibt den Index von string zurück und legt ihn bei Bedarf an."""
+        index = self._index
+        return index.setdefault(string, len(index))
+
+    def intern_many(self, strings):
+        """Wie intern, aber für alle Strings in strings. Gibt ein Array der Indizes zurück."""
+        index = self._index
+        setdefault = index.setdefault
+        return array("I", [setdefault(i, len(index)) for i in strings])
+
+    def index(self, string):
+        """Gibt den Index von string zurück oder None falls string nicht in der Tabelle steht."""
+        return self._index.get(string)
+
+    def __getitem__(self, index):
+        return self.strings[index]
+
+    def __len__(self):
+        return len(self._index)
+
+    def nbytes(self):
+        """Geschätzter Speicherbedarf in Bytes, je String das Objekt selbst und der Eintrag im Dictionary."""
+        return sum(sys.getsizeof(i) + 100 for i in self._index)
+
+    def __getstate__(self):
+        # Der Index lässt sich aus der Liste wiederherstellen und muss nicht mit gespeichert werden
+        return self.strings
+
+    def __setstate__(self, strings):
+        self._strings = strings
+        self._index = {string: index for index, string in enumerate(strings)}
+
+
+class PlacementTable:
+    """Spaltenweise Ablage der Einträge einer Sektion.
+
+    Adresse und Größe werden in Arrays abgelegt, Name, Objektdatei und Klassenname als Index in eine StringTable.
+    Die StringTable strings kann von mehreren Tabellen geteilt werden. Die Adresse in der nächsten Zeile wird beim
+    Einfügen einmalig in einen Integer gewandelt, has_addresses_2nd markiert, ob die Adresse vorhanden ist.
+
+    Nach split_archives enthalten archives und members je Eintrag den Index von Archiv und Member der Objektdatei
+    (siehe split_archive), andernfalls sind beide None.
+    """
+
+    def __init__(self, strings=None):
+        self.strings = StringTable() if strings is None else strings
+        self.names = array("I")
+        self.addresses = array("Q")
+        self.sizes = array("Q")
+        self.objfiles = array("I")
+        self.addresses_2nd = array("Q")
+        self.has_addresses_2nd = array("B")
+        self.classinfos = array("I")
+        self.archives = None
+        self.members = None
+
+    @classmethod
+    def from_placements(cls, placements, strings=None, split_archives=False):
+        """Erzeugt eine Tabelle aus Einträgen im Format von generator_placements."""
+        table = cls(strings)
+        table.extend(placements)
+        if split_archives:
+            table.split_archives()
+        return table
+
+    def split_archives(self):
+        """Legt die Spalten archives und members an. Archiv und Member werden je Objektdatei nur einmal bestimmt,
+        neu angefügte Einträge werden danach ebenfalls aufgeteilt."""
+        if self.archives is None:
+            self.archives = array("I")
+            self.members = array("I")
+        self._split_rows(len(self.archives))
+
+    def _split_rows(self, start):
+        # Die Liste wird vor dem Anlegen der neuen Strings geholt, damit sie nicht je String neu erzeugt wird
+        objfiles = self.strings.strings
+        intern = self.strings.intern
+        parts = {}
+        for objfile in set(self.objfiles[start:]):
+            archive, member = split_archive(objfiles[objfile])
+            parts[objfile] = (intern(archive), intern(member))
+        rows = [parts[i] for i in self.objfiles[start:]]
+        self.archives.extend([i[0] for i in rows])
+        self.members.extend([i[1] for i in rows])
+
+    def extend(self, placements):
+        """Fügt alle Einträge im Format von generator_placements spaltenweise an."""
+        placements = placements if isinstance(placements, list) else list(placements)
+        intern_many = self.strings.intern_many
+        self.names.extend(intern_many([i[0] for i in placements]))
+        self.addresses.extend([i[1] for i in placements])
+        self.sizes.extend([i[2] for i in placements])
+        self.objfiles.extend(intern_many([i[3] for i in placements]))
+        self.addresses_2nd.extend([int(i[4], 16) if i[4] else 0 for i in placements])
+        self.has_addresses_2nd.extend([1 if i[4] else 0 for i in placements])
+        self.classinfos.extend(intern_many([i[5] for i in placements]))
+        if self.archives is not None:
+            self._split_rows(len(self.archives))
+
+    def extend_table(self, other, mapping=None):
+        """Fügt alle Einträge der PlacementTable other an. Verwendet other eine andere StringTable, werden deren
+        Indizes über die Strings auf die eigene StringTable abgebildet. mapping ist das Ergebnis von
+        strings.intern_many(other.strings.strings), für mehrere Tabellen mit derselben StringTable muss es nur
+        einmal bestimmt werden."""
+        columns = [(self.names, other.names), (self.objfiles, other.objfiles), (self.classinfos, other.classinfos)]
+        if other.strings is self.strings:
+            for column, other_column in columns:
+                column.extend(other_column)
+        else:
+            if mapping is None:
+                mapping = self.strings.intern_many(other.strings.strings)
+            for column, other_column in columns:
+                column.extend(map(mapping.__getitem__, other_column))
+        self.addresses.extend(other.addresses)
+        self.sizes.extend(other.sizes)
+        self.addresses_2nd.extend(other.addresses_2nd)
+        self.has_addresses_2nd.extend(other.has_addresses_2nd)
+        if self.archives is not None:
+            self._split_rows(len(self.archives))
+
+    def append(self, placement):
+        """Fügt einen Eintrag im Format von generator_placements an."""
+        intern = self.strings.intern
+        self.names.append(intern(placement[0]))
+        self.addresses.append(placement[1])
+        self.sizes.append(placement[2])
+        self.objfiles.append(intern(placement[3]))
+        self.addresses_2nd.append(int(placement[4], 16) if placement[4] else 0)
+        self.has_addresses_2nd.append(1 if placement[4] else 0)
+        self.classinfos.append(intern(placement[5]))
+        if self.archives is not None:
+            self._split_rows(len(self.archives))
+
+    def __len__(self):
+        return len(self.addresses)
+
+    def __getitem__(self, index):
+        strings = self.strings.strings
+        return Placement(
+            strings[self.names[index]],
+            self.addresses[index],
+            self.sizes[index],
+            strings[self.objfiles[index]],
+            self.addresses_2nd[index] if self.has_addresses_2nd[index] else None,
+            strings[self.classinfos[index]],
+        )
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def __repr__(self):
+        return "PlacementTable(%r)" % list(self)
+
+    def total_size(self):
+        """Summe der Größen aller Einträge."""
+        return sum(self.sizes)
+
+    def nbytes(self, include_strings=True):
+        """Geschätzter Speicherbedarf der Tabelle in Bytes. Mit include_strings=False ohne die StringTable, etwa
+        wenn sie von mehreren Tabellen geteilt wird."""
+        columns = [self.names, self.addresses, self.sizes, self.objfiles, self.addresses_2nd, self.has_addresses_2nd,
+                   self.classinfos]
+        if self.archives is not None:
+            columns += [self.archives, self.members]
+        nbytes = sum(len(i) * i.itemsize for i in columns)
+        return nbytes + self.strings.nbytes() if include_strings else nbytes
+
+
+# Ergebnis einer Suche im AddressIndex
+Symbol = collections.namedtuple("Symbol", ["address", "section", "objfile", "name", "symbol", "offset"])
+
+
+class AddressIndex:
+    """Sortierter Index über die Startadressen aller Einträge für die Zuordnung von Adressen zu Symbolen.
+
+    Der Index wird einmalig aus den Tuples (Sektion, PlacementTable) von MapfileParser.iter_placement_tables
+    aufgebaut. Eine Suche benötigt O(log n).
+    Einträge der Größe 0 werden nicht aufgenommen. Überlappen sich Einträge, wird der Eintrag mit der größten
+    Startadresse zurückgegeben der die Adresse enthält.
+    """
+
+    def __init__(self, placement_tables):
+        self._sections = []
+        self._tables = []
+        for section, table in placement_tables:
+            self._sections.append(section)
+            self._tables.append(table)
+
+        starts = []
+        sizes = []
+        sections = []
+        rows = []
+        for section_index, table in enumerate(self._tables):
+            for row, (address, size) in enumerate(zip(table.addresses, table.sizes)):
+                if size == 0:
+                    continue
+                starts.append(address)
+                sizes.append(size)
+                sections.append(section_index)
+                rows.append(row)
+
+        order = sorted(range(len(starts)), key=starts.__getitem__)
+        self._starts = array("Q", [starts[i] for i in order])
+        self._ends = array("Q", [starts[i] + sizes[i] for i in order])
+        self._section_indices = array("L", [sections[i] for i in order])
+        self._rows = array("L", [rows[i] for i in order])
+
+        # Größte Endadresse aller Einträge bis zum jeweiligen Index. Damit lässt sich schnell feststellen ob eine
+        # Adresse in überhaupt keinem Eintrag liegt.
+        self._max_ends = array("Q", itertools.accumulate(self._ends, max))
+
+    def __len__(self):
+        return len(self._starts)
+
+    def nbytes(self):
+        """Geschätzter Speicherbedarf des Index in Bytes, ohne die PlacementTables auf die er verweist."""
+        columns = [self._starts, self._ends, self._section_indices, self._rows, self._max_ends]
+        return sum(len(i) * i.itemsize for i in columns)
+
+    def _find(self, address):
+        index = bisect.bisect_right(self._starts, address) - 1
+        if index < 0 or self._max_ends[index] <= address:
+            return -1
+
+        # Nur bei überlappenden Einträgen muss weiter zurück gesucht werden
+        ends = self._ends
+        while ends[index] <= address:
+            index -= 1
+        return index
+
+    def entry(self, index):
+        """Gibt (Sektion, Objektdatei, Name, Symbol, Startadresse) des Eintrags mit dem Index index (siehe
+        find_many) zurück. Das Ergebnis wird nicht zwischengespeichert, damit der Speicherbedarf des Index nicht mit
+        den Anfragen wächst. Wer viele Adressen zuordnet, liest mit find_many jeden Eintrag nur einmal je Aufruf."""
+        section_index = self._section_indices[index]
+        placement = self._tables[section_index][self._rows[index]]
+
+        # Der Klassenname gehört nur dann zum Eintrag, wenn die Adresse in der Folgezeile übereinstimmt
+        symbol = placement.classinfo if placement.address2nd == placement.address else ""
+        return self._sections[section_index], placement.objfile, placement.name, symbol, placement.address
+
+    def lookup(self, address):
+        """Gibt das Symbol zur Adresse address zurück oder None wenn die Adresse in keinem Eintrag liegt."""
+        index = self._find(address)
+        if index < 0:
+            return None
+
+        section, objfile, name, symbol, start = self.entry(index)
+        return Symbol(address, section, objfile, name, symbol, address - start)
+
+    def find_many(self, addresses):
+        """Gibt für jede Adresse in addresses den Index des Eintrags zurück der sie enthält, bzw. -1. Das Ergebnis
+        ist ein Array in der Reihenfolge von addresses, die Einträge selbst liefert entry.
+
+        Die verschiedenen Adressen werden sortiert und der Reihe nach zugeordnet. Alle Adressen bis zum Ende des
+        gefundenen Eintrags bzw. bis zum Beginn des nächsten Eintrags gehören zum selben Eintrag und werden mit
+        einer einzigen Suche zugeordnet. Traces mit vielen Adressen in denselben Funktionen benötigen so nur wenige
+        Suchen.
+        """
+        addresses = addresses if isinstance(addresses, list) else list(addresses)
+        unique = sorted(dict.fromkeys(addresses))
+        count = len(unique)
+
+        bisect_left = bisect.bisect_left
+        bisect_right = bisect.bisect_right
+        starts = self._starts
+        ends = self._ends
+        max_ends = self._max_ends
+        last = len(starts) - 1
+
+        # Adresse -> Index des Eintrags, je Lauf von Adressen mit demselben Eintrag ein Aufruf von update
+        indices = {}
+        position = 0
+        while position < count:
+            address = unique[position]
+            index = bisect_right(starts, address) - 1
+            # Alle folgenden Adressen vor dem Beginn des nächsten Eintrags ergeben dasselbe Ergebnis wie _find
+            limit = starts[index + 1] if index < last else None
+            if index < 0 or max_ends[index] <= address:
+                found = -1
+            else:
+                found = index
+                while ends[found] <= address:
+                    found -= 1
+                if limit is None or ends[found] < limit:
+                    limit = ends[found]
+
+            end = count if limit is None else bisect_left(unique, limit, position + 1)
+            indices.update(zip(unique[position:end], itertools.repeat(found)))
+            position = end
+
+        return array("q", map(indices.__getitem__, addresses))
+
+    def lookup_many(self, addresses):
+        """Wie lookup, aber für eine ganze Liste von Adressen. Gibt eine Liste der Ergebnisse zurück.
+
+        Die Einträge werden mit find_many bestimmt und je Eintrag nur einmal gelesen, die Symbole erst danach je
+        Adresse erzeugt. Wer keine Symbole benötigt (z.B. für eine Ausgabe je Eintrag), verwendet find_many und
+        entry direkt.
+        """
+        addresses = addresses if isinstance(addresses, list) else list(addresses)
+        indices = self.find_many(addresses)
+        entries = {index: self.entry(index) for index in set(indices) if index >= 0}
+        entries[-1] = None
+
+        result = []
+        append = result.append
+        for address, entry in zip(addresses, map(entries.__getitem__, indices)):
+            if entry is None:
+                append(None)
+            else:
+                section, objfile, name, symbol, start = entry
+                append(Symbol(address, section, objfile, name, symbol, address - start))
+        return result
+
+
+class MapfileBlocks:
+    """Die Abschnitte eines Map-Files vor und nach der Memory Map.
+
+    read_preamble und read_trailer lesen die Zeilen vor der Überschrift "Linker script and memory map" bzw. nach
+    der Zeile "OUTPUT(...)" im selben Durchlauf wie die Memory Map. Fehlende Abschnitte bleiben leer.
+
+    archive_members ist eine Liste von ArchiveMember, common_symbols eine Liste von CommonSymbol, discarded die
+    PlacementTable der verworfenen Einträge ("Discarded input sections"), memory_regions eine Liste von
+    MemoryRegion und cross_references ein Dictionary Symbol -> Liste der Objektdateien, die erste definiert das
+    Symbol. Nach parse(lazy=True) geben map_start und map_end die Position der Memory Map an, die Abschnitte
+    werden dann erst von MapfileParser.get_blocks gelesen.
+
+    discarded verwendet die StringTable strings, MapfileParser übergibt dieselbe StringTable wie für die Sektionen.
+    """
+
+    # Anfang der Überschrift und Name des Abschnitts
+    HEADINGS = [
+        ("Archive member included", "archive_members"),
+        ("Allocating common symbols", "common_symbols"),
+        ("Discarded input sections", "discarded"),
+        ("Memory Configuration", "memory_configuration"),
+        ("Linker script and memory map", "memory_map"),
+        ("Cross Reference Table", "cross_references"),
+    ]
+
+    def __init__(self, strings=None):
+        self.archive_members = []
+        self.common_symbols = []
+        self.discarded = PlacementTable(strings)
+        self.memory_regions = []
+        self.cross_references = {}
+        self.map_start = None
+        self.map_end = None
+
+    def nbytes(self):
+        """Geschätzter Speicherbedarf der Abschnitte in Bytes, ohne die StringTable von discarded (siehe
+        MapfileParser.nbytes). Je String das Objekt selbst, je Eintrag eines Dictionarys wie in StringTable."""
+        nbytes = self.discarded.nbytes(include_strings=False)
+        for items in (self.archive_members, self.common_symbols, self.memory_regions):
+            nbytes += sys.getsizeof(items) + sum(sys.getsizeof(i) + sum(map(sys.getsizeof, i)) for i in items)
+        for symbol, files in self.cross_references.items():
+            nbytes += sys.getsizeof(symbol) + 100 + sys.getsizeof(files) + sum(map(sys.getsizeof, files))
+        return nbytes
+
+    @classmethod
+    def heading(cls, line):
+        """Gibt den Namen des Abschnitts zurück, falls line eine Überschrift ist, ansonsten None."""
+        if line[0].isspace():
+            return None
+        for prefix, name in cls.HEADINGS:
+            if line.startswith(prefix):
+                return name
+        return None
+
+    @staticmethod
+    def starts_memory_map(line, block=None):
+        """Erkennt den Beginn der Memory Map in einem Map-File ohne die Überschrift "Linker script and memory map",
+        also eine LOAD Zeile oder die Kopfzeile einer Sektion. block ist der Abschnitt in dem line steht.
+
+        Die Speicherbereiche unter "Memory Configuration" haben dasselbe Format wie die Kopfzeile einer Sektion. Dort
+        beginnt die Memory Map deshalb nur mit einer LOAD Zeile, der Abschnitt endet sonst mit dem Bereich *default*
+        (siehe ends_block)."""
+        if line[0].isspace():
+            return False
+        if line.startswith("LOAD "):
+            return True
+        return block != "memory_configuration" and RE_SECTION.match(line) is not None
+
+    @staticmethod
+    def ends_block(block, line):
+        """True wenn line die letzte Zeile des Abschnitts block ist. Der Linker gibt *default* immer als letzten
+        Speicherbereich aus."""
+        return block == "memory_configuration" and line.startswith("*default*")
+
+    def read_preamble(self, lines):
+        """Liest die Abschnitte vor der Memory Map und gibt den Iterator auf die Zeilen der Memory Map zurück.
+
+        Fehlt die Überschrift der Memory Map, beginnt sie mit der ersten Zeile für die starts_memory_map zutrifft.
+        Diese Zeile wird wieder vorangestellt.
+        """
+        lines = iter(lines)
+        block = None
+        block_lines = []
+        for line in lines:
+            heading = self.heading(line)
+            if heading is not None:
+                self._parse_block(block, block_lines)
+                if heading == "memory_map":
+                    return lines
+                block = heading
+                block_lines = []
+            elif self.starts_memory_map(line, block):
+                self._parse_block(block, block_lines)
+                return itertools.chain([line], lines)
+            elif block is not None:
+                block_lines.append(line)
+                if self.ends_block(block, line):
+                    self._parse_block(block, block_lines)
+                    block = None
+                    block_lines = []
+
+        self._parse_block(block, block_lines)
+        return lines
+
+    def read_trailer(self, lines):
+        """Liest die Abschnitte nach der Zeile "OUTPUT(...)", z.B. die Cross Reference Table."""
+        block = None
+        block_lines = []
+        for line in lines:
+            heading = self.heading(line)
+            if heading is not None:
+                self._parse_block(block, block_lines)
+                block = heading
+                block_lines = []
+            elif block is not None:
+                block_lines.append(line)
+        self._parse_block(block, block_lines)
+
+    def _parse_block(self, block, lines):
+        if block is not None and lines:
+            getattr(self, "_parse_" + block)(lines)
+
+    def _parse_archive_members(self, lines):
+        # Das Member steht am Zeilenanfang, "Datei (Symbol)" in derselben oder der nächsten, eingerückten Zeile
+        member = None
+        for line in lines:
+            if not line.strip():
+                continue
+            if not line[0].isspace():
+                member, _, rest = line.strip().partition(" ")
+                if not rest.strip():
+                    continue
+            elif member is None:
+                continue
+            else:
+                rest = line
+
+            referenced_by, separator, symbol = rest.strip().rpartition(" (")
+            if not separator:
+                referenced_by, symbol = symbol, ""
+            self.archive_members.append(ArchiveMember(member, referenced_by, symbol.rstrip(")")))
+            member = None
+
+    def _parse_common_symbols(self, lines):
+        # Lange Symbole stehen in einer eigenen Zeile, Größe und Datei folgen eingerückt in der nächsten
+        symbol = None
+        for line in lines:
+            parts = line.split()
+            if not parts or parts[:2] == ["Common", "symbol"]:
+                continue
+            if not line[0].isspace():
+                symbol = parts.pop(0)
+            if symbol is None or len(parts) < 2 or not parts[0].startswith("0x"):
+                continue
+            self.common_symbols.append(CommonSymbol(symbol, int(parts[0], 16), " ".join(parts[1:])))
+            symbol = None
+
+    def _parse_discarded(self, lines):
+        # Die Einträge haben dasselbe Format wie die Einträge einer Sektion
+        self.discarded.extend(MapfileParser.generator_tokenize(lines, in_section=True))
+
+    def _parse_memory_configuration(self, lines):
+        for line in lines:
+            matches = RE_MEMORY_REGION.match(line)
+            if matches is not None:
+                self.memory_regions.append(
+                    MemoryRegion(matches[1], int(matches[2], 16), int(matches[3], 16), matches[4] or ""))
+
+    def _parse_cross_references(self, lines):
+        column = CROSS_REFERENCE_FILE_COLUMN
+        files = None
+        for line in lines:
+            line = line.rstrip()
+            if not line:
+                continue
+            if line[0].isspace():
+                if files is not None:
+                    files.append(line.strip())
+                continue
+            if line.split() == ["Symbol", "File"]:
+                continue
+
+            if len(line) > column and line[column - 1].isspace():
+                symbol, objfile = line[:column].rstrip(), line[column:].strip()
+            else:
+                symbol, objfile = line, None
+            files = self.cross_references.setdefault(symbol, [])
+            if objfile:
+                files.append(objfile)
 
 
 class MapfileParser:
-    def __init__(self, mapfile):
+    def __init__(self, mapfile=None, path=None):
         self._mapfile = mapfile
+        self._path = path
         self._sec_dict = {}
+        # Wird von parse und update gesetzt, auch wenn dabei keine Sektion gelesen wurde (z.B. durch den Filter)
+        self._parsed = False
+        # Position (Beginn, Ende) der noch nicht zerlegten Einträge jeder Sektion im lazy Modus
+        self._offsets = {}
+        self._verbose = False
+        self._filter = None
+        # Hash über Kopfzeile und Einträge jeder Sektion beim letzten Aufruf von parse bzw. update
+        self._section_hashes = {}
+        # Gemeinsame StringTable aller PlacementTables, wird von parse neu angelegt
+        self.strings = StringTable()
+        # Abschnitte vor und nach der Memory Map, siehe get_blocks
+        self.blocks = MapfileBlocks(self.strings)
+        self._split_archives = False
+        self.stats = ParseStats()
+
+    @classmethod
+    def from_path(cls, path):
+        """Erzeugt einen Parser der das Map-File direkt von der Festplatte liest.
+
+        Das Map-File wird nicht in gänze eingelesen, sondern zeilenweise über einen gepufferten Iterator
+        verarbeitet. Der Speicherbedarf hängt damit nicht mehr von der Größe der Datei ab. Komprimierte Map-Files
+        und die Standardeingabe ("-") werden ebenfalls unterstützt, siehe open_mapfile.
+        """
+        return cls(path=path)
+
+    @staticmethod
+    def generator_lines(text):
+        """Ein Generator der den String text zeilenweise (inklusive Zeilenumbruch) zurückgibt ohne eine Kopie
+        des gesamten Strings anzulegen."""
+        start = 0
+        length = len(text)
+        while start < length:
+            end = text.find("\n", start)
+            if end < 0:
+                yield text[start:]
+                return
+            yield text[start : end + 1]
+            start = end + 1
+
+    def content_hash(self):
+        """Gibt einen Hash über den Inhalt des Map-Files zurück. Bei komprimierten Map-Files wird der Hash über
+        die komprimierte Datei gebildet. Die Standardeingabe lässt sich nur einmal lesen und hat keinen Hash."""
+        if self._path == STDIN:
+            raise ValueError("The content hash of stdin is not available")
+
+        digest = hashlib.blake2b(digest_size=20)
+        if self._path is not None:
+            with open(self._path, "rb") as fp:
+                for block in iter(lambda: fp.read(1 << 20), b""):
+                    digest.update(block)
+        else:
+            digest.update(self._mapfile.encode("utf-8"))
+        return digest.hexdigest()
+
+    @contextlib.contextmanager
+    def _open_source(self, stats=None):
+        """Öffnet das Map-File und liefert einen Iterator über dessen Zeilen, entweder aus der Datei oder aus
+        dem übergebenen String. Die Anzahl der gelesenen (entpackten) Bytes wird in stats gezählt, außer beim
+        Lesen von der Standardeingabe."""
+        if self._path is not None:
+            with open_mapfile(self._path) as binary:
+                # Dekodiert den Text wie open(path, "r")
+                fp = io.TextIOWrapper(binary)
+                try:
+                    yield fp
+                finally:
+                    if stats is not None and self._path != STDIN:
+                        stats.bytes_read += binary.tell()
+                    # Die Binärdatei wird von open_mapfile geschlossen
+                    fp.detach()
+        else:
+            yield self.generator_lines(self._mapfile)
+            if stats is not None:
+                stats.bytes_read += len(self._mapfile)
+
+    @staticmethod
+    def generator_top_level_lines(fp, block_size=1 << 20):
+        """Ein Generator der für jede Zeile der Datei fp die nicht mit einem Leerzeichen beginnt das Tuple
+        (Position, Zeile) liefert. fp ist eine Binärdatei oder eine Textdatei (z.B. io.StringIO), die Position
+        zählt entsprechend Bytes oder Zeichen.
+
+        Die Datei wird blockweise gelesen und mit einem regulären Ausdruck durchsucht. Die eingerückten Zeilen der
+        Einträge werden dabei nicht einzeln betrachtet.
+        """
+        block = fp.read(block_size)
+        binary = isinstance(block, bytes)
+        finditer = (RE_TOP_LEVEL_LINE_BYTES if binary else RE_TOP_LEVEL_LINE).finditer
+        # Der Rest beginnt immer mit dem Zeilenumbruch vor der ersten noch nicht durchsuchten Zeile, die erste Zeile
+        # der Datei erhält einen vorangestellten Zeilenumbruch an Position -1
+        newline = b"\n" if binary else "\n"
+        rest = newline
+        base = -1
+        while True:
+            if not block:
+                for matches in finditer(rest):
+                    line = matches[1]
+                    yield base + matches.start(1), line.decode("utf-8", "replace") if binary else line
+                return
+
+            block = rest + block
+            # Nur vollständige Zeilen durchsuchen, der Rest ab dem letzten Zeilenumbruch wird dem nächsten Block
+            # vorangestellt
+            end = block.rfind(newline)
+            for matches in finditer(block, 0, end):
+                line = matches[1]
+                yield base + matches.start(1), line.decode("utf-8", "replace") if binary else line
+            rest = block[end:]
+            base += end
+            block = fp.read(block_size)
+
+    @staticmethod
+    def generator_section_offsets(top_level_lines, accept_section=None, blocks=None, load_addresses=None):
+        """Ein Generator der aus den Zeilen von generator_top_level_lines die Sektionen der Memory Map bestimmt.
+
+        Liefert für jede Sektion das Tuple (Name, Adresse, Größe, Beginn, Ende). Beginn und Ende geben die Position
+        der Zeilen mit den Einträgen der Sektion an. Ende ist None wenn die Sektion bis zum Ende der Datei reicht.
+        Es werden dieselben Kopfzeilen erkannt wie von generator_tokenize, auch accept_section und load_addresses
+        werden gleich verwendet. Beginn und Ende der Memory Map werden in blocks (siehe MapfileBlocks) abgelegt.
+        """
+        in_memory_map = False
+        block = None
+        section = None
+        for offset, line in top_level_lines:
+            if not in_memory_map:
+                # Wie MapfileBlocks.read_preamble
+                heading = MapfileBlocks.heading(line)
+                if heading == "memory_map":
+                    in_memory_map = True
+                    if blocks is not None:
+                        blocks.map_start = offset + len(line) + 1
+                    continue
+                if heading is not None:
+                    block = heading
+                    continue
+                if not MapfileBlocks.starts_memory_map(line, block):
+                    if MapfileBlocks.ends_block(block, line):
+                        block = None
+                    continue
+                in_memory_map = True
+                if blocks is not None:
+                    blocks.map_start = offset
+
+            if section is not None:
+                yield (*section, offset)
+                section = None
+
+            if line.startswith("OUTPUT("):
+                if blocks is not None:
+                    blocks.map_end = offset + len(line) + 1
+                return
+
+            matches = None if line.startswith("LOAD") else RE_SECTION.match(line)
+            if matches is not None and (accept_section is None or accept_section(matches[1])):
+                if load_addresses is not None:
+                    MapfileParser._store_load_address(load_addresses, matches[1], line)
+                # Die Einträge beginnen nach dem Zeilenumbruch der Kopfzeile
+                section = (matches[1], int(matches[2], 16), int(matches[3], 16), offset + len(line) + 1)
+
+        if section is not None:
+            yield (*section, None)
+
+    def _scan_sections(self, accept_section=None, load_addresses=None):
+        """Bestimmt die Sektionen und die Position ihrer Einträge ohne die Einträge zu zerlegen. Die Abschnitte vor
+        und nach der Memory Map werden erst von get_blocks gelesen."""
+        self.blocks = MapfileBlocks(self.strings)
+        if self._path is not None:
+            with open_mapfile(self._path) as fp:
+                top_level_lines = self.generator_top_level_lines(fp)
+                yield from self.generator_section_offsets(top_level_lines, accept_section, self.blocks, load_addresses)
+                self.stats.bytes_read += fp.tell()
+        else:
+            top_level_lines = self.generator_top_level_lines(io.StringIO(self._mapfile))
+            yield from self.generator_section_offsets(top_level_lines, accept_section, self.blocks, load_addresses)
+            self.stats.bytes_read += len(self._mapfile)
+
+    @staticmethod
+    def _section_hash(address, size, chunk):
+        """Gibt den Hash über Adresse, Größe und Text der Einträge einer Sektion zurück, siehe update."""
+        digest = hashlib.blake2b(b"%x %x\n" % (address, size), digest_size=16)
+        digest.update(chunk if isinstance(chunk, bytes) else chunk.encode("utf-8"))
+        return digest.digest()
+
+    def _hash_sections(self, accept_section=None):
+        """Gibt die Hashes der Sektionen als Dictionary Name der Sektion -> Hash zurück, damit ein folgender
+        Aufruf von update die unveränderten Sektionen übernehmen kann. Das Map-File wird dazu ein weiteres Mal
+        gelesen, self.blocks und die gelesenen Bytes in self.stats bleiben unverändert."""
+        blocks, bytes_read = self.blocks, self.stats.bytes_read
+        try:
+            sections = list(self._scan_sections(accept_section))
+            return {section[0]: self._section_hash(section[1], section[2], chunk)
+                    for section, chunk in self._generator_section_chunks(sections)}
+        finally:
+            self.blocks, self.stats.bytes_read = blocks, bytes_read
+
+    def _read_section_lines(self, start, end):
+        """Gibt die Zeilen zwischen den Positionen start und end zurück."""
+        if self._path is None:
+            return self.generator_lines(self._mapfile[start:end])
+
+        # Bei komprimierten Map-Files wird dabei bis zur Position start entpackt
+        with open_mapfile(self._path) as fp:
+            fp.seek(start)
+            data = fp.read(-1 if end is None else end - start)
+        return self._chunk_lines(data)
+
+    def _chunk_lines(self, chunk):
+        """Gibt die Zeilen eines Ausschnitts des Map-Files zurück, chunk ist bei Dateien vom Typ bytes."""
+        if isinstance(chunk, str):
+            return self.generator_lines(chunk)
+        # Dekodiert den Text wie open(path, "r") in _open_source
+        return io.TextIOWrapper(io.BytesIO(chunk))
+
+    def _generator_section_chunks(self, sections):
+        """Ein Generator der zu jeder Sektion von _scan_sections das Tuple (Sektion, Text der Einträge) liefert. Bei
+        Dateien ist der Text vom Typ bytes. Die Datei wird dabei nur einmal geöffnet."""
+        if self._path is None:
+            for section in sections:
+                yield section, self._mapfile[section[3] : section[4]]
+            return
+
+        with open_mapfile(self._path) as fp:
+            for section in sections:
+                start, end = section[3:]
+                fp.seek(start)
+                yield section, fp.read(-1 if end is None else end - start)
 
     def extract_memory_map(self, mapfile):
         """Diese Funktion extrahiert den Abschnitt Memory Map aus dem Map-File.
@@ -18,13 +1043,20 @@ class MapfileParser:
 
         Die Funktion gibt drei Werte als Tuple zurück. Der erste Wert ist der Abschnitt vor der Überschrift "Linker script and memory map",
         der zweite ist die Memory Map selbst, der dritte  Abschnitt enthält alles was nach der Memory map folgt.
+        Fehlt eine der Überschriften in einem unvollständigen Map-File, ist der erste bzw. dritte Abschnitt leer.
         """
-        headline_regex = "Linker script and memory map\n\n|OUTPUT\(.*\)\n"
-        re_headline = re.compile(headline_regex)
-        splitted_content = re_headline.split(mapfile)
-        assert len(splitted_content) == 3
-
-        return splitted_content[0], splitted_content[1], splitted_content[2]
+        re_headline = re.compile(r"Linker script and memory map\n\n|OUTPUT\(.*\)\n")
+        start, end = 0, len(mapfile)
+        before, after = "", ""
+        for matches in re_headline.finditer(mapfile):
+            if matches.group().startswith("Linker"):
+                if matches.start() >= start:
+                    before, start = mapfile[: matches.start()], matches.end()
+            elif matches.start() >= start:
+                end, after = matches.start(), mapfile[matches.end() :]
+                break
+
+        return before, mapfile[start:end], after
 
     @staticmethod
     def siev_load_sections(sections):
@@ -126,6 +1158,21 @@ class MapfileParser:
         if last_placement != None:
             yield last_placement
 
+    @staticmethod
+    def split_reused_placements(placements):
+        """Wie generator_remove_reused_placements, gibt aber das Tuple (verbleibende Einträge, entfernte Einträge)
+        zurück. placements muss eine Liste sein."""
+        kept = []
+        reused = []
+        for placement, following in zip(placements, placements[1:]):
+            if placement[1] + placement[2] == following[1]:
+                kept.append(placement)
+            else:
+                reused.append(placement)
+        if placements:
+            kept.append(placements[-1])
+        return kept, reused
+
     @classmethod
     def generator_sections(cls, sections):
 
@@ -154,6 +1201,318 @@ class MapfileParser:
 
             yield (section_name, position, size, list(subsections_generator))
 
+    @staticmethod
+    def generator_text_blocks(lines, block_lines=8192):
+        """Ein Generator der jeweils block_lines Zeilen (inklusive Zeilenumbruch) zu einem Textblock zusammenfasst."""
+        lines = iter(lines)
+        while True:
+            block = "".join(itertools.islice(lines, block_lines))
+            if not block:
+                return
+            yield block
+
+    @staticmethod
+    def generator_tokenize(lines, in_section=False, accept_section=None, load_addresses=None, trailer=None):
+        """Ein Tokenizer der jede Zeile der Memory Map genau einmal klassifiziert.
+
+        Ersetzt die Kette split_regex -> generator_subsections -> generator_placements. Jede Zeile ist entweder
+        eine Kopfzeile einer Sektion, ein Selektor (z.B. " *(.text)"), ein Eintrag, eine Folgezeile mit Adresse
+        und Klassenname eines Eintrags, eine LOAD Zeile oder eine Leerzeile. Die Memory Map endet mit der Zeile
+        "OUTPUT(...)".
+
+        lines sind die Zeilen inklusive Zeilenumbruch oder der Text als String. Die Zeilen werden zu Textblöcken
+        zusammengefasst, in denen RE_TOKEN einen Eintrag samt Folgezeile mit einem einzigen Treffer erkennt. Nur
+        die übrigen Zeilen (Selektoren, Zuweisungen, Sonderfälle) werden einzeln klassifiziert.
+
+        Der Generator liefert für jede Kopfzeile ein Tuple (Name, Adresse, Größe) und für jeden Eintrag eine
+        Liste im Format von generator_placements. Zeilen die zu keiner Sektion gehören werden übersprungen.
+        Mit in_section=True beginnen die Zeilen innerhalb einer Sektion. Ist accept_section angegeben, werden nur
+        Sektionen zerlegt deren Name accept_section erfüllt, die Zeilen aller anderen Sektionen werden übersprungen.
+
+        Objektdateien und Klassennamen werden dabei interniert, gleiche Strings sind dasselbe Objekt. Das spart
+        Speicher bis zum Ablegen in der PlacementTable und beim Übertragen der Tokens aus den Prozessen des Pools.
+        Ist load_addresses ein Dictionary, wird darin die Ladeadresse jeder zerlegten Sektion abgelegt, die eine
+        besitzt. Ist trailer eine Liste, wird der nach der Zeile "OUTPUT(...)" bereits gelesene Text angehängt.
+        """
+        # Dictionary String -> String, gleiche Strings werden auf das erste Vorkommen abgebildet
+        intern = {}.setdefault
+        finditer = RE_TOKEN.finditer
+        search_top_level = RE_TOP_LEVEL_LINE.search
+        match_section = RE_SECTION.match
+        match_placement_fast = RE_PLACEMENT_LINE_FAST.match
+        match_placement = RE_PLACEMENT_LINE.match
+        match_address = RE_ADDRESS_LINE.match
+        match_name = RE_NAME_LINE.fullmatch
+        match_continuation = RE_CONTINUATION_LINE.match
+
+        # Eintrag der noch auf seine Folgezeile wartet
+        current = None
+        # Zeile mit dem Namen eines Eintrags der in der nächsten Zeile fortgesetzt wird
+        pending_name = None
+
+        blocks = (lines,) if isinstance(lines, str) else MapfileParser.generator_text_blocks(lines)
+        for text in blocks:
+            position = 0
+            while True:
+                if not in_section:
+                    # Die Zeilen außerhalb einer Sektion werden bis zur nächsten Kopfzeile übersprungen
+                    if position or not text[:1].strip():
+                        matches = search_top_level(text, position)
+                        if matches is None:
+                            break
+                        position = matches.start(1)
+
+                for matches in finditer(text, position):
+                    kind = matches.lastindex
+                    if kind == 2:
+                        # Eintrag mit Folgezeile, bzw. gefolgt vom nächsten Eintrag oder einer Kopfzeile
+                        if current is not None:
+                            yield current
+                            current = None
+                        pending_name = None
+
+                        _, _, name, address, size, objfile, named_address, named_size, named_objfile, address_2nd, \
+                            classinfo, _ = matches.groups()
+                        if address is None:
+                            address, size, objfile = named_address, named_size, named_objfile
+                        if address_2nd is None and classinfo is None:
+                            # Ohne Folgezeile
+                            yield [name, int(address, 16), int(size, 16), intern(objfile, objfile), "", ""]
+                        else:
+                            classinfo = classinfo or ""
+                            yield [name, int(address, 16), int(size, 16), intern(objfile, objfile), address_2nd or "",
+                                   intern(classinfo, classinfo)]
+                        continue
+
+                    if kind == 1:
+                        # Kopfzeile einer Sektion, LOAD Zeile oder das Ende der Memory Map
+                        line = matches[1]
+                        if current is not None:
+                            yield current
+                            current = None
+                        pending_name = None
+
+                        if line.startswith("OUTPUT("):
+                            if trailer is not None:
+                                trailer.append(text[matches.end() + 1 :])
+                            return
+
+                        section = None if line.startswith("LOAD") else match_section(line)
+                        in_section = section is not None and (accept_section is None or accept_section(section[1]))
+                        if in_section:
+                            if load_addresses is not None:
+                                MapfileParser._store_load_address(load_addresses, section[1], line)
+                            yield (section[1], int(section[2], 16), int(section[3], 16))
+                        else:
+                            position = matches.end()
+                            break
+                        continue
+
+                    # Alle anderen Zeilen einer Sektion einzeln
+                    line = matches[12]
+                    second = line[1:2]
+                    if second and not second.isspace():
+                        # Beginn eines Eintrags oder ein Selektor
+                        if current is not None:
+                            yield current
+                            current = None
+                        pending_name = None
+
+                        placement = match_placement_fast(line) or match_placement(line)
+                        if placement is None:
+                            if match_name(line):
+                                pending_name = line.strip()
+                            continue
+
+                        objfile = placement[4]
+                        current = [placement[1].strip() or "*empty*", int(placement[2], 16), int(placement[3], 16),
+                                   intern(objfile, objfile), "", ""]
+                        continue
+
+                    stripped = line.lstrip()
+                    if not stripped:
+                        continue
+
+                    if current is not None:
+                        # Folgezeile des vorherigen Eintrags
+                        continuation = match_continuation(stripped)
+                        current[4] = continuation[1] or ""
+                        classinfo = continuation[2]
+                        current[5] = intern(classinfo, classinfo)
+                        yield current
+                        current = None
+                        continue
+
+                    if not stripped.startswith("0x"):
+                        pending_name = None
+                        continue
+
+                    placement = match_address(line)
+                    if placement is None:
+                        pending_name = None
+                        continue
+
+                    # Einträge ohne Namen, z.B. "                0xc0000344        0x1 BYTE 0xaa", oder Einträge deren
+                    # Name in der vorherigen Zeile steht
+                    name = "*empty*" if pending_name is None else pending_name
+                    pending_name = None
+                    objfile = placement[3]
+                    current = [name, int(placement[1], 16), int(placement[2], 16), intern(objfile, objfile), "", ""]
+                else:
+                    break
+
+        if current is not None:
+            yield current
+
+    @staticmethod
+    def _store_load_address(load_addresses, section, line):
+        """Legt die Ladeadresse aus der Kopfzeile line der Sektion section in load_addresses ab."""
+        matches = RE_LOAD_ADDRESS.search(line)
+        if matches is not None:
+            load_addresses[section] = int(matches[1], 16)
+
+    @classmethod
+    def generator_sections_from_lines(cls, lines):
+        """Ein Generator der aus den Zeilen oder dem Text der Memory Map in einem Durchlauf die Sektionen erzeugt.
+
+        Liefert dieselben Einträge wie generator_sections, verwendet jedoch den Tokenizer generator_tokenize.
+        """
+        return cls.generator_sections_from_tokens(cls.generator_tokenize(lines))
+
+    @classmethod
+    def generator_sections_from_tokens(cls, tokens, stats=None, parse_filter=None, reused=None):
+        """Ein Generator der die Tokens von generator_tokenize zu Sektionen zusammenfasst. Die Anzahl der doppelt
+        verwendeten und daher entfernten Einträge wird in stats gezählt. Ist reused ein Dictionary, werden die
+        entfernten Einträge darin je Name der Sektion abgelegt.
+
+        Die Einträge werden erst nach dem Entfernen der doppelt verwendeten Einträge mit parse_filter gefiltert, da
+        dieses die Adressen benachbarter Einträge vergleicht.
+        """
+        filters_placements = parse_filter is not None and parse_filter.filters_placements
+
+        def section_result(section, placements):
+            result, removed = cls.split_reused_placements(placements)
+            if stats is not None:
+                stats.reused_placements += len(removed)
+            if filters_placements:
+                result = parse_filter.filter_placements(result)
+            if reused is not None:
+                reused[section[0]] = parse_filter.filter_placements(removed) if filters_placements else removed
+            return (*section, result)
+
+        section = None
+        placements = []
+
+        for token in tokens:
+            if type(token) is tuple:
+                if section is not None:
+                    yield section_result(section, placements)
+                section = token
+                placements = []
+            else:
+                placements.append(token)
+
+        if section is not None:
+            yield section_result(section, placements)
+
+    @staticmethod
+    def generator_split_offsets(data, start, end, chunk_size):
+        """Ein Generator der den Bereich start bis end von data (Text, Bytes oder mmap) in Bereiche (Beginn, Ende)
+        von mindestens chunk_size Zeichen zerlegt.
+
+        Getrennt wird nur vor dem Beginn eines Eintrags (siehe RE_ENTRY_START), so dass Einträge und ihre
+        Folgezeilen immer im selben Bereich liegen. Es werden nur die Zeichen nach den Trennstellen durchsucht.
+        """
+        search = (RE_ENTRY_START if isinstance(data, str) else RE_ENTRY_START_BYTES).search
+        while end - start > chunk_size:
+            matches = search(data, start + chunk_size, end)
+            if matches is None:
+                break
+            yield start, matches.start() + 1
+            start = matches.start() + 1
+        yield start, end
+
+    def generator_parallel_jobs(self, sections, chunk_size=1 << 20):
+        """Ein Generator der die Einträge der Sektionen von _scan_sections in Blöcke für _tokenize_job zerlegt.
+
+        Liefert je Block das Tuple (Kopfzeile, Block). Die Kopfzeile (Name, Adresse, Größe) steht nur beim ersten
+        Block einer Sektion, bei den weiteren Blöcken ist sie None. Große Sektionen werden mit
+        generator_split_offsets in Blöcke von etwa chunk_size Bytes zerlegt.
+
+        Bei nicht komprimierten Dateien ist der Block das Tuple (Pfad, Beginn, Ende) und wird vom Prozess des Pools
+        selbst gelesen. Die Trennstellen werden in einem mmap gesucht, so dass nur die Seiten um die Trennstellen
+        gelesen werden. Ansonsten ist der Block der Text der Einträge, bei komprimierten Dateien vom Typ bytes.
+        """
+        if not sections:
+            return
+
+        if self._path is not None:
+            with open_mapfile(self._path) as fp:
+                # open_mapfile gibt die Datei nur ohne Kompression als BufferedReader zurück
+                if isinstance(fp, io.BufferedReader):
+                    with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                        for name, address, size, start, end in sections:
+                            header = (name, address, size)
+                            end = len(data) if end is None else end
+                            for block_start, block_end in self.generator_split_offsets(data, start, end, chunk_size):
+                                yield header, (self._path, block_start, block_end)
+                                header = None
+                    return
+
+        for (name, address, size, _, _), chunk in self._generator_section_chunks(sections):
+            header = (name, address, size)
+            for start, end in self.generator_split_offsets(chunk, 0, len(chunk), chunk_size):
+                yield header, chunk[start:end]
+                header = None
+
+    @staticmethod
+    def tokenized_block(tokens, parse_filter=None):
+        """Legt die Tokens von generator_tokenize(in_section=True) für einen Block einer Sektion als TokenizedBlock
+        ab. Die doppelt verwendeten Einträge werden wie von split_reused_placements entfernt, danach wird wie in
+        generator_sections_from_tokens mit parse_filter gefiltert. Der letzte Eintrag bleibt außen vor."""
+        if not tokens:
+            return TokenizedBlock(PlacementTable(), PlacementTable(), 0, None, None)
+
+        kept, reused = MapfileParser.split_reused_placements(tokens)
+        # split_reused_placements behält den letzten Eintrag immer
+        kept.pop()
+        reused_count = len(reused)
+        if parse_filter is not None and parse_filter.filters_placements:
+            kept = parse_filter.filter_placements(kept)
+            reused = parse_filter.filter_placements(reused)
+
+        strings = StringTable()
+        return TokenizedBlock(PlacementTable.from_placements(kept, strings),
+                              PlacementTable.from_placements(reused, strings), reused_count, tokens[0][1], tokens[-1])
+
+    @staticmethod
+    def generator_measured(iterable, stats, stage):
+        """Ein Generator der die Elemente von iterable liefert und die Zeit für das Abholen jedes Elements in stats
+        unter stage addiert. Die Verarbeitung der Elemente außerhalb des Generators wird nicht mitgemessen."""
+        iterator = iter(iterable)
+        end = object()
+        while True:
+            with stats.measure(stage):
+                item = next(iterator, end)
+            if item is end:
+                return
+            yield item
+
+    @staticmethod
+    def generator_ordered_results(executor, function, jobs, window):
+        """Verteilt die Blöcke auf den Executor und gibt die Ergebnisse in der ursprünglichen Reihenfolge zurück.
+
+        Es werden höchstens window Blöcke gleichzeitig bearbeitet, damit nicht die ganze Datei im Speicher landet.
+        """
+        pending = collections.deque()
+        for job in jobs:
+            pending.append(executor.submit(function, job))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+
     @staticmethod
     def calculate_size_of_section_list(sec_list):
         size_fw = 0
@@ -165,6 +1524,9 @@ class MapfileParser:
 
     @staticmethod
     def calculate_size_of_placement_list(placements):
+        if isinstance(placements, PlacementTable):
+            return placements.total_size()
+
         size_placement = 0
         for i in placements:
             size = i[2]
@@ -175,22 +1537,75 @@ class MapfileParser:
     @staticmethod
     def helper_check_integrity(placements):
         """Diese Methode überprüft ob die Objekte nacheinander platziert wurden. Ist dies nicht der Fall gibt sie die
-        Objekte aus. Sie dient nur zum zweck des debuggings"""
-        placed_already = set()
-        prev = None
-        for i in placements:
+        Lücken und Überlappungen aus (siehe analyze_table). Sie dient nur zum zweck des debuggings"""
+        # Die Adresse in der nächsten Zeile wird für die Prüfung nicht benötigt
+        table = PlacementTable.from_placements([[*i[:4], "", i[5]] for i in placements])
+        if not len(table):
+            return
+
+        for issue in MapfileParser.analyze_table(None, table.addresses[0], 0, table, check_size=False):
+            if issue.kind in ("gap", "overlap"):
+                print("****")
+                print(issue)
+                print("----")
+
+    # Reihenfolge der Befunde an derselben Adresse
+    INTEGRITY_KINDS = ("size_mismatch", "gap", "overlap", "fill", "reused")
 
-            if prev != None:
-                calc_adr = prev[1] + prev[2]
-                act_adr = i[1]
+    @staticmethod
+    def analyze_table(section, address, size, table, reused=None, check_size=True):
+        """Untersucht die Einträge einer Sektion auf Lücken, Überlappungen und Füllbytes und gibt eine nach Adresse
+        sortierte Liste von IntegrityIssue zurück.
+
+        address und size beschreiben die Sektion, reused ist die PlacementTable der entfernten Einträge. Die
+        Differenzen zwischen den Startadressen und dem bisher größten Ende werden spaltenweise mit map und
+        itertools.accumulate berechnet, nur die Befunde selbst werden einzeln in Python erzeugt. Einträge der
+        Größe 0 belegen keinen Speicher und werden für Lücken und Überlappungen nicht betrachtet. Mit
+        check_size=False entfällt die Prüfung der Größe der Sektion.
+        """
+        strings = table.strings.strings
+        issues = []
+
+        rows = list(itertools.compress(range(len(table)), table.sizes))
+        addresses = table.addresses
+        if not all(map(operator.le, addresses, addresses[1:])):
+            rows.sort(key=addresses.__getitem__)
+        starts = array("Q", map(addresses.__getitem__, rows))
+        ends = array("Q", map(operator.add, starts, map(table.sizes.__getitem__, rows)))
+
+        # Größtes Ende aller vorherigen Einträge, für den ersten Eintrag der Beginn der Sektion
+        previous_ends = list(itertools.accumulate(itertools.chain((address,), ends), max))
+        differences = list(map(operator.sub, starts, previous_ends))
+        for index in itertools.compress(range(len(differences)), differences):
+            difference = differences[index]
+            row = rows[index]
+            if difference > 0:
+                issues.append(IntegrityIssue(section, "gap", previous_ends[index], difference, "", ""))
+            else:
+                overlap = min(previous_ends[index], ends[index]) - starts[index]
+                issues.append(IntegrityIssue(section, "overlap", starts[index], overlap, strings[table.names[row]],
+                                             strings[table.objfiles[row]]))
 
-                if act_adr != calc_adr:
-                    print("****")
-                    print(prev)
-                    print(i, act_adr - calc_adr)
-                    print("----")
+        # Lücke zwischen dem letzten Eintrag und dem Ende der Sektion
+        end = address + size
+        if previous_ends[-1] < end:
+            issues.append(IntegrityIssue(section, "gap", previous_ends[-1], end - previous_ends[-1], "", ""))
 
-            prev = i
+        fill = table.strings.index("*fill*")
+        if fill is not None:
+            for row in itertools.compress(range(len(table)), map(fill.__eq__, table.names)):
+                issues.append(IntegrityIssue(section, "fill", addresses[row], table.sizes[row], "*fill*",
+                                             strings[table.objfiles[row]]))
+
+        if reused is not None:
+            issues += (IntegrityIssue(section, "reused", i.address, i.size, i.name, i.objfile) for i in reused)
+
+        if check_size and size != table.total_size():
+            issues.append(IntegrityIssue(section, "size_mismatch", address, size - table.total_size(), "", ""))
+
+        kinds = MapfileParser.INTEGRITY_KINDS
+        issues.sort(key=lambda i: (i.address, kinds.index(i.kind)))
+        return issues
 
     def get_section_list(self, ignores=set()):
         """Gibt einer Liste aller Sektionen zurück die gefunden wurden. Das Argument ignores kann verwendetet werden
@@ -203,6 +1618,179 @@ class MapfileParser:
 
         return section_list
 
+    def get_blocks(self):
+        """Gibt die Abschnitte vor und nach der Memory Map als MapfileBlocks zurück.
+
+        Nach parse(lazy=True) bzw. update werden sie beim ersten Aufruf gelesen, die Memory Map wird dabei
+        übersprungen.
+        """
+        blocks = self.blocks
+        if blocks.map_start is not None:
+            start, end = blocks.map_start, blocks.map_end
+            blocks.map_start = blocks.map_end = None
+            blocks.read_preamble(self._read_section_lines(0, start))
+            if end is not None:
+                blocks.read_trailer(self._read_section_lines(end, None))
+        return blocks
+
+    # Sektionen ohne Speicher im Ziel (nicht allokiert), sie stehen im Map-File an Adresse 0
+    NON_ALLOC_SECTIONS = (".comment", ".debug", ".stab", ".ARM.attributes", ".gnu.attributes", ".line")
+
+    def get_memory_regions(self):
+        """Gibt die Belegung der Speicherbereiche aus "Memory Configuration" als Liste von RegionUsage zurück.
+
+        Eine Sektion belegt den Speicherbereich ihrer Adresse und, falls sie eine abweichende Ladeadresse hat,
+        zusätzlich den Speicherbereich der Ladeadresse (z.B. die Initialwerte von .data im Flash). Der Bereich
+        *default* und nicht allokierte Sektionen an Adresse 0 (NON_ALLOC_SECTIONS) werden nicht berücksichtigt.
+        """
+        placed = []
+        for name, info in self._sec_dict.items():
+            if info["address"] == 0 and name.startswith(self.NON_ALLOC_SECTIONS):
+                continue
+            placed.append((info["address"], info["size"]))
+            load_address = info.get("load_address")
+            if load_address is not None and load_address != info["address"]:
+                placed.append((load_address, info["size"]))
+
+        result = []
+        for region in self.get_blocks().memory_regions:
+            if region.name == "*default*":
+                continue
+            end = region.origin + region.length
+            used = sum(size for address, size in placed if region.origin <= address < end)
+            utilization = used / region.length if region.length else 0.0
+            result.append(RegionUsage(region.name, region.origin, region.length, used, region.length - used,
+                                      utilization))
+        return result
+
+    def get_placements(self, section):
+        """Gibt die PlacementTable der Sektion section zurück.
+
+        Wurde das Map-File mit parse(lazy=True) eingelesen, werden die Einträge der Sektion beim ersten Aufruf
+        zerlegt. Das Map-File darf sich bis dahin nicht verändern.
+        """
+        info = self._sec_dict[section]
+        if info["placements"] is None:
+            start, end = self._offsets.pop(section)
+            lines = self._read_section_lines(start, end)
+            info["placements"], info["reused"] = self._tokenize_section(section, info["size"], lines)
+        return info["placements"]
+
+    def get_reused_placements(self, section):
+        """Gibt die PlacementTable der von generator_remove_reused_placements entfernten Einträge der Sektion
+        section zurück."""
+        self.get_placements(section)
+        return self._sec_dict[section]["reused"]
+
+    def load_section_tokens(self, section, tokens):
+        """Legt die Einträge der Sektion section aus den Tokens von generator_tokenize(in_section=True) ab und gibt
+        die PlacementTable zurück.
+
+        Für Sektionen die nach parse(lazy=True) außerhalb des Parsers zerlegt wurden, z.B. von
+        mapfile_async.AsyncMapfileParser in einem Executor.
+        """
+        info = self._sec_dict[section]
+        self._offsets.pop(section, None)
+        info["placements"], info["reused"] = self._tables_from_tokens(section, info["size"], tokens)
+        return info["placements"]
+
+    def iter_unparsed_chunks(self):
+        """Ein Generator der nach parse(lazy=True) für jede noch nicht zerlegte Sektion das Tuple (Name der Sektion,
+        Text der Einträge) liefert. Bei Dateien ist der Text vom Typ bytes, die Datei wird nur einmal geöffnet."""
+        sections = [(name, None, None, start, end) for name, (start, end) in self._offsets.items()]
+        for section, chunk in self._generator_section_chunks(sections):
+            yield section[0], chunk
+
+    def _tokenize_section(self, section, size, lines):
+        """Zerlegt die Zeilen mit den Einträgen einer Sektion und gibt die Tabellen von _build_table zurück."""
+        with self.stats.measure("tokenize"):
+            tokens = list(self.generator_tokenize(lines, in_section=True))
+        return self._tables_from_tokens(section, size, tokens)
+
+    def _tables_from_tokens(self, section, size, tokens):
+        """Entfernt die doppelt verwendeten Einträge, filtert und gibt die Tabellen von _build_table zurück."""
+        placements, reused = self.split_reused_placements(tokens)
+        self.stats.reused_placements += len(reused)
+        if self._filter is not None and self._filter.filters_placements:
+            placements = self._filter.filter_placements(placements)
+            reused = self._filter.filter_placements(reused)
+        return self._build_table(section, size, placements, reused)
+
+    def iter_placement_tables(self):
+        """Ein Generator der für jede Sektion das Tuple (Name der Sektion, PlacementTable) liefert."""
+        for name in self._sec_dict:
+            yield name, self.get_placements(name)
+
+    # Funktionen die aus einer Objektdatei den Schlüssel der Gruppierung in aggregate bestimmen
+    GROUP_KEYS = {
+        "objfile": lambda objfile, depth: objfile,
+        "archive": lambda objfile, depth: split_archive(objfile)[0],
+        "directory": path_prefix,
+    }
+
+    def aggregate(self, group_by="objfile", depth=1, top=None, sections=None):
+        """Fasst die Größe und Anzahl der Einträge nach einem Schlüssel zusammen.
+
+        group_by ist "section", "archive" (der Teil "lib.a" von "lib.a(obj.o)", leer für Objektdateien ohne
+        Archiv), "objfile" oder "directory" (die ersten depth Verzeichnisse der Objektdatei). Mit sections lässt
+        sich die Auswertung auf bestimmte Sektionen beschränken. Gibt eine Liste von Group Tuples absteigend nach
+        Größe sortiert zurück, mit top nur die top größten. Wurde mit parse(split_archives=True) gelesen, wird bei
+        "archive" die Spalte archives verwendet.
+        """
+        sizes = collections.defaultdict(int)
+        counts = collections.defaultdict(int)
+
+        for section in self._sec_dict:
+            if sections is not None and section not in sections:
+                continue
+
+            table = self.get_placements(section)
+            if group_by == "section":
+                sizes[section] += table.total_size()
+                counts[section] += len(table)
+                continue
+
+            # Ein Durchlauf über die Spalten summiert je Objektdatei. Der Schlüssel wird danach nur noch einmal je
+            # Objektdatei bestimmt.
+            group_key = self.GROUP_KEYS[group_by]
+            column = table.objfiles
+            if group_by == "archive" and table.archives is not None:
+                column = table.archives
+                group_key = self.GROUP_KEYS["objfile"]
+
+            objfile_sizes = collections.defaultdict(int)
+            objfile_counts = collections.Counter(column)
+            for objfile, size in zip(column, table.sizes):
+                objfile_sizes[objfile] += size
+
+            strings = table.strings.strings
+            for objfile, size in objfile_sizes.items():
+                key = group_key(strings[objfile], depth)
+                sizes[key] += size
+                counts[key] += objfile_counts[objfile]
+
+        groups = (Group(key, size, counts[key]) for key, size in sizes.items())
+        if top is not None:
+            return heapq.nlargest(top, groups, key=lambda i: i.size)
+        return sorted(groups, key=lambda i: i.size, reverse=True)
+
+    def nbytes(self):
+        """Geschätzter Speicherbedarf aller zerlegten Sektionen und der Abschnitte vor und nach der Memory Map (siehe
+        get_blocks) in Bytes. Gemeinsame StringTables werden nur einmal gezählt."""
+        tables = [i["placements"] for i in self._sec_dict.values() if i["placements"] is not None]
+        tables += [i["reused"] for i in self._sec_dict.values() if i["reused"] is not None]
+        string_tables = {id(i.strings): i.strings for i in tables}
+        string_tables[id(self.blocks.discarded.strings)] = self.blocks.discarded.strings
+        return sum(i.nbytes(include_strings=False) for i in tables) + self.blocks.nbytes() + sum(
+            i.nbytes() for i in string_tables.values())
+
+    def build_address_index(self):
+        """Erzeugt einen AddressIndex über alle Einträge. Muss nach parse aufgerufen werden."""
+        return AddressIndex(self.iter_placement_tables())
+
+    # Spalten einer Zeile von get_class_info
+    CLASS_INFO_COLUMNS = ["status", "classinfo", "address", "size", "section", "objfile", "name"]
+
     def get_class_info(self):
         """ Return readable info of every placement as List.
 
@@ -215,69 +1803,498 @@ class MapfileParser:
         6. objname
         
         """
-        result = []
+        return list(self.generator_class_info())
+
+    def generator_class_info(self):
+        """Ein Generator der die Zeilen von get_class_info einzeln liefert, ohne die gesamte Liste anzulegen."""
+        # Status und Objektdatei hängen nur vom String ab und werden je StringTable einmal bestimmt. Die Tabellen
+        # eines Aufrufs von parse teilen sich eine StringTable.
+        lookups = {}
+        for section, table in self.iter_placement_tables():
+            strings = table.strings.strings
+            lookup = lookups.get(id(table.strings))
+            if lookup is None or len(lookup[0]) != len(strings):
+                lookup = lookups[id(table.strings)] = (
+                    ['"MISSING_CLASSINFO"' if i == "" else None for i in strings],
+                    ["" if i == "00" else i for i in strings],
+                )
+            classinfo_status, objfiles = lookup
 
-        for section, info in self._sec_dict.items():
-            for placement in info["placements"]:
-                classinfo = placement[5]
-                size = placement[2]
-                address = placement[1]
-                objfile = placement[3]
-                objname = placement[0]
+            columns = zip(table.names, table.addresses, table.sizes, table.objfiles, table.addresses_2nd,
+                          table.has_addresses_2nd, table.classinfos)
+            for name, address, size, objfile, address_2nd, has_address_2nd, classinfo in columns:
+                status = classinfo_status[classinfo]
+                if status is None:
+                    status = '"ALTERNATE_CLASSINFO"' if has_address_2nd and address != address_2nd else ""
 
-                address2nd = placement[4]
-                status=""
-                if (address2nd != ""):
+                yield [status, strings[classinfo], address, size, section, objfiles[objfile], strings[name]]
 
-                    address_2nd_int = int(address2nd,16)
+    # Spalten einer Zeile von analyze_integrity
+    INTEGRITY_COLUMNS = list(IntegrityIssue._fields)
 
-                    if address != address_2nd_int:
-                        status = "\"ALTERNATE_CLASSINFO\""
-                        #classinfo = ""
+    def analyze_integrity(self, sections=None):
+        """Gibt die IntegrityIssue aller Sektionen (bzw. der Sektionen in sections) in der Reihenfolge des Map-Files
+        zurück, siehe analyze_table. Wurden Einträge mit einem ParseFilter verworfen, entfällt die Prüfung der
+        Größe der Sektionen."""
+        return list(self.generator_integrity(sections))
 
-                if classinfo == "":
-                    status = "\"MISSING_CLASSINFO\""
-                
-                if objfile == "00":
-                    objfile =""
+    def generator_integrity(self, sections=None):
+        """Ein Generator der die Befunde von analyze_integrity Sektion für Sektion liefert."""
+        check_size = self._filter is None or not self._filter.filters_placements
+        for name, info in self._sec_dict.items():
+            if sections is not None and name not in sections:
+                continue
+            table = self.get_placements(name)
+            yield from self.analyze_table(name, info["address"], info["size"], table, info["reused"], check_size)
 
-                result.append([status, classinfo, address, size, section, objfile, objname])
-        return result
+    def iter_sections(self, stats=None, parse_filter=None, reused=None, load_addresses=None):
+        """Ein Generator der die Sektionen des Map-Files nacheinander liefert.
 
-    def parse(self):
+        Das Map-File wird dabei zeilenweise gelesen und jede Zeile nur einmal klassifiziert. Es befindet sich
+        immer nur eine Sektion im Speicher. Die Einträge entsprechen denen von generator_sections.
 
-        # Extrahiere die Memory Map aus dem Map-file.
-        _, placement, _ = self.extract_memory_map(self._mapfile)
+        Wird eine ParseStats übergeben, werden darin die gelesenen Bytes und die entfernten Einträge gezählt. Mit
+        parse_filter (siehe ParseFilter) werden nur die passenden Sektionen zerlegt und Einträge verworfen. Zu reused
+        siehe generator_sections_from_tokens, zu load_addresses siehe iter_tokens.
+        """
+        accept_section = None if parse_filter is None else parse_filter.accepts_section
+        tokens = self.iter_tokens(stats, accept_section, load_addresses)
+        yield from self.generator_sections_from_tokens(tokens, stats, parse_filter, reused)
 
-        sections = MapfileParser.split_sections(placement)
+    def iter_tokens(self, stats=None, accept_section=None, load_addresses=None):
+        """Ein Generator der die Tokens von generator_tokenize für das gesamte Map-File liefert.
 
-        sections_generator = MapfileParser.generator_sections(sections)
+        Die Abschnitte vor und nach der Memory Map werden im selben Durchlauf in self.blocks gelesen (siehe
+        MapfileBlocks), die Ladeadressen der Sektionen in load_addresses.
+        """
+        self.blocks = blocks = MapfileBlocks(self.strings)
+        with self._open_source(stats) as lines:
+            lines = blocks.read_preamble(lines)
+
+            # Der Tokenizer liest die Zeilen blockweise, der Rest des Blocks mit "OUTPUT(...)" steht in trailer
+            trailer = []
+            yield from self.generator_tokenize(lines, accept_section=accept_section, load_addresses=load_addresses,
+                                               trailer=trailer)
+            lines = itertools.chain(self.generator_lines("".join(trailer)), lines)
+
+            # Der Tokenizer endet nach der Zeile "OUTPUT(...)", es folgen die restlichen Abschnitte
+            blocks.read_trailer(lines)
+
+    def iter_section_tables(self, workers=None, chunk_size=1 << 20, parse_filter=None, load_addresses=None):
+        """Ein Generator der für jede Sektion das Tuple (Name, Adresse, Größe, PlacementTable, PlacementTable der
+        entfernten Einträge) liefert, siehe _build_table. Verwendet die StringTable self.strings und zählt in
+        self.stats.
+
+        Ist workers größer als 1, bestimmt dieser Prozess nur die Position der Sektionen (siehe _scan_sections)
+        und verteilt ihre Einträge in Blöcken von etwa chunk_size Bytes auf einen Pool mit workers Prozessen
+        (siehe generator_parallel_jobs). Die Prozesse lesen und zerlegen die Blöcke und geben die Einträge
+        spaltenweise zurück, hier werden die Tabellen nur noch aneinander gehängt. Die Sektionen werden trotzdem in
+        der Reihenfolge des Map-Files zurückgegeben. Die Abschnitte vor und nach der Memory Map werden danach von
+        get_blocks gelesen. Die Standardeingabe lässt sich nur einmal lesen und wird immer in diesem Prozess
+        zerlegt.
+        """
+        if workers is None or workers <= 1 or self._path == STDIN:
+            reused = {}
+            sections = self.iter_sections(self.stats, parse_filter, reused, load_addresses)
+            # Das Lesen und Zerlegen findet im Generator statt und wird beim Abholen der nächsten Sektion gemessen
+            for section_name, section_address, section_size, placements in self.generator_measured(
+                    sections, self.stats, "tokenize"):
+                yield (section_name, section_address, section_size,
+                       *self._build_table(section_name, section_size, placements, reused.pop(section_name)))
+            return
+
+        sections = self._iter_parallel_tables(workers, chunk_size, parse_filter, load_addresses, self.strings,
+                                              self.stats)
+        for section_name, section_address, section_size, table, reused_table in sections:
+            if self._split_archives:
+                table.split_archives()
+                reused_table.split_archives()
+            self._check_table(section_name, section_size, table)
+            yield section_name, section_address, section_size, table, reused_table
+
+    def _iter_parallel_tables(self, workers, chunk_size, parse_filter, load_addresses, strings, stats):
+        """Zerlegt die Sektionen wie iter_section_tables mit workers > 1, ohne die Größe der Sektionen zu prüfen."""
+        accept_section = None if parse_filter is None else parse_filter.accepts_section
+        accept_placement = None
+        if parse_filter is not None and parse_filter.filters_placements:
+            accept_placement = parse_filter.accepts_placement
+
+        with stats.measure("scan"):
+            sections = list(self._scan_sections(accept_section, load_addresses))
+
+        def append_last(last, following_address):
+            # Ordnet den letzten Eintrag eines Blocks wie split_reused_placements ein
+            is_reused = following_address is not None and last[1] + last[2] != following_address
+            stats.reused_placements += is_reused
+            if accept_placement is None or accept_placement(last):
+                (reused_table if is_reused else table).append(last)
+
+        job_function = functools.partial(_tokenize_job, parse_filter=parse_filter)
+        jobs = self.generator_parallel_jobs(sections, chunk_size)
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            header = last = None
+            results = self.generator_ordered_results(executor, job_function, jobs, 2 * workers)
+            # Die Wartezeit auf die Prozesse des Pools zählt als Zerlegen
+            for block_header, block in self.generator_measured(results, stats, "tokenize"):
+                if block_header is not None:
+                    if header is not None:
+                        if last is not None:
+                            append_last(last, None)
+                        yield (*header, table, reused_table)
+                    header, last = block_header, None
+                    table, reused_table = PlacementTable(strings), PlacementTable(strings)
+
+                if block.first_address is not None:
+                    if last is not None:
+                        append_last(last, block.first_address)
+                    last = block.last
+                with stats.measure("tables"):
+                    # Beide Tabellen des Blocks teilen sich eine StringTable
+                    mapping = strings.intern_many(block.placements.strings.strings)
+                    table.extend_table(block.placements, mapping)
+                    reused_table.extend_table(block.reused, mapping)
+                stats.reused_placements += block.reused_count
+
+            if header is not None:
+                if last is not None:
+                    append_last(last, None)
+                yield (*header, table, reused_table)
+
+    def iter_placements(self, workers=None, parse_filter=None):
+        """Ein Generator der jeden Eintrag als Tuple (Name der Sektion, Eintrag) liefert.
+
+        Wurde das Map-File bereits mit parse oder update gelesen, stammen die Einträge (Placement) aus den
+        PlacementTables, workers und parse_filter werden dann nicht verwendet und das Map-File wird nicht erneut
+        gelesen, auch wenn der Filter von parse alle Sektionen ausgeschlossen hat. Andernfalls wird das Map-File
+        einmal durchlaufen, ohne die Einträge einer Sektion zu sammeln. Die Einträge haben dann das Format von
+        generator_placements.
+        Mit workers > 1 werden die Sektionen wie von iter_section_tables auf mehrere Prozesse verteilt, die
+        Einträge sind dann ebenfalls vom Typ Placement.
+        """
+        if self._parsed:
+            for section, table in self.iter_placement_tables():
+                for placement in table:
+                    yield section, placement
+            return
+
+        if workers is not None and workers > 1 and self._path != STDIN:
+            # Die Einträge werden nicht im Parser abgelegt und verwenden daher eine eigene StringTable
+            tables = self._iter_parallel_tables(workers, 1 << 20, parse_filter, None, StringTable(), ParseStats())
+            for section, _, _, table, _ in tables:
+                for placement in table:
+                    yield section, placement
+            return
+
+        accept_section = None if parse_filter is None else parse_filter.accepts_section
+        accept_placement = None
+        if parse_filter is not None and parse_filter.filters_placements:
+            accept_placement = parse_filter.accepts_placement
+
+        # Die Tokens werden nach Sektionen gruppiert, der Zähler unterscheidet aufeinander folgende Sektionen mit
+        # gleichem Namen
+        counter = itertools.count()
+        current = None
+
+        def section_key(token):
+            nonlocal current
+            if type(token) is tuple:
+                current = (next(counter), token[0])
+            return current
+
+        tokens = self.iter_tokens(accept_section=accept_section)
+        for (_, section), group in itertools.groupby(tokens, section_key):
+            placements = (i for i in group if type(i) is not tuple)
+            for placement in self.generator_remove_reused_placements(placements):
+                if accept_placement is None or accept_placement(placement):
+                    yield section, placement
 
-        self._sec_dict = {}
-        for *section, placements in sections_generator:
-            section_name = section[0]
-            section_address = section[1]
-            section_size = section[2]
+    @staticmethod
+    def _as_placement(placement):
+        """Wandelt einen Eintrag im Format von generator_placements in ein Placement."""
+        if isinstance(placement, Placement):
+            return placement
+        name, address, size, objfile, address_2nd, classinfo = placement
+        return Placement(name, address, size, objfile, int(address_2nd, 16) if address_2nd else None, classinfo)
+
+    def top(self, n, per_section=False, group_by=None, depth=1, workers=None, parse_filter=None):
+        """Gibt die n größten Einträge zurück, ohne alle Einträge im Speicher zu halten.
+
+        Die Einträge stammen aus iter_placements. Ohne group_by wird eine Liste von RankedPlacement absteigend
+        nach Größe zurückgegeben, mit group_by ("objfile", "archive" oder "directory", siehe aggregate) eine Liste
+        der n größten Group Tuples. Mit per_section=True wird je Sektion gerankt und ein Dictionary Name der
+        Sektion -> Liste zurückgegeben. Für die Einträge werden nur Heaps mit n Elementen verwendet, bei group_by
+        wird je Objektdatei eine Summe gebildet.
+        """
+        placements = self.iter_placements(workers, parse_filter)
+
+        if group_by is not None:
+            group_key = self.GROUP_KEYS[group_by]
+            sizes = collections.defaultdict(int)
+            counts = collections.defaultdict(int)
+            for section, placement in placements:
+                key = (section if per_section else None, placement[3])
+                sizes[key] += placement[2]
+                counts[key] += 1
+
+            groups = collections.defaultdict(lambda: collections.defaultdict(lambda: [0, 0]))
+            for (section, objfile), size in sizes.items():
+                group = groups[section][group_key(objfile, depth)]
+                group[0] += size
+                group[1] += counts[section, objfile]
+
+            result = {
+                section: heapq.nlargest(n, (Group(key, *i) for key, i in section_groups.items()),
+                                        key=lambda i: i.size)
+                for section, section_groups in groups.items()
+            }
+            return result if per_section else result.get(None, [])
+
+        if not per_section:
+            ranked = heapq.nlargest(n, placements, key=lambda i: i[1][2])
+            return [RankedPlacement(section, self._as_placement(i)) for section, i in ranked]
+
+        # Je Sektion ein Heap mit den n größten Einträgen. Die laufende Nummer entscheidet bei gleicher Größe für
+        # den früheren Eintrag, wie bei heapq.nlargest.
+        heaps = collections.defaultdict(list)
+        for order, (section, placement) in enumerate(placements):
+            heap = heaps[section]
+            item = (placement[2], -order, placement)
+            if len(heap) < n:
+                heapq.heappush(heap, item)
+            elif heap and item > heap[0]:
+                heapq.heapreplace(heap, item)
+
+        return {
+            section: [RankedPlacement(section, self._as_placement(i[2])) for i in sorted(heap, reverse=True)]
+            for section, heap in heaps.items()
+        }
+
+    def _build_table(self, section_name, section_size, placements, reused=()):
+        """Legt die Einträge einer Sektion in einer PlacementTable ab und prüft die Größe der Sektion. Gibt das
+        Tuple (PlacementTable der Einträge, PlacementTable der entfernten Einträge reused) zurück."""
+        with self.stats.measure("tables"):
+            table = PlacementTable.from_placements(placements, self.strings, self._split_archives)
+            reused_table = PlacementTable.from_placements(reused, self.strings, self._split_archives)
+
+        self._check_table(section_name, section_size, table)
+        return table, reused_table
+
+    def _check_table(self, section_name, section_size, table):
+        """Vergleicht die Größe der Sektion mit der Summe ihrer Einträge und zählt die Einträge in self.stats."""
+        stats = self.stats
+        calculated_size = table.total_size()
+        # Wurden Einträge gefiltert, stimmt die Summe nicht mehr mit der Größe der Sektion überein
+        filtered = self._filter is not None and self._filter.filters_placements
+        if not filtered and section_size != calculated_size:
+            stats.size_mismatches += 1
+            logging.error(
+                "Section size is not equal to calculated size {section_name:%s, section_size:%i, calculated_size:%i}",
+                section_name,
+                section_size,
+                calculated_size,
+            )
 
-            logging.info("Going through section: %s", section_name)
+        if self._verbose:
+            logging.debug("Placements %s", list(table))
 
-            # MapfileParser.helper_check_integrity(placements)
+        stats.placements += len(table)
 
-            calculated_size = MapfileParser.calculate_size_of_placement_list(placements)
+    @staticmethod
+    def _is_cache_entry(value):
+        """Prüft ob value den Aufbau eines Eintrags hat den parse im Cache ablegt, das Tuple (_sec_dict, blocks)."""
+        if not isinstance(value, tuple) or len(value) != 2:
+            return False
+        sec_dict, blocks = value
+        if not isinstance(sec_dict, dict) or not isinstance(blocks, MapfileBlocks):
+            return False
+        return all(isinstance(i, dict) and isinstance(i.get("placements"), PlacementTable)
+                   and isinstance(i.get("reused"), PlacementTable) for i in sec_dict.values())
+
+    def parse(self, workers=None, cache=None, verbose=False, lazy=False, parse_filter=None, split_archives=False):
+        """Liest das Map-File ein. Mit workers > 1 werden die Sektionen parallel auf mehreren Prozessen zerlegt.
+
+        Wird ein cache (siehe mapfile_cache.MapfileCache) übergeben, wird das Ergebnis eines früheren Aufrufs mit
+        identischem Map-File aus dem Cache geladen, anstatt das Map-File erneut zu zerlegen.
+
+        Mit lazy=True werden nur die Kopfzeilen der Sektionen und die Position ihrer Einträge bestimmt. Die
+        Einträge einer Sektion werden erst beim ersten Zugriff über get_placements zerlegt. workers und cache
+        werden in diesem Fall nicht verwendet, da das Suchen der Kopfzeilen schneller ist als das Laden aus dem
+        Cache. Die Standardeingabe lässt sich nur einmal lesen und wird daher weder lazy noch mit Cache gelesen.
+
+        Mit parse_filter (siehe ParseFilter) werden nur die ausgewählten Sektionen und Einträge gelesen. Die Prüfung
+        der Größe einer Sektion entfällt wenn Einträge gefiltert werden.
+
+        Namen, Objektdateien und Klassennamen aller Sektionen werden in der StringTable self.strings abgelegt. Mit
+        split_archives=True werden die Objektdateien zusätzlich in Archiv und Member aufgeteilt (siehe
+        PlacementTable.split_archives).
+
+        Die übrigen Abschnitte des Map-Files (Memory Configuration, Discarded input sections, Cross Reference Table
+        usw.) werden im selben Durchlauf gelesen, siehe get_blocks. Fehlen die Überschriften in einem
+        unvollständigen Map-File, beginnt die Memory Map mit der ersten LOAD Zeile bzw. Kopfzeile einer Sektion.
+
+        Damit ein folgender Aufruf von update die unveränderten Sektionen übernimmt, wird je Sektion ein Hash
+        angelegt (nicht mit lazy=True und bei der Standardeingabe).
+
+        Laufzeiten und Zähler stehen danach in self.stats. Die Einträge jeder Sektion werden nur mit verbose=True
+        ins Log geschrieben, da die Formatierung bei großen Map-Files länger dauert als das Zerlegen selbst.
+        """
+        self.stats = stats = ParseStats()
+        self.strings = StringTable()
+        self._verbose = verbose
+        self._filter = parse_filter
+        self._split_archives = split_archives
+        self._offsets = {}
+        self._section_hashes = {}
+        self._parsed = True
+        accept_section = None if parse_filter is None else parse_filter.accepts_section
+
+        if self._path == STDIN:
+            lazy = False
+            cache = None
+
+        if lazy:
+            self._sec_dict = {}
+            load_addresses = {}
+            with stats.measure("scan"):
+                sections = self._scan_sections(accept_section, load_addresses)
+                for section_name, section_address, section_size, start, end in sections:
+                    stats.sections += 1
+                    self._offsets[section_name] = (start, end)
+                    self._sec_dict[section_name] = {
+                        "address": section_address,
+                        "size": section_size,
+                        "load_address": load_addresses.get(section_name),
+                        "placements": None,
+                        "reused": None,
+                    }
+            return
+
+        if cache is not None:
+            with stats.measure("hash"):
+                key = self.content_hash()
+                if parse_filter is not None:
+                    key += "-" + parse_filter.key()
+                if split_archives:
+                    key += "-split"
+            with stats.measure("cache_load"):
+                cached = cache.load(key)
+            if cached is not None and not self._is_cache_entry(cached):
+                logging.warning("Discarding cache entry %s with unexpected content", key)
+                cache.discard(key)
+                cached = None
+            if cached is not None:
+                with stats.measure("hash"):
+                    self._section_hashes = self._hash_sections(accept_section)
+                sec_dict, self.blocks = cached
+                self._sec_dict = sec_dict
+                # Alle Tabellen im Cache teilen sich eine StringTable, sie wird für update weiter verwendet
+                self.strings = next((i["placements"].strings for i in sec_dict.values()), self.strings)
+                stats.cache_hits += 1
+                stats.sections = len(sec_dict)
+                stats.placements = sum(len(i["placements"]) for i in sec_dict.values())
+                return
 
-            if section_size != calculated_size:
-                logging.error(
-                    "Section size is not equal to calculated size {section_name:%s, section_size:%i, calculated_size:%i}",
-                    section_name,
-                    section_size,
-                    calculated_size,
-                )
-                logging.debug("Placements: %s", placements)
+        self._sec_dict = {}
+        load_addresses = {}
+        sections = self.iter_section_tables(workers, parse_filter=parse_filter, load_addresses=load_addresses)
+        for section_name, section_address, section_size, table, reused_table in sections:
+            logging.info("Going through section: %s", section_name)
 
-            logging.info("Placements %s", placements)
+            stats.sections += 1
             self._sec_dict[section_name] = {
                 "address": section_address,
                 "size": section_size,
-                "placements": placements,
+                "load_address": load_addresses.get(section_name),
+                "placements": table,
+                "reused": reused_table,
             }
 
+        # Nach dem parallelen Zerlegen sind die Abschnitte vor und nach der Memory Map noch nicht gelesen
+        self.get_blocks()
+
+        if self._path != STDIN:
+            with stats.measure("hash"):
+                self._section_hashes = self._hash_sections(accept_section)
+
+        if cache is not None:
+            with stats.measure("cache_store"):
+                cache.store(key, (self._sec_dict, self.blocks))
+
+
+    def update(self, mapfile=None, path=None, parse_filter=None):
+        """Liest eine neue Version des Map-Files ein und zerlegt dabei nur die Sektionen die sich geändert haben.
+
+        mapfile bzw. path geben die neue Version an, ohne beides wird die bisherige Datei erneut gelesen. Je
+        Sektion wird ein Hash über Kopfzeile und Einträge gebildet. Stimmt er mit dem Hash beim letzten Aufruf von
+        parse bzw. update überein, wird die PlacementTable übernommen. parse legt die Hashes in einem weiteren
+        Durchlauf über das Map-File an, außer mit lazy=True. Ohne Hashes werden alle Sektionen zerlegt. Ohne
+        parse_filter wird der Filter des letzten Aufrufs verwendet.
+
+        Neu zerlegte Sektionen verwenden die StringTable der übernommenen Tabellen. Strings die nur in früheren
+        Versionen vorkamen bleiben darin erhalten, bis alle Sektionen neu zerlegt werden.
+
+        Gibt die Namen der neu zerlegten Sektionen zurück.
+        """
+        if mapfile is not None or path is not None:
+            self._mapfile = mapfile
+            self._path = path
+        if self._path == STDIN:
+            raise ValueError("stdin can not be updated incrementally")
+
+        if parse_filter is not None and parse_filter is not self._filter:
+            # Mit einem anderen Filter lassen sich die bisherigen Einträge nicht übernehmen
+            self._section_hashes = {}
+            self._filter = parse_filter
+        accept_section = None if self._filter is None else self._filter.accepts_section
+        if not self._section_hashes:
+            self.strings = StringTable()
+
+        self.stats = stats = ParseStats()
+        self._parsed = True
+        load_addresses = {}
+        with stats.measure("scan"):
+            sections = list(self._scan_sections(accept_section, load_addresses))
+
+        previous, previous_hashes = self._sec_dict, self._section_hashes
+        self._sec_dict, self._section_hashes, self._offsets = {}, {}, {}
+        changed = []
+
+        for (section_name, section_address, section_size, _, _), chunk in self._generator_section_chunks(sections):
+            with stats.measure("hash"):
+                digest = self._section_hash(section_address, section_size, chunk)
+
+            info = previous.get(section_name)
+            if previous_hashes.get(section_name) == digest and info["placements"] is not None:
+                stats.reused_sections += 1
+                table, reused = info["placements"], info["reused"]
+                stats.placements += len(table)
+            else:
+                changed.append(section_name)
+                table, reused = self._tokenize_section(section_name, section_size, self._chunk_lines(chunk))
+
+            stats.sections += 1
+            self._section_hashes[section_name] = digest
+            self._sec_dict[section_name] = {
+                "address": section_address,
+                "size": section_size,
+                "load_address": load_addresses.get(section_name),
+                "placements": table,
+                "reused": reused,
+            }
+        return changed
+
+
+def _tokenize_job(job, parse_filter=None):
+    """Zerlegt einen Block aus MapfileParser.generator_parallel_jobs in einem Prozess des Pools. Gibt das Tuple
+    (Kopfzeile, TokenizedBlock) zurück, siehe MapfileParser.tokenized_block."""
+    header, block = job
+    if isinstance(block, tuple):
+        path, start, end = block
+        with open(path, "rb") as fp:
+            fp.seek(start)
+            block = fp.read(end - start)
+    if isinstance(block, bytes):
+        # Dekodiert den Text wie open(path, "r") in MapfileParser._open_source
+        block = io.TextIOWrapper(io.BytesIO(block)).read()
+    tokens = list(MapfileParser.generator_tokenize(block, in_section=True))
+    return header, MapfileParser.tokenized_block(tokens, parse_filter)
@@ -1,11 +1,22 @@
 # -*- coding: utf-8 -*-
+import os
 import sys
+import glob
+import time
 import pprint
 import logging
 import argparse
-from mapfile_parser import MapfileParser
+import itertools
+import concurrent.futures
+from mapfile_parser import MapfileParser, ParseFilter
+from mapfile_cache import MapfileCache
+from mapfile_diff import MapfileDiff
+from mapfile_writers import WRITERS, BinaryWriter
+from mapfile_server import MapfileStore, create_server
+from mapfile_sqlite import MapfileDatabase
 from enum import Enum
 
+# Sektionen die bei der Ausgabe der Sektionen standardmäßig ausgeschlossen werden (siehe --exclude-section)
 IGNORE_SECTIONS = {
     ".stack_irq",
     ".stack_fiq",
@@ -24,55 +35,436 @@ IGNORE_SECTIONS = {
 class Modes(Enum):
     SECTIONS = 1
     DETAILS = 2
+    SYMBOLIZE = 3
+    DIFF = 4
+    SUMMARY = 5
+    BATCH = 6
+    TOP = 7
+    SERVE = 8
+    EXPORT = 9
+    WATCH = 10
+    INTEGRITY = 11
+    MEMORY = 12
 
 
+def symbolize(address_index, infile, outfile, batch_size=65536):
+    """Liest Adressen (hexadezimal mit 0x oder dezimal) zeilenweise aus infile und schreibt für jede Adresse
+    Sektion, Objektdatei, Name, Symbol und Offset nach outfile."""
+    tokens = (token for line in infile for token in line.split())
+    while True:
+        batch = list(itertools.islice(tokens, batch_size))
+        if not batch:
+            break
+
+        addresses = []
+        for token in batch:
+            try:
+                addresses.append(int(token, 0))
+            except ValueError:
+                addresses.append(-1)
+
+        # Die Spalten eines Eintrags werden nur einmal formatiert, je Adresse kommt nur noch der Offset hinzu
+        indices = address_index.find_many(addresses)
+        entries = {}
+        for index in set(indices):
+            if index >= 0:
+                section, objfile, name, symbol, start = address_index.entry(index)
+                entries[index] = ("%s;%s;%s;%s" % (section, objfile, name, symbol), start)
+
+        lines = []
+        for token, address, index in zip(batch, addresses, indices):
+            if index < 0:
+                lines.append("%s;;;;;\n" % token)
+            else:
+                columns, start = entries[index]
+                lines.append("%s;%s;0x%x\n" % (token, columns, address - start))
+        outfile.writelines(lines)
+
+
+def write_diff(mapfile_diff, outfile, top=None):
+    """Schreibt die Änderungen der Sektionen, Objektdateien und Einträge als CSV nach outfile."""
+    for kind, deltas in (
+        ("section", mapfile_diff.sections()),
+        ("objfile", mapfile_diff.objfiles()),
+        ("symbol", mapfile_diff.symbols()),
+    ):
+        for delta in deltas[:top]:
+            key = delta.key if isinstance(delta.key, tuple) else (delta.key,)
+            print(";".join((kind, *key, str(delta.old_size), str(delta.new_size), "%+i" % delta.delta)), file=outfile)
+
+
+def open_writer(outfile, output_format, columns):
+    """Erzeugt den Writer für das Format output_format. Das Binärformat wird in den Puffer von outfile geschrieben."""
+    if output_format == "binary":
+        outfile.flush()
+        return BinaryWriter(outfile.buffer, columns)
+    return WRITERS[output_format](outfile, columns)
+
+
+def build_filter(args):
+    """Erzeugt den ParseFilter aus den Argumenten der Kommandozeile. Für die Ausgabe der Sektionen werden ohne
+    --exclude-section die Sektionen aus IGNORE_SECTIONS ausgeschlossen."""
+    exclude = args.exclude_section
+    if exclude is None:
+        section_report = args.mode in (Modes.SECTIONS.name.lower(), Modes.WATCH.name.lower()) or (
+            args.mode == Modes.BATCH.name.lower() and args.report == "sections")
+        exclude = sorted(IGNORE_SECTIONS) if section_report else []
+
+    return ParseFilter(include=args.section, exclude=exclude, objfile=args.objfile, archive=args.archive,
+                       min_size=args.min_size)
+
+
+def load_mapfile(path, args, lazy=False):
+    """Liest ein Map-File mit den Einstellungen der Kommandozeile ein. Mit lazy=True werden nur die Kopfzeilen
+    der Sektionen gelesen."""
+    mapfile_parser = MapfileParser.from_path(path)
+    cache = None if args.no_cache else MapfileCache(args.cache_dir)
+    mapfile_parser.parse(workers=args.jobs, cache=cache, verbose=args.verbose, lazy=lazy,
+                         parse_filter=build_filter(args))
+
+    if args.profile:
+        print("Parse statistics of %s" % path, file=sys.stderr)
+        print(mapfile_parser.stats, file=sys.stderr)
+    return mapfile_parser
+
+
+def write_memory_regions(mapfile_parser, outfile, output_format="text"):
+    """Schreibt die Belegung der Speicherbereiche im Format output_format nach outfile. Die Auslastung wird in
+    Prozent mit zwei Nachkommastellen ausgegeben."""
+    columns = ["region", "origin", "length", "used", "free", "used_percent"]
+    rows = ([*region[:5], "%.2f" % (100 * region.utilization)] for region in mapfile_parser.get_memory_regions())
+    writer = open_writer(outfile, output_format, columns)
+    writer.write_rows(rows)
+    writer.close()
+
+
+def write_sections(mapfile_parser, outfile, output_format="text"):
+    """Schreibt die Liste der Sektionen im Format output_format nach outfile."""
+    section_list = mapfile_parser.get_section_list()
+    logging.info("Section List %s", section_list)
+    if output_format == "text":
+        size_bin = MapfileParser.calculate_size_of_section_list(section_list)
+        pprint.pprint(section_list, stream=outfile)
+        print("Size of flash sections %i Bytes. Jumps are not considered." % (size_bin), file=outfile)
+    else:
+        writer = open_writer(outfile, output_format, ["section", "address", "size"])
+        writer.write_rows(section_list)
+        writer.close()
+
+
+def watch(path, outfile, output_format="text", interval=1.0, parse_filter=None, iterations=None):
+    """Überwacht das Map-File path und schreibt nach jeder Änderung die Liste der Sektionen nach outfile.
+
+    Ein geändertes Map-File wird erst eingelesen, wenn sich Änderungszeit und Größe eine Periode lang nicht mehr
+    geändert haben, damit der Linker die Datei fertig geschrieben hat. Es werden nur die geänderten Sektionen
+    neu zerlegt (siehe MapfileParser.update). Mit iterations endet die Überwachung nach so vielen Perioden.
+    """
+    mapfile_parser = MapfileParser.from_path(path)
+    current = None
+    pending = None
+    for _ in itertools.count() if iterations is None else range(iterations):
+        try:
+            stat = os.stat(path)
+            stat = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            stat = None
+
+        if stat is not None and stat != current:
+            if stat == pending:
+                current = stat
+                try:
+                    changed = mapfile_parser.update(parse_filter=parse_filter)
+                except Exception as error:
+                    logging.error("Parsing map file %s failed: %r", path, error)
+                    print("Parsing map file %s failed: %r" % (path, error), file=sys.stderr)
+                else:
+                    print("%s: reparsed %s, reused %i sections" % (
+                        time.strftime("%H:%M:%S"), ", ".join(changed) or "nothing",
+                        mapfile_parser.stats.reused_sections), file=sys.stderr)
+                    write_sections(mapfile_parser, outfile, output_format)
+                    outfile.flush()
+            pending = stat
+
+        time.sleep(interval)
+
+
+def write_top(mapfile_parser, args):
+    """Schreibt die args.top größten Einträge bzw. Gruppen im Format args.format nach args.outfile. Das Map-File
+    wird dabei nur einmal durchlaufen, ohne die Einträge abzulegen."""
+    n = 50 if args.top is None else args.top
+    result = mapfile_parser.top(n, args.per_section, args.group_by, args.depth, args.jobs, build_filter(args))
+    if not args.per_section:
+        result = {None: result}
+
+    if args.group_by is None:
+        columns = ["section", "size", "address", "objfile", "name", "classinfo"]
+        rows = ([section, i.size, i.address, i.objfile, i.name, i.classinfo]
+                for ranking in result.values() for section, i in ranking)
+    else:
+        columns = ["section", "key", "size", "count"] if args.per_section else ["key", "size", "count"]
+        prefix = lambda section: [section] if args.per_section else []
+        rows = (prefix(section) + list(group) for section, ranking in result.items() for group in ranking)
+
+    writer = open_writer(args.outfile, args.format, columns)
+    writer.write_rows(rows)
+    writer.close()
+
+
+def serve(args):
+    """Startet den Server und liest die Map-Files aus args.infile vorab ein."""
+    cache = None if args.no_cache else MapfileCache(args.cache_dir)
+    store = MapfileStore(args.root, args.max_memory << 20, cache)
+    for path in expand_paths(args.infile):
+        store.get(path)
+
+    server = create_server(store, args.host, args.port, args.socket)
+    print("Serving map files on %s" % (args.socket or "http://%s:%i" % server.server_address[:2]), file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def expand_paths(patterns):
+    """Expandiert Glob Muster wie "build/*/firmware.map". Pfade ohne Platzhalter werden unverändert übernommen,
+    damit fehlende Dateien später als Fehler gemeldet werden."""
+    paths = []
+    for pattern in patterns:
+        if glob.escape(pattern) == pattern:
+            paths.append(pattern)
+        else:
+            matches = sorted(glob.glob(pattern, recursive=True))
+            if not matches:
+                logging.warning("Pattern %s does not match any map file", pattern)
+            paths.extend(matches)
+    return paths
+
+
+def batch_job(path, report, cache_dir=None, parse_filter=None):
+    """Liest ein Map-File ein und gibt die Zeilen des Reports zurück. Wird in einem Worker-Prozess ausgeführt."""
+    mapfile_parser = MapfileParser.from_path(path)
+    # Für den Report der Sektionen genügen die Kopfzeilen
+    mapfile_parser.parse(cache=None if cache_dir is None else MapfileCache(cache_dir), lazy=report == "sections",
+                         parse_filter=parse_filter)
+
+    if report == "sections":
+        rows = mapfile_parser.get_section_list()
+    else:
+        rows = mapfile_parser.get_class_info()
+    return ["%s;%s\n" % (path, ";".join(str(x) for x in row)) for row in rows]
+
+
+def write_batch(paths, report, outfile, workers=1, cache_dir=None, parse_filter=None):
+    """Liest die Map-Files parallel ein und schreibt die Reports, mit dem Pfad als Variante markiert, in der
+    Reihenfolge ihrer Fertigstellung nach outfile. Fehlerhafte Map-Files werden übersprungen.
+
+    Gibt die Liste der fehlgeschlagenen Pfade zurück.
+    """
+    failed = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(batch_job, path, report, cache_dir, parse_filter): path for path in paths}
+        for future in concurrent.futures.as_completed(futures):
+            path = futures[future]
+            try:
+                lines = future.result()
+            except Exception as error:
+                logging.error("Parsing map file %s failed: %r", path, error)
+                print("Parsing map file %s failed: %r" % (path, error), file=sys.stderr)
+                failed.append(path)
+                continue
+
+            outfile.writelines(lines)
+            outfile.flush()
+    return failed
+
 
 def main(arguments):
 
     parser = argparse.ArgumentParser(
         description=__doc__,
-        formatter_class=argparse.RawDescriptionHelpFormatter)
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        fromfile_prefix_chars='@')
 
     parser.add_argument('mode', type=str, default='sections',
         choices=[i.name.lower() for i in Modes])
 
 
-    parser.add_argument('infile', help="Input file", type=str)
+    parser.add_argument('infile', help="Input file, optionally compressed with gzip, xz or bzip2. '-' reads from "
+                        "stdin. Batch mode accepts several files and glob patterns, @FILE reads them from a file. "
+                        "Serve mode loads the given files in advance", type=str, nargs='+')
     
     # Dies öffnet eine Datei zum schreiben
     parser.add_argument('-o', '--outfile', help="Output file",
                         default=sys.stdout, type=argparse.FileType('w', encoding="utf-8"))
+
+    parser.add_argument('-j', '--jobs', help="Number of worker processes used for parsing "
+                        "(batch mode: number of map files parsed concurrently)",
+                        default=1, type=int)
+
+    parser.add_argument('--cache-dir', help="Directory of the parse cache",
+                        default=MapfileCache.default_dir(), type=str)
+
+    parser.add_argument('--no-cache', help="Do not read or write the parse cache",
+                        action='store_true')
+
+    parser.add_argument('-b', '--baseline', help="Baseline map file (diff mode)", type=str)
+
+    parser.add_argument('-n', '--top', help="Limit the number of reported entries (top mode: default 50)", type=int)
+
+    parser.add_argument('-g', '--group-by', help="Grouping key (summary mode: default objfile, top mode: rank "
+                        "groups instead of placements)", choices=['section', 'archive', 'objfile', 'directory'])
+
+    parser.add_argument('--per-section', help="Rank the entries of every section separately (top mode)",
+                        action='store_true')
+
+    parser.add_argument('--depth', help="Number of directories used by --group-by directory",
+                        default=1, type=int)
+
+    parser.add_argument('-s', '--section', help="Only parse sections matching this glob pattern (repeatable)",
+                        action='append')
+
+    parser.add_argument('-x', '--exclude-section', help="Skip sections matching this glob pattern (repeatable). "
+                        "Defaults to the stack, heap and bss sections for the sections report", action='append')
+
+    parser.add_argument('--objfile', help="Only keep placements whose object file matches this regex", type=str)
+
+    parser.add_argument('--archive', help="Only keep placements whose archive matches this regex", type=str)
+
+    parser.add_argument('--min-size', help="Only keep placements of at least this size in bytes",
+                        default=0, type=int)
+
+    parser.add_argument('-f', '--format', help="Output format of the sections, details, top, integrity and memory modes", default='text',
+                        choices=sorted(WRITERS))
+
+    parser.add_argument('--report', help="Report written for every map file (batch mode)", default='sections',
+                        choices=['sections', 'details'])
+
+    parser.add_argument('--host', help="Address the server listens on (serve mode)", default='127.0.0.1')
+
+    parser.add_argument('--port', help="Port the server listens on, 0 picks a free port (serve mode)",
+                        default=8765, type=int)
+
+    parser.add_argument('--socket', help="Listen on this Unix socket instead of a port (serve mode)", type=str)
+
+    parser.add_argument('--root', help="Only map files below this directory are served (serve mode)", default='.')
+
+    parser.add_argument('--max-memory', help="Memory limit of the parsed map files in MB (serve mode)",
+                        default=1024, type=int)
+
+    parser.add_argument('--db', help="SQLite database the map file is appended to (export mode)", type=str)
+
+    parser.add_argument('--build-id', help="Unique ID of the exported build, defaults to the map file path "
+                        "(export mode)", type=str)
+
+    parser.add_argument('--interval', help="Polling interval in seconds (watch mode)", default=1.0, type=float)
+
+    parser.add_argument('--log-level', help="Level of mapfile_parser.log", default='INFO',
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+
+    parser.add_argument('-v', '--verbose', help="Log every placement of every section (slow)",
+                        action='store_true')
+
+    parser.add_argument('--profile', help="Print parse timings and counters to stderr",
+                        action='store_true')
     args = parser.parse_args(arguments)
 
+    if args.mode == Modes.DIFF.name.lower() and args.baseline is None:
+        parser.error("diff mode requires --baseline")
+
+    if args.mode == Modes.EXPORT.name.lower() and args.db is None:
+        parser.error("export mode requires --db")
+
+    if args.mode not in (Modes.BATCH.name.lower(), Modes.SERVE.name.lower()):
+        if len(args.infile) != 1:
+            parser.error("%s mode accepts exactly one input file" % args.mode)
+        args.infile = args.infile[0]
+
+    if args.mode == Modes.TOP.name.lower() and args.group_by == "section":
+        parser.error("top mode groups by archive, objfile or directory, use summary mode for sections")
+
+    if args.mode in (Modes.SYMBOLIZE.name.lower(), Modes.WATCH.name.lower()) and args.infile == "-":
+        parser.error("%s mode requires a map file, not stdin" % args.mode)
+
+    if args.mode == Modes.WATCH.name.lower() and args.format == "binary":
+        parser.error("watch mode does not support the binary format")
+
     logging.basicConfig(
         filename="mapfile_parser.log",
         format="%(asctime)s - %(name)s - %(levelname)6s - %(message)s",
-        level=logging.DEBUG,
+        level=logging.DEBUG if args.verbose else getattr(logging, args.log_level),
     )
+
+    if args.mode == Modes.SERVE.name.lower():
+        serve(args)
+        return
+
+    if args.mode == Modes.BATCH.name.lower():
+        paths = expand_paths(args.infile)
+        logging.info("Started parsing %i map files", len(paths))
+        failed = write_batch(paths, args.report, args.outfile, args.jobs, None if args.no_cache else args.cache_dir,
+                             build_filter(args))
+        return 1 if failed else None
+
     logging.info("Started parsing map file %s", args.infile)
 
-    # Das Map-File wird in gänze eingelesen und in einen Python string eingetragen
-    content = ""
-    with open(args.infile, "r") as fp:
-        content = fp.read()
+    if args.mode == Modes.WATCH.name.lower():
+        try:
+            watch(args.infile, args.outfile, args.format, args.interval, build_filter(args))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    if args.mode == Modes.TOP.name.lower():
+        # Die Einträge werden beim Lesen gerankt und nicht abgelegt
+        write_top(MapfileParser.from_path(args.infile), args)
+        return
 
-    mapfile_parser = MapfileParser(content)
-    mapfile_parser.parse()
+    # Das Map-File wird zeilenweise gelesen und nicht in gänze in den Speicher geladen
+    # Für die Sektionen und Speicherbereiche genügen die Kopfzeilen, die Einträge werden nicht zerlegt
+    mapfile_parser = load_mapfile(args.infile, args,
+                                  lazy=args.mode in (Modes.SECTIONS.name.lower(), Modes.MEMORY.name.lower()))
     
     if (args.mode == Modes.SECTIONS.name.lower()):
-        section_list = mapfile_parser.get_section_list(IGNORE_SECTIONS)
-        logging.info("Section List %s", section_list)
-        size_bin = MapfileParser.calculate_size_of_section_list(section_list)
-        pprint.pprint(section_list, stream=args.outfile)
-        print("Size of flash sections %i Bytes. Jumps are not considered." % (size_bin), file=args.outfile)
+        write_sections(mapfile_parser, args.outfile, args.format)
 
     elif (args.mode == Modes.DETAILS.name.lower()):
-        class_info = mapfile_parser.get_class_info()
-   
-        
-        for i in class_info:
-            csv_string = ";".join((str(x) for x in i))
-            print(csv_string, file=args.outfile)
+        # Die Zeilen werden einzeln erzeugt und blockweise geschrieben
+        writer = open_writer(args.outfile, args.format, MapfileParser.CLASS_INFO_COLUMNS)
+        writer.write_rows(mapfile_parser.generator_class_info())
+        writer.close()
+
+    elif (args.mode == Modes.SYMBOLIZE.name.lower()):
+        # Die Adressen werden von stdin gelesen
+        symbolize(mapfile_parser.build_address_index(), sys.stdin, args.outfile)
+
+    elif (args.mode == Modes.DIFF.name.lower()):
+        # Das Map-File der Baseline wird in der Regel bereits im Cache liegen
+        baseline = load_mapfile(args.baseline, args)
+        write_diff(MapfileDiff(baseline, mapfile_parser), args.outfile, args.top)
+
+    elif (args.mode == Modes.SUMMARY.name.lower()):
+        groups = mapfile_parser.aggregate(args.group_by or 'objfile', args.depth, args.top)
+        args.outfile.writelines("%s;%i;%i\n" % group for group in groups)
+
+    elif (args.mode == Modes.INTEGRITY.name.lower()):
+        # Lücken, Überlappungen, Füllbytes und entfernte Einträge je Sektion
+        writer = open_writer(args.outfile, args.format, MapfileParser.INTEGRITY_COLUMNS)
+        writer.write_rows(mapfile_parser.generator_integrity())
+        writer.close()
+
+    elif (args.mode == Modes.MEMORY.name.lower()):
+        write_memory_regions(mapfile_parser, args.outfile, args.format)
+
+    elif (args.mode == Modes.EXPORT.name.lower()):
+        with MapfileDatabase(args.db) as database:
+            try:
+                count = database.export(args.build_id or args.infile, mapfile_parser, args.infile)
+            except ValueError as error:
+                print(error, file=sys.stderr)
+                return 1
+        print("Exported %i placements to %s" % (count, args.db), file=args.outfile)
 
     else:
         raise Exception("")
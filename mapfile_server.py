@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""Ein lokaler Server der Anfragen zu Map-Files als JSON beantwortet.
+
+Die zerlegten Map-Files werden in einem LRU Speicher gehalten, so dass wiederholte Anfragen zum selben Map-File
+nicht erneut zerlegt werden müssen. Ändert sich ein Map-File (Änderungszeit oder Größe), wird es beim nächsten
+Zugriff neu eingelesen.
+
+Anfragen (GET, der Pfad des Map-Files im Parameter map):
+    /sections?map=PATH
+    /lookup?map=PATH&address=0x8000100&address=...
+    /top?map=PATH&n=50&per_section=1&group_by=objfile&depth=1
+    /summary?map=PATH&group_by=objfile&depth=1&top=20&section=.text
+    /memory?map=PATH
+    /stats
+"""
+import os
+import json
+import stat
+import logging
+import threading
+import collections
+import socketserver
+import urllib.parse
+import http.server
+
+from mapfile_parser import MapfileParser
+
+
+class QueryError(Exception):
+    """Fehler in einer Anfrage, wird mit dem HTTP Status status beantwortet."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class MapfileStore:
+    """LRU Speicher für zerlegte Map-Files mit einer Obergrenze für den geschätzten Speicherbedarf.
+
+    Map-Files werden nur unterhalb von root angenommen. Das zuletzt verwendete Map-File wird nie verdrängt, auch
+    wenn es allein größer als max_bytes ist. Ein Map-File wird ohne die globale Sperre eingelesen, Anfragen zu
+    anderen Map-Files werden währenddessen weiter beantwortet.
+    """
+
+    # Ein Eintrag im Speicher. stat enthält Änderungszeit und Größe der Datei beim Einlesen, nbytes den
+    # Speicherbedarf des Parsers. address_index ist eine Liste mit dem AddressIndex bzw. None bis zum ersten Zugriff.
+    Entry = collections.namedtuple("Entry", ["stat", "parser", "nbytes", "address_index"])
+
+    def __init__(self, root=".", max_bytes=1 << 30, cache=None):
+        self._root = os.path.realpath(root)
+        self._max_bytes = max_bytes
+        self._cache = cache
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        # Je Map-File eine Sperre, damit es nur einmal gleichzeitig eingelesen wird
+        self._load_locks = {}
+        self.loads = 0
+
+    def resolve(self, path):
+        """Gibt den absoluten Pfad von path relativ zu root zurück."""
+        path = os.path.realpath(os.path.join(self._root, path))
+        if os.path.commonpath([path, self._root]) != self._root:
+            raise QueryError("Map file %s is outside of the served directory" % path, 403)
+        return path
+
+    def _load(self, path, file_stat):
+        mapfile_parser = MapfileParser.from_path(path)
+        mapfile_parser.parse(cache=self._cache)
+        self.loads += 1
+        nbytes = mapfile_parser.nbytes()
+        logging.info("Loaded map file %s (%i bytes in memory)", path, nbytes)
+        return self.Entry(file_stat, mapfile_parser, nbytes, [None])
+
+    def get(self, path):
+        """Gibt den Eintrag des Map-Files path zurück und liest es bei Bedarf (erneut) ein."""
+        path = self.resolve(path)
+        try:
+            file_stat = os.stat(path)
+        except OSError:
+            raise QueryError("Map file %s not found" % path, 404)
+        file_stat = (file_stat.st_mtime_ns, file_stat.st_size)
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.stat == file_stat:
+                self._entries.move_to_end(path)
+                return entry
+            load_lock = self._load_locks.setdefault(path, threading.Lock())
+
+        with load_lock:
+            # Eine andere Anfrage hat das Map-File eventuell bereits eingelesen
+            with self._lock:
+                entry = self._entries.get(path)
+            if entry is None or entry.stat != file_stat:
+                entry = self._load(path, file_stat)
+
+            with self._lock:
+                self._entries[path] = entry
+                self._entries.move_to_end(path)
+                self._evict()
+            return entry
+
+    def address_index(self, entry):
+        """Gibt den AddressIndex des Eintrags zurück. Er wird beim ersten Zugriff ohne die globale Sperre aufgebaut
+        und zählt danach zum Speicherbedarf des Eintrags."""
+        address_index = entry.address_index[0]
+        if address_index is not None:
+            return address_index
+
+        address_index = entry.parser.build_address_index()
+        with self._lock:
+            # Eine andere Anfrage hat den Index eventuell bereits aufgebaut
+            if entry.address_index[0] is None:
+                entry.address_index[0] = address_index
+                self._evict()
+            return entry.address_index[0]
+
+    @staticmethod
+    def _entry_nbytes(entry):
+        address_index = entry.address_index[0]
+        return entry.nbytes + (0 if address_index is None else address_index.nbytes())
+
+    def _evict(self):
+        total = sum(map(self._entry_nbytes, self._entries.values()))
+        while total > self._max_bytes and len(self._entries) > 1:
+            path, entry = self._entries.popitem(last=False)
+            total -= self._entry_nbytes(entry)
+            logging.info("Evicted map file %s", path)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "loads": self.loads,
+                "bytes": sum(map(self._entry_nbytes, self._entries.values())),
+                "max_bytes": self._max_bytes,
+                "mapfiles": list(self._entries),
+            }
+
+
+def _int_parameter(query, name, default):
+    try:
+        return int(query.get(name, [default])[0], 0)
+    except ValueError:
+        raise QueryError("Parameter %s must be an integer" % name)
+
+
+def _bool_parameter(query, name):
+    return query.get(name, ["0"])[0].lower() in ("1", "true", "yes")
+
+
+def _map_parameter(query):
+    if "map" not in query:
+        raise QueryError("Parameter map is missing")
+    return query["map"][0]
+
+
+def query_sections(store, query):
+    mapfile_parser = store.get(_map_parameter(query)).parser
+    return [{"section": name, "address": address, "size": size} for name, address, size in
+            mapfile_parser.get_section_list()]
+
+
+def query_lookup(store, query):
+    entry = store.get(_map_parameter(query))
+    try:
+        addresses = [int(i, 0) for i in query.get("address", [])]
+    except ValueError:
+        raise QueryError("Parameter address must be an integer")
+    symbols = store.address_index(entry).lookup_many(addresses)
+    return [None if i is None else i._asdict() for i in symbols]
+
+
+def query_top(store, query):
+    mapfile_parser = store.get(_map_parameter(query)).parser
+    group_by = query.get("group_by", [None])[0]
+    if group_by not in (None, *MapfileParser.GROUP_KEYS):
+        raise QueryError("Unknown group_by %s" % group_by)
+
+    result = mapfile_parser.top(_int_parameter(query, "n", "50"), _bool_parameter(query, "per_section"),
+                                group_by, _int_parameter(query, "depth", "1"))
+
+    def as_json(ranking):
+        if group_by is not None:
+            return [i._asdict() for i in ranking]
+        return [{"section": section, **placement._asdict()} for section, placement in ranking]
+
+    if isinstance(result, dict):
+        return {section: as_json(ranking) for section, ranking in result.items()}
+    return as_json(result)
+
+
+def query_summary(store, query):
+    mapfile_parser = store.get(_map_parameter(query)).parser
+    group_by = query.get("group_by", ["objfile"])[0]
+    if group_by != "section" and group_by not in MapfileParser.GROUP_KEYS:
+        raise QueryError("Unknown group_by %s" % group_by)
+
+    top = _int_parameter(query, "top", "0") or None
+    groups = mapfile_parser.aggregate(group_by, _int_parameter(query, "depth", "1"), top, query.get("section"))
+    return [i._asdict() for i in groups]
+
+
+def query_memory(store, query):
+    mapfile_parser = store.get(_map_parameter(query)).parser
+    return [i._asdict() for i in mapfile_parser.get_memory_regions()]
+
+
+def query_stats(store, query):
+    return store.stats()
+
+
+QUERIES = {
+    "/sections": query_sections,
+    "/lookup": query_lookup,
+    "/top": query_top,
+    "/summary": query_summary,
+    "/memory": query_memory,
+    "/stats": query_stats,
+}
+
+
+class MapfileRequestHandler(http.server.BaseHTTPRequestHandler):
+    """Beantwortet die Anfragen aus QUERIES mit JSON. Der MapfileStore ist ein Attribut des Servers."""
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        try:
+            function = QUERIES.get(url.path)
+            if function is None:
+                raise QueryError("Unknown query %s" % url.path, 404)
+            status, result = 200, function(self.server.store, query)
+        except QueryError as error:
+            status, result = error.status, {"error": str(error)}
+        except Exception as error:
+            logging.exception("Query %s failed", self.path)
+            status, result = 500, {"error": repr(error)}
+
+        body = json.dumps(result).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # Bei einem Unix Socket ist die Adresse des Clients ein leerer String
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        logging.info("%s - %s", self.address_string(), format % args)
+
+
+class MapfileHTTPServer(http.server.ThreadingHTTPServer):
+    def __init__(self, address, store):
+        super().__init__(address, MapfileRequestHandler)
+        self.store = store
+
+
+if hasattr(socketserver, "UnixStreamServer"):
+
+    class MapfileUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        """Wie MapfileHTTPServer, aber über einen Unix Socket."""
+
+        daemon_threads = True
+
+        def __init__(self, path, store):
+            super().__init__(path, MapfileRequestHandler)
+            self.store = store
+
+
+def create_server(store, host="127.0.0.1", port=8765, socket_path=None):
+    """Erzeugt einen Server auf host:port oder, falls socket_path gesetzt ist, auf einem Unix Socket."""
+    if socket_path is not None:
+        # Ein verwaister Socket eines früheren Laufs wird ersetzt, andere Dateien nicht
+        if os.path.exists(socket_path) and stat.S_ISSOCK(os.stat(socket_path).st_mode):
+            os.unlink(socket_path)
+        return MapfileUnixServer(socket_path, store)
+    return MapfileHTTPServer((host, port), store)
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""Export zerlegter Map-Files in eine SQLite Datenbank.
+
+Jedes Map-File wird als Build mit einer eindeutigen build_id abgelegt. Bereits exportierte Builds werden nicht
+verändert. Die Namen der Objektdateien und Symbole werden in eigenen Tabellen nur einmal abgelegt und über alle
+Builds hinweg geteilt.
+
+Beispiel: Größe eines Symbols über alle Builds
+
+    SELECT b.build_id, p.size FROM placements p
+        JOIN builds b ON b.id = p.build
+        JOIN symbols s ON s.id = p.symbol
+        WHERE s.name = '.text.main'
+"""
+import time
+import sqlite3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS builds (
+    id INTEGER PRIMARY KEY,
+    build_id TEXT UNIQUE NOT NULL,
+    mapfile TEXT,
+    created REAL
+);
+CREATE TABLE IF NOT EXISTS objfiles (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS symbols (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sections (
+    id INTEGER PRIMARY KEY,
+    build INTEGER NOT NULL REFERENCES builds(id),
+    name TEXT NOT NULL,
+    address INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS placements (
+    build INTEGER NOT NULL REFERENCES builds(id),
+    section INTEGER NOT NULL REFERENCES sections(id),
+    symbol INTEGER NOT NULL REFERENCES symbols(id),
+    objfile INTEGER NOT NULL REFERENCES objfiles(id),
+    address INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    address2nd INTEGER,
+    classinfo INTEGER NOT NULL REFERENCES symbols(id)
+);
+CREATE INDEX IF NOT EXISTS sections_build_name ON sections(build, name);
+CREATE INDEX IF NOT EXISTS placements_build_address ON placements(build, address);
+CREATE INDEX IF NOT EXISTS placements_section ON placements(section);
+CREATE INDEX IF NOT EXISTS placements_objfile ON placements(objfile);
+CREATE INDEX IF NOT EXISTS placements_symbol ON placements(symbol);
+CREATE VIEW IF NOT EXISTS placements_view AS
+    SELECT b.build_id, se.name AS section, sy.name AS symbol, o.path AS objfile, p.address, p.size,
+           p.address2nd, ci.name AS classinfo
+    FROM placements p
+    JOIN builds b ON b.id = p.build
+    JOIN sections se ON se.id = p.section
+    JOIN symbols sy ON sy.id = p.symbol
+    JOIN objfiles o ON o.id = p.objfile
+    JOIN symbols ci ON ci.id = p.classinfo;
+"""
+
+
+def to_signed(value):
+    """SQLite speichert nur vorzeichenbehaftete 64 Bit Integer. Adressen ab 2**63 werden im Zweierkomplement
+    abgelegt."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+class MapfileDatabase:
+    """Eine SQLite Datenbank mit den Einträgen beliebig vieler Builds."""
+
+    def __init__(self, path):
+        self._connection = sqlite3.connect(path)
+        self._connection.executescript(SCHEMA)
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def connection(self):
+        return self._connection
+
+    def builds(self):
+        """Gibt die build_id aller Builds in der Reihenfolge des Exports zurück."""
+        return [i[0] for i in self._connection.execute("SELECT build_id FROM builds ORDER BY id")]
+
+    def _intern(self, table, column, strings):
+        """Legt die Strings in der Tabelle table an, falls sie noch nicht existieren, und gibt ein Dictionary
+        String -> id zurück."""
+        cursor = self._connection.cursor()
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS new_strings (value TEXT PRIMARY KEY)")
+        cursor.execute("DELETE FROM new_strings")
+        cursor.executemany("INSERT OR IGNORE INTO new_strings VALUES (?)", ((i,) for i in strings))
+        cursor.execute("INSERT OR IGNORE INTO %s (%s) SELECT value FROM new_strings" % (table, column))
+        ids = dict(cursor.execute(
+            "SELECT t.%s, t.id FROM new_strings n JOIN %s t ON t.%s = n.value" % (column, table, column)))
+        cursor.execute("DELETE FROM new_strings")
+        return ids
+
+    def export(self, build_id, mapfile_parser, mapfile=None):
+        """Exportiert die Sektionen und Einträge des mit parse gelesenen mapfile_parser als Build build_id.
+
+        Alle Zeilen werden mit executemany in einer einzigen Transaktion geschrieben. Existiert der Build bereits,
+        wird ein ValueError ausgelöst, bereits exportierte Builds werden nie verändert. Gibt die Anzahl der
+        exportierten Einträge zurück.
+        """
+        tables = list(mapfile_parser.iter_placement_tables())
+        sections = {name: (address, size) for name, address, size in mapfile_parser.get_section_list()}
+
+        symbols = set()
+        objfiles = set()
+        for _, table in tables:
+            strings = table.strings.strings
+            symbols.update(strings[i] for i in set(table.names))
+            symbols.update(strings[i] for i in set(table.classinfos))
+            objfiles.update(strings[i] for i in set(table.objfiles))
+
+        count = 0
+        with self._connection:
+            cursor = self._connection.cursor()
+            try:
+                cursor.execute("INSERT INTO builds (build_id, mapfile, created) VALUES (?, ?, ?)",
+                               (build_id, mapfile, time.time()))
+            except sqlite3.IntegrityError:
+                raise ValueError("Build %s has already been exported" % build_id)
+            build = cursor.lastrowid
+
+            symbol_ids = self._intern("symbols", "name", symbols)
+            objfile_ids = self._intern("objfiles", "path", objfiles)
+            # Die Indizes einer StringTable werden einmal je String in die ids der Datenbank übersetzt. Die
+            # Tabellen eines Aufrufs von parse teilen sich eine StringTable.
+            lookups = {}
+
+            for name, table in tables:
+                address, size = sections[name]
+                cursor.execute("INSERT INTO sections (build, name, address, size) VALUES (?, ?, ?, ?)",
+                               (build, name, to_signed(address), size))
+                section = cursor.lastrowid
+
+                lookup = lookups.get(id(table.strings))
+                if lookup is None:
+                    strings = table.strings.strings
+                    lookup = lookups[id(table.strings)] = (
+                        [symbol_ids.get(i) for i in strings], [objfile_ids.get(i) for i in strings])
+                table_symbols, table_objfiles = lookup
+
+                rows = (
+                    (build, section, table_symbols[name_index], table_objfiles[objfile_index], to_signed(address),
+                     size, to_signed(address_2nd) if has_address_2nd else None, table_symbols[classinfo])
+                    for name_index, objfile_index, address, size, address_2nd, has_address_2nd, classinfo in zip(
+                        table.names, table.objfiles, table.addresses, table.sizes, table.addresses_2nd,
+                        table.has_addresses_2nd, table.classinfos)
+                )
+                cursor.executemany("INSERT INTO placements VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                count += len(table)
+        return count
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""Writer für die Ausgabe von Tabellen wie MapfileParser.generator_class_info.
+
+Alle Writer nehmen die Zeilen als Iterator entgegen und schreiben sie in Blöcken von batch_size Zeilen. Der
+Speicherbedarf hängt damit nicht von der Anzahl der Zeilen ab. Die Writer text, csv und jsonl schreiben in eine
+Textdatei, der Writer binary in eine Binärdatei.
+"""
+import sys
+import csv
+import json
+import struct
+import itertools
+from array import array
+
+
+class TextWriter:
+    """Schreibt jede Zeile mit ";" getrennt, wie die bisherige Ausgabe des Modus details."""
+
+    def __init__(self, fp, columns, batch_size=65536):
+        self._fp = fp
+        self._columns = columns
+        self._batch_size = batch_size
+
+    def _batches(self, rows):
+        rows = iter(rows)
+        while True:
+            batch = list(itertools.islice(rows, self._batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def write_rows(self, rows):
+        for batch in self._batches(rows):
+            self._fp.write("".join([";".join([str(x) for x in row]) + "\n" for row in batch]))
+
+    def close(self):
+        self._fp.flush()
+
+
+class CsvWriter(TextWriter):
+    """Schreibt eine CSV Datei mit den Namen der Spalten in der ersten Zeile."""
+
+    def __init__(self, fp, columns, batch_size=65536):
+        super().__init__(fp, columns, batch_size)
+        self._writer = csv.writer(fp, lineterminator="\n")
+        self._writer.writerow(columns)
+
+    def write_rows(self, rows):
+        for batch in self._batches(rows):
+            self._writer.writerows(batch)
+
+
+class JsonLinesWriter(TextWriter):
+    """Schreibt jede Zeile als JSON Objekt mit den Namen der Spalten als Schlüssel (JSON Lines)."""
+
+    def write_rows(self, rows):
+        encode = json.JSONEncoder(ensure_ascii=False).encode
+        columns = self._columns
+        for batch in self._batches(rows):
+            self._fp.write("".join([encode(dict(zip(columns, row))) + "\n" for row in batch]))
+
+
+class BinaryWriter(TextWriter):
+    """Schreibt die Zeilen spaltenweise in ein kompaktes Binärformat, das mit read_binary gelesen werden kann.
+
+    Aufbau (little endian):
+        MAGIC, Anzahl der Spalten (H), je Spalte Typ ("i" Integer, "s" String, 1 Byte), Länge des Namens (B), Name
+        je Block: Anzahl der Zeilen (I), Anzahl der neuen Strings (I), die neuen Strings jeweils mit Länge (I),
+                  danach je Spalte die Indizes der Strings als Array ("I") bzw. der Typ des Arrays ("Q" oder "q",
+                  1 Byte) gefolgt von den Werten
+
+    Jeder String wird nur einmal geschrieben, die Indizes beziehen sich auf alle bisher geschriebenen Strings. Der
+    Typ einer Spalte wird aus der ersten Zeile bestimmt. Integer werden vorzeichenlos abgelegt (z.B. Adressen ab
+    2**63), Blöcke mit negativen Werten in einer Spalte (z.B. die Differenz bei size_mismatch) vorzeichenbehaftet.
+    """
+
+    MAGIC = b"MAPCOL2\n"
+
+    def __init__(self, fp, columns, batch_size=65536):
+        super().__init__(fp, columns, batch_size)
+        self._types = None
+        self._strings = {}
+
+    def _write_header(self, row):
+        self._types = ["i" if isinstance(x, int) else "s" for x in row]
+        header = [self.MAGIC, struct.pack("<H", len(self._columns))]
+        for column, column_type in zip(self._columns, self._types):
+            name = column.encode("utf-8")
+            header.append(struct.pack("<cB", column_type.encode(), len(name)) + name)
+        self._fp.write(b"".join(header))
+
+    def write_rows(self, rows):
+        for batch in self._batches(rows):
+            if self._types is None:
+                self._write_header(batch[0])
+
+            strings = self._strings
+            new_strings = []
+            data = []
+            for index, column_type in enumerate(self._types):
+                values = [row[index] for row in batch]
+                if column_type == "s":
+                    for x in dict.fromkeys(values):
+                        if x not in strings:
+                            strings[x] = len(strings)
+                            new_strings.append(x.encode("utf-8"))
+                    values = array("I", map(strings.__getitem__, values))
+                else:
+                    typecode = "q" if min(values) < 0 else "Q"
+                    values = array(typecode, values)
+                    data.append(typecode.encode())
+                if sys.byteorder == "big":
+                    values.byteswap()
+                data.append(values.tobytes())
+
+            block = [struct.pack("<II", len(batch), len(new_strings))]
+            block += [struct.pack("<I", len(i)) + i for i in new_strings]
+            self._fp.write(b"".join(block + data))
+
+    def close(self):
+        if self._types is None:
+            # Auch ohne Zeilen soll eine gültige Datei entstehen
+            self._write_header([""] * len(self._columns))
+        self._fp.flush()
+
+
+def read_binary(fp):
+    """Ein Generator der die Zeilen einer mit BinaryWriter geschriebenen Binärdatei liefert. Die erste Zeile
+    enthält die Namen der Spalten."""
+    def read(size):
+        data = fp.read(size)
+        if len(data) != size:
+            raise ValueError("Unexpected end of file")
+        return data
+
+    if fp.read(len(BinaryWriter.MAGIC)) != BinaryWriter.MAGIC:
+        raise ValueError("Not a binary map file dump")
+
+    columns = []
+    types = []
+    for _ in range(struct.unpack("<H", read(2))[0]):
+        column_type, length = struct.unpack("<cB", read(2))
+        types.append(column_type.decode())
+        columns.append(read(length).decode("utf-8"))
+    yield columns
+
+    strings = []
+    while True:
+        header = fp.read(8)
+        if not header:
+            return
+        count, new_strings = struct.unpack("<II", header)
+        for _ in range(new_strings):
+            strings.append(read(struct.unpack("<I", read(4))[0]).decode("utf-8"))
+
+        values = []
+        for column_type in types:
+            column = array("I" if column_type == "s" else read(1).decode())
+            column.frombytes(read(count * column.itemsize))
+            if sys.byteorder == "big":
+                column.byteswap()
+            values.append([strings[i] for i in column] if column_type == "s" else column.tolist())
+        yield from (list(row) for row in zip(*values))
+
+
+WRITERS = {
+    "text": TextWriter,
+    "csv": CsvWriter,
+    "jsonl": JsonLinesWriter,
+    "binary": BinaryWriter,
+}
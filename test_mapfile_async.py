@@ -0,0 +1,72 @@
+import asyncio
+import concurrent.futures
+
+from mapfile_async import AsyncMapfileParser, SectionHeader, SectionPlacements
+from mapfile_parser import MapfileParser, ParseFilter
+from test_mapfile_parser import MAPFILE_SAMPLE
+
+
+def write_sample(tmp_path):
+    path = tmp_path / "app.map"
+    path.write_text(MAPFILE_SAMPLE)
+    return str(path)
+
+
+def test_parse_file(tmp_path):
+    """Das Ergebnis entspricht MapfileParser.parse, das Zerlegen läuft im übergebenen Executor."""
+    path = write_sample(tmp_path)
+    with concurrent.futures.ThreadPoolExecutor(2) as executor:
+        mapfile_parser = asyncio.run(AsyncMapfileParser(executor, window=2).parse_file(path))
+
+    reference = MapfileParser.from_path(path)
+    reference.parse()
+    assert mapfile_parser.get_section_list() == reference.get_section_list()
+    assert mapfile_parser.get_class_info() == reference.get_class_info()
+    assert mapfile_parser.analyze_integrity() == reference.analyze_integrity()
+
+
+def test_iter_file_headers_first(tmp_path):
+    """Alle Kopfzeilen vor den Einträgen, die Einträge in der Reihenfolge des Map-Files."""
+    path = write_sample(tmp_path)
+    parse_filter = ParseFilter(include=[".text", ".data", ".bss"])
+
+    async def collect():
+        return [event async for event in AsyncMapfileParser(parse_filter=parse_filter).iter_file(path)]
+
+    events = asyncio.run(collect())
+    assert events[:3] == [
+        SectionHeader(".text", 0x08000010, 0x5C),
+        SectionHeader(".data", 0x20000000, 0x8),
+        SectionHeader(".bss", 0x20000008, 0x14),
+    ]
+    assert [type(i) for i in events[3:]] == [SectionPlacements] * 3
+    assert [i.name for i in events[3:]] == [".text", ".data", ".bss"]
+    assert events[5].placements.total_size() == 0x14
+
+
+def test_iter_file_cancel(tmp_path):
+    """Nach dem Abbruch werden keine weiteren Sektionen zerlegt."""
+    path = write_sample(tmp_path)
+    mapfile_parser = MapfileParser.from_path(path)
+    events = []
+
+    async def consume():
+        async for event in AsyncMapfileParser(window=1).iter_file(path, mapfile_parser):
+            events.append(event)
+            if isinstance(event, SectionPlacements):
+                await asyncio.sleep(10)
+
+    async def cancel():
+        task = asyncio.create_task(consume())
+        while not any(isinstance(i, SectionPlacements) for i in events):
+            await asyncio.sleep(0.01)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            return True
+        return False
+
+    assert asyncio.run(cancel())
+    assert sum(isinstance(i, SectionPlacements) for i in events) == 1
+    assert sum(info["placements"] is not None for info in mapfile_parser._sec_dict.values()) == 1
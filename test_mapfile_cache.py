@@ -0,0 +1,86 @@
+import os
+import pytest
+from unittest.mock import patch
+
+from mapfile_parser import MapfileParser
+from mapfile_cache import MapfileCache
+from test_mapfile_parser import MAPFILE_SAMPLE
+
+
+def test_parse_uses_cache(tmp_path):
+    """Ein zweiter Aufruf von parse mit identischem Map-File lädt das Ergebnis aus dem Cache."""
+    cache = MapfileCache(str(tmp_path))
+
+    first = MapfileParser(MAPFILE_SAMPLE)
+    first.parse(cache=cache)
+
+    assert len(os.listdir(tmp_path)) == 1
+
+    second = MapfileParser(MAPFILE_SAMPLE)
+    with patch("mapfile_parser.MapfileParser.iter_sections") as mock_iter_sections:
+        second.parse(cache=cache)
+        mock_iter_sections.assert_not_called()
+
+    assert second.get_class_info() == first.get_class_info()
+    assert second.get_section_list() == first.get_section_list()
+
+
+def test_cache_key_depends_on_content(tmp_path):
+    """Ein geändertes Map-File erzeugt einen neuen Eintrag im Cache."""
+    cache = MapfileCache(str(tmp_path))
+
+    MapfileParser(MAPFILE_SAMPLE).parse(cache=cache)
+    MapfileParser(MAPFILE_SAMPLE.replace("0x5c", "0x5d")).parse(cache=cache)
+
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """Wird die maximale Größe überschritten, werden die ältesten Einträge gelöscht."""
+    cache = MapfileCache(str(tmp_path), max_size=1)
+
+    cache.store("a", {"x": 1})
+    cache.store("b", {"x": 2})
+
+    assert cache.load("a") is None
+    assert cache.load("b") == {"x": 2}
+
+
+
+@pytest.mark.parametrize("damage", [
+    lambda data: data[:-10],
+    lambda data: data[:20] + bytes([data[20] ^ 0xff]) + data[21:],
+    lambda data: b"",
+])
+def test_cache_discards_broken_entry(tmp_path, damage):
+    """Ein beschädigter Eintrag wird gelöscht und das Map-File erneut zerlegt."""
+    cache = MapfileCache(str(tmp_path))
+    first = MapfileParser(MAPFILE_SAMPLE)
+    first.parse(cache=cache)
+    filename = tmp_path / os.listdir(tmp_path)[0]
+    filename.write_bytes(damage(filename.read_bytes()))
+
+    second = MapfileParser(MAPFILE_SAMPLE)
+    second.parse(cache=cache)
+
+    assert second.stats.cache_hits == 0
+    assert second.get_class_info() == first.get_class_info()
+    # Der beschädigte Eintrag wurde durch das neue Ergebnis ersetzt
+    assert MapfileCache(str(tmp_path)).load(MapfileParser(MAPFILE_SAMPLE).content_hash()) is not None
+
+
+def test_cache_discards_unexpected_entry(tmp_path):
+    """Ein lesbarer Eintrag mit falschem Aufbau wird von parse verworfen."""
+    cache = MapfileCache(str(tmp_path))
+    key = MapfileParser(MAPFILE_SAMPLE).content_hash()
+    cache.store(key, {"x": 1})
+
+    mapfile_parser = MapfileParser(MAPFILE_SAMPLE)
+    mapfile_parser.parse(cache=cache)
+
+    reference = MapfileParser(MAPFILE_SAMPLE)
+    reference.parse()
+
+    assert mapfile_parser.stats.cache_hits == 0
+    assert mapfile_parser.get_section_list() == reference.get_section_list()
+    assert isinstance(cache.load(key), tuple)
@@ -0,0 +1,49 @@
+from mapfile_parser import MapfileParser
+from mapfile_diff import MapfileDiff, Delta
+from test_mapfile_parser import MAPFILE_SAMPLE
+
+# Die Funktion helper wächst um 4 Bytes, memcpy entfällt, dafür kommt memset hinzu.
+MAPFILE_SAMPLE_NEW = (
+    MAPFILE_SAMPLE.replace(".text           0x08000010       0x5c", ".text           0x08000010       0x60")
+    .replace(" .text.helper   0x0800005e        0xe", " .text.helper   0x0800005e       0x12")
+    .replace("/opt/lib/libc.a(lib_a-memcpy.o)\n                0x08000024                memcpy",
+             "/opt/lib/libc.a(lib_a-memset.o)\n                0x08000024                memset")
+)
+
+
+def parse(content):
+    mapfile_parser = MapfileParser(content)
+    mapfile_parser.parse()
+    return mapfile_parser
+
+
+def test_diff_sections():
+    mapfile_diff = MapfileDiff(parse(MAPFILE_SAMPLE), parse(MAPFILE_SAMPLE_NEW))
+
+    assert mapfile_diff.sections() == [Delta(".text", 0x5C, 0x60, 4)]
+
+
+def test_diff_symbols_and_objfiles():
+    mapfile_diff = MapfileDiff(parse(MAPFILE_SAMPLE), parse(MAPFILE_SAMPLE_NEW))
+
+    symbols = mapfile_diff.symbols()
+    assert symbols == [
+        Delta((".text", "/opt/lib/libc.a(lib_a-memcpy.o)", ".text"), 0x20, 0, -0x20),
+        Delta((".text", "/opt/lib/libc.a(lib_a-memset.o)", ".text"), 0, 0x20, 0x20),
+        Delta((".text", "CMakeFiles/app.dir/util.c.obj", ".text.helper"), 0xE, 0x12, 4),
+    ]
+
+    objfiles = mapfile_diff.objfiles()
+    assert [i.key for i in objfiles] == [
+        "/opt/lib/libc.a(lib_a-memcpy.o)",
+        "/opt/lib/libc.a(lib_a-memset.o)",
+        "CMakeFiles/app.dir/util.c.obj",
+    ]
+    assert objfiles[2].delta == 4
+
+
+def test_diff_identical():
+    mapfile_diff = MapfileDiff(parse(MAPFILE_SAMPLE), parse(MAPFILE_SAMPLE))
+
+    assert mapfile_diff.symbols() == []
+    assert len(mapfile_diff.symbols(include_unchanged=True)) == 13
@@ -0,0 +1,69 @@
+import io
+
+from mapfile_parser import MapfileParser
+from mapfile_generator import MapfileGenerator, parse_size, main
+from test_mapfile_parser import reference_sections
+
+
+def generate(**kwargs):
+    fp = io.StringIO()
+    stats = MapfileGenerator(**kwargs).write(fp)
+    return fp.getvalue(), stats
+
+
+def test_generator_is_deterministic():
+    first, stats = generate(placements=500, seed=3)
+    second, _ = generate(placements=500, seed=3)
+    other, _ = generate(placements=500, seed=4)
+
+    assert first == second
+    assert first != other
+    assert stats.bytes == len(first)
+
+
+def test_generated_mapfile_parses():
+    """Die Größe jeder Sektion entspricht der Summe ihrer Einträge und beide Parser liefern dasselbe Ergebnis."""
+    content, stats = generate(placements=2000, seed=1)
+
+    sections = list(MapfileParser(content).iter_sections())
+
+    assert sections == reference_sections(content)
+    assert len(sections) == stats.sections
+    assert sum(len(i[3]) for i in sections) == stats.placements
+    for name, address, size, placements in sections:
+        assert size == MapfileParser.calculate_size_of_placement_list(placements), name
+
+
+def test_generator_sections():
+    """Die Anzahl der Sektionen ist einstellbar, die Einträge verteilen sich auf alle Sektionen."""
+    for count in (1, 3, 12):
+        content, stats = generate(placements=1200, seed=2, sections=count)
+
+        sections = list(MapfileParser(content).iter_sections())
+
+        assert stats.sections == count
+        assert len(sections) == count
+        assert sections == reference_sections(content)
+        for name, address, size, placements in sections:
+            assert placements
+            assert size == MapfileParser.calculate_size_of_placement_list(placements), name
+
+
+def test_main(tmp_path, capsys):
+    """Die Parameter des Generators lassen sich über die Kommandozeile setzen."""
+    path = tmp_path / "generated.map"
+
+    main([str(path), "--size", "64K", "--seed", "7", "--sections", "8", "--loads", "3", "--fill-ratio", "0",
+          "--byte-ratio", "0", "--common-ratio", "0.5", "--cpp-ratio", "1"])
+
+    content = path.read_text()
+    assert "Wrote %i bytes, 8 sections" % len(content) in capsys.readouterr().out
+    assert content.count("\nLOAD ") == 4
+    assert " *fill* " not in content and "BYTE" not in content
+    assert " COMMON " in content and "_ZN" in content
+
+
+def test_parse_size():
+    assert parse_size("100") == 100
+    assert parse_size("1M") == 1 << 20
+    assert parse_size("1.5k") == 1536
@@ -1,5 +1,116 @@
+import io
+import bz2
+import sys
+import gzip
+import lzma
+import pytest
 from unittest.mock import patch, MagicMock, Mock
-from mapfile_parser import MapfileParser
+from mapfile_parser import (MapfileParser, MapfileBlocks, PlacementTable, AddressIndex, ParseFilter, Group,
+                            RankedPlacement, IntegrityIssue, ArchiveMember, CommonSymbol, MemoryRegion, RegionUsage,
+                            split_archive)
+from mapfile_cache import MapfileCache
+
+# Ein kleines aber vollständiges Map-File des GNU Linkers wie es in der Praxis vorkommt.
+MAPFILE_SAMPLE = """Archive member included to satisfy reference by file (symbol)
+
+/opt/lib/libc.a(lib_a-memcpy.o)
+                              CMakeFiles/app.dir/main.c.obj (memcpy)
+
+Allocating common symbols
+Common symbol       size              file
+
+g_counter           0x4               CMakeFiles/app.dir/main.c.obj
+
+Discarded input sections
+
+ .text          0x00000000        0x0 CMakeFiles/app.dir/main.c.obj
+ .text.unused_function
+                0x00000000       0x10 CMakeFiles/app.dir/util.c.obj
+
+Memory Configuration
+
+Name             Origin             Length             Attributes
+FLASH            0x08000000         0x00010000         xr
+RAM              0x20000000         0x00005000         xrw
+*default*        0x00000000         0xffffffff
+
+Linker script and memory map
+
+LOAD CMakeFiles/app.dir/main.c.obj
+LOAD CMakeFiles/app.dir/util.c.obj
+LOAD /opt/lib/libc.a
+                0x00000400                _Min_Stack_Size = 0x400
+
+.isr_vector     0x08000000       0x10
+                0x08000000                . = ALIGN (0x4)
+ *(.isr_vector)
+ .isr_vector    0x08000000       0x10 CMakeFiles/app.dir/startup.s.obj
+                0x08000000                g_pfnVectors
+                0x08000010                . = ALIGN (0x4)
+
+.text           0x08000010       0x5c
+ *(.text)
+ .text          0x08000010       0x14 CMakeFiles/app.dir/main.c.obj
+                0x08000010                main
+ .text          0x08000024       0x20 /opt/lib/libc.a(lib_a-memcpy.o)
+                0x08000024                memcpy
+ *(.text*)
+ .text._ZN7drivers4Uart5writeEPKhj
+                0x08000044       0x18 CMakeFiles/app.dir/drivers/uart.cpp.obj
+                0x08000044                drivers::Uart::write(unsigned char const*, unsigned int)
+ *fill*         0x0800005c        0x2 
+ .text.helper   0x0800005e        0xe CMakeFiles/app.dir/util.c.obj
+                0x0800005e                helper
+                0x0800006c                _etext = .
+
+.rodata         0x0800006c        0x8
+ *(.rodata*)
+ .rodata.str1.4
+                0x0800006c        0x6 CMakeFiles/app.dir/main.c.obj
+ *(.rodata.pad)
+                0x08000072        0x2 SHORT 0xaabb
+
+.data           0x20000000        0x8 load address 0x08000074
+                0x20000000                _sdata = .
+ *(.data*)
+ .data.g_config
+                0x20000000        0x8 CMakeFiles/app.dir/main.c.obj
+                0x20000000                g_config
+ .data.g_config
+                0x20000000        0x8 CMakeFiles/app.dir/main_copy.c.obj
+                0x20000008                _edata = .
+
+.bss            0x20000008       0x14
+ *(.bss*)
+ .bss           0x20000008        0x4 CMakeFiles/app.dir/util.c.obj
+ *(COMMON)
+ COMMON         0x2000000c        0x4 CMakeFiles/app.dir/main.c.obj
+                0x2000000c                g_counter
+ COMMON         0x20000010        0xc /opt/lib/libc.a(lib_a-impure.o)
+                0x20000010                _impure_data
+
+.comment        0x00000000       0x49
+ *(.comment)
+ .comment       0x00000000       0x49 CMakeFiles/app.dir/main.c.obj
+                                 0x4a (size before relaxing)
+OUTPUT(app.elf elf32-littlearm)
+LOAD linker stubs
+
+Cross Reference Table
+
+Symbol                                            File
+g_counter                                         CMakeFiles/app.dir/main.c.obj
+main                                              CMakeFiles/app.dir/main.c.obj
+memcpy                                            /opt/lib/libc.a(lib_a-memcpy.o)
+                                                  CMakeFiles/app.dir/main.c.obj
+"""
+
+
+def reference_sections(content):
+    """Ergebnis der ursprünglichen Verarbeitungskette extract_memory_map -> split_sections -> generator_sections."""
+    _, memory_map, _ = MapfileParser.extract_memory_map(None, content)
+    sections = MapfileParser.split_sections(memory_map)
+    return list(MapfileParser.generator_sections(sections))
 
 
 @patch("mapfile_parser.MapfileParser.generator_remove_reused_placements")
@@ -212,3 +323,588 @@ def test_generator_remove_reused_placements_2times():
     assert res[0] == ["sect1", 0, 10]
     assert res[1] == ["sect__", 10, 20]
     assert res[2] == ["sect3", 30, 10]
+
+
+def test_iter_sections_matches_split_sections():
+    """Der zeilenweise Parser liefert dieselben Sektionen wie split_sections auf dem gesamten String."""
+    mapfile_parser = MapfileParser(MAPFILE_SAMPLE)
+
+    result = list(mapfile_parser.iter_sections())
+
+    assert result == reference_sections(MAPFILE_SAMPLE)
+    assert [i[0] for i in result] == [".isr_vector", ".text", ".rodata", ".data", ".bss", ".comment"]
+
+
+def test_from_path(tmp_path):
+    """Ein Map-File kann direkt aus einer Datei gelesen werden."""
+    mapfile = tmp_path / "app.map"
+    mapfile.write_text(MAPFILE_SAMPLE)
+
+    from_path = MapfileParser.from_path(str(mapfile))
+    from_path.parse()
+
+    from_string = MapfileParser(MAPFILE_SAMPLE)
+    from_string.parse()
+
+    assert from_path.get_section_list() == from_string.get_section_list()
+    assert from_path.get_class_info() == from_string.get_class_info()
+
+
+def test_generator_tokenize():
+    """Der Tokenizer klassifiziert Kopfzeilen, Einträge, Folgezeilen und umgebrochene Namen."""
+    lines = [
+        "LOAD CMakeFiles/app.dir/main.c.obj\n",
+        "                0x00000400                _Min_Stack_Size = 0x400\n",
+        ".text           0x08000010       0x3a\n",
+        " *(.text*)\n",
+        " .text._ZN7drivers4Uart5writeEPKhj\n",
+        "                0x08000010       0x18 CMakeFiles/app.dir/drivers/uart.cpp.obj\n",
+        "                0x08000010                drivers::Uart::write(unsigned char const*, unsigned int)\n",
+        " *fill*         0x08000028        0x2 \n",
+        " *(.bytes)\n",
+        "                0x0800002a        0x1 BYTE 0xaa\n",
+        "OUTPUT(app.elf elf32-littlearm)\n",
+        ".ignored        0x00000000       0x10\n",
+    ]
+
+    result = list(MapfileParser.generator_tokenize(lines))
+
+    assert result == [
+        (".text", 0x08000010, 0x3A),
+        [
+            ".text._ZN7drivers4Uart5writeEPKhj",
+            0x08000010,
+            0x18,
+            "CMakeFiles/app.dir/drivers/uart.cpp.obj",
+            "0x08000010",
+            "drivers::Uart::write(unsigned char const*, unsigned int)",
+        ],
+        ["*fill*", 0x08000028, 0x2, "", "", ""],
+        ["*empty*", 0x0800002A, 0x1, "BYTE 0xaa", "", ""],
+    ]
+
+
+def test_generator_sections_from_lines():
+    """Der Tokenizer liefert aus dem Text oder den Zeilen dieselben Sektionen wie generator_sections."""
+    _, memory_map, _ = MapfileParser.extract_memory_map(None, MAPFILE_SAMPLE)
+    reference = reference_sections(MAPFILE_SAMPLE)
+
+    assert list(MapfileParser.generator_sections_from_lines(memory_map)) == reference
+    assert list(MapfileParser.generator_sections_from_lines(memory_map.splitlines(True))) == reference
+
+
+def test_generator_parallel_jobs_splits_at_placements(tmp_path):
+    """Blöcke werden nur vor dem Beginn eines Eintrags getrennt, Dateien liest der Prozess des Pools selbst."""
+    path = tmp_path / "app.map"
+    path.write_text(MAPFILE_SAMPLE)
+
+    for mapfile_parser in (MapfileParser(MAPFILE_SAMPLE), MapfileParser.from_path(str(path))):
+        sections = list(mapfile_parser._scan_sections())
+        jobs = list(mapfile_parser.generator_parallel_jobs(sections, chunk_size=1))
+
+        assert len(jobs) > len(sections)
+        assert [i[0] for i in jobs if i[0] is not None] == [i[:3] for i in sections]
+        for header, block in jobs:
+            if isinstance(block, tuple):
+                name, start, end = block
+                assert name == str(path)
+                block = MAPFILE_SAMPLE[start:end]
+            if header is None:
+                assert block[0] == " " and not block[1].isspace()
+
+
+@pytest.mark.parametrize("parse_filter", [None, ParseFilter(exclude=[".comment"], min_size=4)])
+def test_parse_parallel(tmp_path, parse_filter):
+    """Die parallele Verarbeitung liefert dasselbe Ergebnis wie die serielle, auch wenn jeder Eintrag in einem
+    eigenen Block zerlegt wird."""
+    path = tmp_path / "app.map"
+    path.write_text(MAPFILE_SAMPLE)
+    compressed = tmp_path / "app.map.gz"
+    compressed.write_bytes(gzip.compress(MAPFILE_SAMPLE.encode("utf-8")))
+
+    serial = MapfileParser(MAPFILE_SAMPLE)
+    serial.parse(parse_filter=parse_filter)
+    expected = [(name, info["address"], info["size"], list(info["placements"]), list(info["reused"]))
+                for name, info in serial._sec_dict.items()]
+
+    for parallel in (MapfileParser(MAPFILE_SAMPLE), MapfileParser.from_path(str(path)),
+                     MapfileParser.from_path(str(compressed))):
+        parallel._filter = parse_filter
+        result = parallel.iter_section_tables(workers=2, chunk_size=1, parse_filter=parse_filter)
+        assert [(i[0], i[1], i[2], list(i[3]), list(i[4])) for i in result] == expected
+        assert parallel.stats.reused_placements == serial.stats.reused_placements
+
+        parallel.parse(workers=2, parse_filter=parse_filter)
+        assert parallel.get_class_info() == serial.get_class_info()
+        assert parallel.get_blocks().cross_references == serial.get_blocks().cross_references
+
+
+def test_placement_table():
+    """Die Einträge werden spaltenweise abgelegt, Strings nur einmal und die zweite Adresse als Integer."""
+    placements = [
+        [".text", 0x10, 0x4, "main.o", "0x10", "main"],
+        ["*fill*", 0x14, 0x2, "", "", ""],
+        [".text", 0x16, 0x8, "main.o", "0x16", "helper"],
+    ]
+
+    table = PlacementTable.from_placements(placements)
+
+    assert len(table) == 3
+    assert list(table.addresses) == [0x10, 0x14, 0x16]
+    assert list(table.sizes) == [0x4, 0x2, 0x8]
+    assert table.names[0] == table.names[2]
+    assert table.objfiles[0] == table.objfiles[2]
+    assert len(table.strings) == 6
+
+    assert table[1] == ("*fill*", 0x14, 0x2, "", None, "")
+    assert table[2].address2nd == 0x16
+    assert table[2].classinfo == "helper"
+    assert MapfileParser.calculate_size_of_placement_list(table) == 14
+
+
+def test_parse_high_addresses():
+    """Adressen ab 2**63 (z.B. Kernel Adressen) werden vorzeichenlos abgelegt, auch in der nächsten Zeile."""
+    content = """Linker script and memory map
+
+.text           0xffffffff80000000       0x10
+ .text          0xffffffff80000000       0x10 init/main.o
+                0xffffffff80000000                start_kernel
+OUTPUT(vmlinux elf64-x86-64)
+"""
+    for lazy in (False, True):
+        mapfile_parser = MapfileParser(content)
+        mapfile_parser.parse(lazy=lazy)
+        assert mapfile_parser.get_section_list() == [[".text", 0xFFFFFFFF80000000, 0x10]]
+        assert list(mapfile_parser.get_placements(".text")) == [
+            (".text", 0xFFFFFFFF80000000, 0x10, "init/main.o", 0xFFFFFFFF80000000, "start_kernel")]
+        assert mapfile_parser.get_class_info()[0][0] == ""
+
+
+def test_get_class_info():
+    """Status, Klassenname und Objektdatei jedes Eintrags."""
+    mapfile_parser = MapfileParser(MAPFILE_SAMPLE)
+    mapfile_parser.parse()
+
+    class_info = mapfile_parser.get_class_info()
+
+    assert len(class_info) == 13
+    assert class_info[1] == ["", "main", 0x08000010, 0x14, ".text", "CMakeFiles/app.dir/main.c.obj", ".text"]
+    assert class_info[4] == ['"MISSING_CLASSINFO"', "", 0x0800005C, 0x2, ".text", "", "*fill*"]
+    assert class_info[8] == [
+        '"ALTERNATE_CLASSINFO"',
+        "_edata = .",
+        0x20000000,
+        0x8,
+        ".data",
+        "CMakeFiles/app.dir/main_copy.c.obj",
+        ".data.g_config",
+    ]
+
+
+def test_address_index_lookup():
+    """Adressen werden dem Eintrag zugeordnet in dem sie liegen."""
+    mapfile_parser = MapfileParser(MAPFILE_SAMPLE)
+    mapfile_parser.parse()
+    address_index = mapfile_parser.build_address_index()
+
+    symbol = address_index.lookup(0x08000046)
+    assert symbol.section == ".text"
+    assert symbol.objfile == "CMakeFiles/app.dir/drivers/uart.cpp.obj"
+    assert symbol.name == ".text._ZN7drivers4Uart5writeEPKhj"
+    assert symbol.symbol == "drivers::Uart::write(unsigned char const*, unsigned int)"
+    assert symbol.offset == 2
+
+    # Der Klassenname der Folgezeile gehört zu einer anderen Adresse
+    assert address_index.lookup(0x20000004).symbol == ""
+
+    assert address_index.lookup(0x07FFFFFF) is None
+    assert address_index.lookup(0x30000000) is None
+
+
+def test_address_index_lookup_many():
+    mapfile_parser = MapfileParser(MAPFILE_SAMPLE)
+    mapfile_parser.parse()
+    address_index = mapfile_parser.build_address_index()
+
+    result = address_index.lookup_many([0x08000010, 0x08000023, 0x08000024, 0x2000000C, -1])
+
+    assert [i.symbol if i else None for i in result] == ["main", "main", "memcpy", "g_counter", None]
+
+
+def test_address_index_find_many():
+    """find_many ordnet Adressen in Läufen zu und liefert dasselbe Ergebnis wie lookup, auch bei überlappenden
+    Einträgen, Lücken und wiederholten Adressen."""
+    placements = [
+        [".text.a", 0x100, 0x40, "a.o", "0x100", "a"],
+        [".text.b", 0x110, 0x8, "b.o", "0x110", "b"],
+        [".text.c", 0x118, 0x0, "c.o", "", ""],
+        [".text.d", 0x150, 0x10, "d.o", "0x150", "d"],
+        [".text.e", 0x158, 0x20, "e.o", "0x158", "e"],
+    ]
+    address_index = AddressIndex([(".text", PlacementTable.from_placements(placements))])
+    addresses = [0x110, 0x0, 0x177, 0x178, 0x117, 0x118, 0x13F, 0x140, 0x157, 0x158, 0x110, -1, 0x1 << 70]
+    addresses += list(range(0xF0, 0x190))
+
+    indices = address_index.find_many(addresses)
+
+    assert [address_index.entry(i)[2] if i >= 0 else None for i in indices[:4]] == [".text.b", None, ".text.e",
+                                                                                    None]
+    assert address_index.lookup_many(addresses) == [address_index.lookup(i) for i in addresses]
+    assert address_index.lookup_many([]) == []
+
+
+def test_split_archive():
+    assert split_archive("/opt/lib/libc.a(lib_a-memcpy.o)") == ("/opt/lib/libc.a", "lib_a-memcpy.o")
+    assert split_archive("CMakeFiles/app.dir/main.c.obj") == ("", "CMakeFiles/app.dir/main.c.obj")
+    assert split_archive("") == ("", "")
+
+
+def test_aggregate():
+    """Größe und Anzahl der Einträge nach Archiv, Verzeichnis und Sektion."""
+    mapfile_parser = MapfileParser(MAPFILE_SAMPLE)
+    mapfile_parser.parse()
+
+    assert mapfile_parser.aggregate("archive", sections={".text", ".bss"}) == [
+        Group("", 0x44, 6),
+        Group("/opt/lib/libc.a", 0x2C, 2),
+    ]
+    assert mapfile_parser.aggregate("directory", depth=2, top=1) == [Group("CMakeFiles/app.dir", 0xA9, 9)]
+    assert mapfile_parser.aggregate("section", top=2) == [Group(".text", 0x5C, 5), Group(".comment", 0x49, 1)]
+
+
+def test_parse_shared_strings():
+    """Alle Sektionen teilen sich eine StringTable, jede Objektdatei wird nur einmal abgelegt."""
+    mapfile_parser = MapfileParser(MAPFILE_SAMPLE)
+    mapfile_parser.parse()
+
+    tables = [table for _, table in mapfile_parser.iter_placement_tables()]
+    assert all(table.strings is mapfile_parser.strings for table in tables)
+    assert mapfile_parser.strings.strings.count("CMakeFiles/app.dir/main.c.obj") == 1
+    index = mapfile_parser.strings.index("CMakeFiles/app.dir/main.c.obj")
+    assert mapfile_parser.strings[index] == "CMakeFiles/app.dir/main.c.obj"
+    assert mapfile_parser.strings.index("missing.o") is None
+    assert mapfile_parser.get_placements(".bss")[1].objfile == "CMakeFiles/app.dir/main.c.obj"
+    assert mapfile_parser.nbytes() < sum(table.nbytes() for table in tables)
+
+    # Der Tokenizer liefert gleiche Objektdateien als dasselbe Objekt
+    tokens = [i for i in MapfileParser.generator_tokenize(MAPFILE_SAMPLE.splitlines(True)) if type(i) is list]
+    main = [i[3] for i in tokens if i[3] == "CMakeFiles/app.dir/main.c.obj"]
+    assert len(main) > 1 and all(i is main[0] for i in main)
+
+
+def test_parse_split_archives():
+    """Archiv und Member der Objektdateien als eigene Spalten."""
+    mapfile_parser = MapfileParser(MAPFILE_SAMPLE)
+    mapfile_parser.parse(split_archives=True)
+
+    table = mapfile_parser.get_placements(".text")
+    strings = table.strings
+    assert [strings[i] for i in table.archives] == ["", "/opt/lib/libc.a", "", "", ""]
+    assert strings[table.members[1]] == "lib_a-memcpy.o"
+
+    table.append(["COMMON", 0x6C, 0x4, "/opt/lib/libc.a(lib_a-errno.o)", "", ""])
+    assert strings[table.archives[-1]] == "/opt/lib/libc.a"
+    assert strings[table.members[-1]] == "lib_a-errno.o"
+
+    mapfile_parser.parse(split_archives=True)
+    assert mapfile_parser.aggregate("archive", sections={".text", ".bss"}) == [
+        Group("", 0x44, 6),
+        Group("/opt/lib/libc.a", 0x2C, 2),
+    ]
+
+
+def test_parse_stats():
+    """Zähler und Laufzeiten der Stufen, die Einträge werden ohne verbose nicht formatiert."""
+    mapfile_parser = MapfileParser(MAPFILE_SAMPLE)
+    with patch("mapfile_parser.logging.debug") as debug:
+        mapfile_parser.parse()
+    debug.assert_not_called()
+
+    stats = mapfile_parser.stats
+    assert stats.sections == len(reference_sections(MAPFILE_SAMPLE))
+    assert stats.placements == sum(len(i["placements"]) for i in mapfile_parser._sec_dict.values())
+    assert stats.bytes_read == len(MAPFILE_SAMPLE)
+    assert stats.size_mismatches == 0
+    assert set(stats.timings) == {"tokenize", "tables", "hash"}
+
+
+def test_parse_stats_from_path(tmp_path):
+    path = tmp_path / "sample.map"
+    path.write_text(MAPFILE_SAMPLE)
+
+    mapfile_parser = MapfileParser.from_path(str(path))
+    mapfile_parser.parse(verbose=True)
+    assert mapfile_parser.stats.bytes_read == path.stat().st_size
+
+
+def test_parse_lazy(tmp_path):
+    """Im lazy Modus werden nur die Kopfzeilen gelesen, die Einträge beim ersten Zugriff."""
+    path = tmp_path / "sample.map"
+    path.write_text(MAPFILE_SAMPLE)
+
+    reference = MapfileParser(MAPFILE_SAMPLE)
+    reference.parse()
+
+    for mapfile_parser in (MapfileParser(MAPFILE_SAMPLE), MapfileParser.from_path(str(path))):
+        mapfile_parser.parse(lazy=True)
+        assert mapfile_parser.get_section_list() == reference.get_section_list()
+        assert mapfile_parser.stats.placements == 0
+        assert all(i["placements"] is None for i in mapfile_parser._sec_dict.values())
+
+        assert list(mapfile_parser.get_placements(".text")) == list(reference.get_placements(".text"))
+        assert mapfile_parser._sec_dict[".data"]["placements"] is None
+
+        assert mapfile_parser.get_class_info() == reference.get_class_info()
+        assert mapfile_parser.stats.placements == reference.stats.placements
+        assert mapfile_parser.stats.size_mismatches == 0
+
+
+def test_parse_filter():
+    """Ausgeschlossene Sektionen fehlen im Ergebnis, Einträge werden nach Archiv und Größe gefiltert."""
+    parse_filter = ParseFilter(include=[".text", ".r*", ".bss"], exclude=[".bss"], archive="libc", min_size=0x10)
+
+    results = []
+    for options in ({}, {"lazy": True}, {"workers": 2}):
+        mapfile_parser = MapfileParser(MAPFILE_SAMPLE)
+        mapfile_parser.parse(parse_filter=parse_filter, **options)
+        assert [i[0] for i in mapfile_parser.get_section_list()] == [".text", ".rodata"]
+        assert mapfile_parser.stats.size_mismatches == 0
+        results.append(mapfile_parser.get_class_info())
+
+    assert results[0] == results[1] == results[2]
+    assert {(i[4], i[5]) for i in results[0]} == {(".text", "/opt/lib/libc.a(lib_a-memcpy.o)")}
+
+
+def test_parse_filter_key():
+    assert ParseFilter(exclude=[".bss"]).key() == ParseFilter(exclude=[".bss"]).key()
+    assert ParseFilter(exclude=[".bss"]).key() != ParseFilter(exclude=[".bss"], min_size=4).key()
+
+
+@pytest.mark.parametrize("compress", [gzip.compress, lzma.compress, bz2.compress])
+def test_parse_compressed(tmp_path, compress):
+    """Komprimierte Map-Files werden an den Magic Bytes erkannt und beim Lesen entpackt."""
+    path = tmp_path / "sample.map.compressed"
+    path.write_bytes(compress(MAPFILE_SAMPLE.encode("utf-8")))
+
+    reference = MapfileParser(MAPFILE_SAMPLE)
+    reference.parse()
+
+    mapfile_parser = MapfileParser.from_path(str(path))
+    mapfile_parser.parse()
+    assert mapfile_parser.get_class_info() == reference.get_class_info()
+    assert mapfile_parser.stats.bytes_read == len(MAPFILE_SAMPLE)
+
+    mapfile_parser.parse(lazy=True)
+    assert mapfile_parser.get_class_info() == reference.get_class_info()
+
+
+def test_parse_stdin(monkeypatch):
+    stdin = io.TextIOWrapper(io.BufferedReader(io.BytesIO(gzip.compress(MAPFILE_SAMPLE.encode("utf-8")))))
+    monkeypatch.setattr(sys, "stdin", stdin)
+
+    reference = MapfileParser(MAPFILE_SAMPLE)
+    reference.parse()
+
+    # Die Standardeingabe wird ohne Cache und nicht lazy gelesen
+    mapfile_parser = MapfileParser.from_path("-")
+    mapfile_parser.parse(lazy=True, cache=Mock())
+    assert mapfile_parser.get_class_info() == reference.get_class_info()
+    assert not stdin.closed
+
+
+def test_top():
+    """Die größten Einträge beim Durchlaufen des Map-Files und aus den bereits gelesenen Einträgen."""
+    streamed = MapfileParser(MAPFILE_SAMPLE)
+    parsed = MapfileParser(MAPFILE_SAMPLE)
+    parsed.parse()
+
+    result = streamed.top(2)
+    assert [(i.section, i.placement.name, i.placement.size) for i in result] == [
+        (".comment", ".comment", 0x49),
+        (".text", ".text", 0x20),
+    ]
+    assert isinstance(result[0], RankedPlacement)
+    assert result == parsed.top(2)
+
+    per_section = streamed.top(1, per_section=True)
+    assert list(per_section) == [i[0] for i in parsed.get_section_list()]
+    assert per_section == parsed.top(1, per_section=True)
+    assert per_section[".text"] == [result[1]]
+
+
+def test_top_after_parse_without_sections():
+    """Hat der Filter von parse alle Sektionen ausgeschlossen, wird das Map-File nicht erneut gelesen."""
+    mapfile_parser = MapfileParser(MAPFILE_SAMPLE)
+    mapfile_parser.parse(parse_filter=ParseFilter(include=[".missing"]))
+    blocks = mapfile_parser.blocks
+
+    with patch("mapfile_parser.MapfileParser.iter_tokens") as mock_iter_tokens:
+        assert mapfile_parser.top(3) == []
+        assert mapfile_parser.top(3, workers=2) == []
+        mock_iter_tokens.assert_not_called()
+    assert mapfile_parser.blocks is blocks
+
+
+def test_top_group_by():
+    mapfile_parser = MapfileParser(MAPFILE_SAMPLE)
+    assert mapfile_parser.top(2, group_by="archive", parse_filter=ParseFilter(include=[".text", ".bss"])) == [
+        Group("", 0x44, 6),
+        Group("/opt/lib/libc.a", 0x2C, 2),
+    ]
+
+    parsed = MapfileParser(MAPFILE_SAMPLE)
+    parsed.parse()
+    assert mapfile_parser.top(3, group_by="objfile") == parsed.aggregate("objfile", top=3)
+    assert mapfile_parser.top(3, per_section=True, group_by="objfile")[".bss"] == parsed.aggregate(
+        "objfile", top=3, sections={".bss"})
+
+
+def test_update():
+    """Nur die geänderten Sektionen werden neu zerlegt, das Ergebnis entspricht einem vollständigen Durchlauf."""
+    mapfile_parser = MapfileParser()
+    assert mapfile_parser.update(MAPFILE_SAMPLE) == [i[0] for i in reference_sections(MAPFILE_SAMPLE)]
+    bss = mapfile_parser.get_placements(".bss")
+
+    changed = MAPFILE_SAMPLE.replace(" .text.helper   0x0800005e        0xe", " .text.helper   0x0800005e        0xf")
+    assert mapfile_parser.update(changed) == [".text"]
+    assert mapfile_parser.stats.reused_sections == len(reference_sections(MAPFILE_SAMPLE)) - 1
+    assert mapfile_parser.get_placements(".bss") is bss
+
+    reference = MapfileParser(changed)
+    reference.parse()
+    assert mapfile_parser.get_class_info() == reference.get_class_info()
+    assert mapfile_parser.update(changed) == []
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_update_after_parse(tmp_path, workers):
+    """Nach parse übernimmt update die unveränderten Sektionen, auch nach dem Laden aus dem Cache."""
+    path = tmp_path / "sample.map"
+    path.write_text(MAPFILE_SAMPLE)
+    changed = MAPFILE_SAMPLE.replace(" .text.helper   0x0800005e        0xe", " .text.helper   0x0800005e        0xf")
+
+    for cache in (None, MapfileCache(str(tmp_path / "cache")), MapfileCache(str(tmp_path / "cache"))):
+        path.write_text(MAPFILE_SAMPLE)
+        mapfile_parser = MapfileParser.from_path(str(path))
+        mapfile_parser.parse(workers=workers, cache=cache)
+        bss = mapfile_parser.get_placements(".bss")
+
+        path.write_text(changed)
+        assert mapfile_parser.update() == [".text"]
+        assert mapfile_parser.get_placements(".bss") is bss
+
+        reference = MapfileParser(changed)
+        reference.parse()
+        assert mapfile_parser.get_class_info() == reference.get_class_info()
+    assert mapfile_parser.stats.reused_sections == len(reference_sections(MAPFILE_SAMPLE)) - 1
+
+
+def test_analyze_table():
+    """Lücken, Überlappungen und Füllbytes einer Sektion, die Differenz der Größe wird als size_mismatch gemeldet."""
+    table = PlacementTable.from_placements([
+        [".text.a", 0x104, 0x8, "a.o", "", ""],
+        ["*fill*", 0x10C, 0x4, "", "", ""],
+        [".text.b", 0x110, 0x10, "b.o", "", ""],
+        [".text.c", 0x118, 0x4, "c.o", "", ""],
+        [".text.d", 0x118, 0x0, "d.o", "", ""],
+    ])
+
+    assert MapfileParser.analyze_table(".text", 0x100, 0x30, table) == [
+        IntegrityIssue(".text", "size_mismatch", 0x100, 0x30 - 0x20, "", ""),
+        IntegrityIssue(".text", "gap", 0x100, 0x4, "", ""),
+        IntegrityIssue(".text", "fill", 0x10C, 0x4, "*fill*", ""),
+        IntegrityIssue(".text", "overlap", 0x118, 0x4, ".text.c", "c.o"),
+        IntegrityIssue(".text", "gap", 0x120, 0x10, "", ""),
+    ]
+
+
+def test_analyze_integrity():
+    """Die von generator_remove_reused_placements entfernten Einträge bleiben für die Analyse erhalten."""
+    mapfile_parser = MapfileParser(MAPFILE_SAMPLE)
+    mapfile_parser.parse(lazy=True)
+
+    assert mapfile_parser.analyze_integrity() == [
+        IntegrityIssue(".text", "fill", 0x0800005C, 0x2, "*fill*", ""),
+        IntegrityIssue(".data", "reused", 0x20000000, 0x8, ".data.g_config", "CMakeFiles/app.dir/main.c.obj"),
+    ]
+
+    parsed = MapfileParser(MAPFILE_SAMPLE)
+    parsed.parse()
+    assert parsed.analyze_integrity() == mapfile_parser.analyze_integrity()
+    assert list(parsed.get_reused_placements(".data")) == list(mapfile_parser.get_reused_placements(".data"))
+
+    tokens = [i for i in MapfileParser.generator_tokenize(MAPFILE_SAMPLE.splitlines(True)) if type(i) is list]
+    kept, reused = MapfileParser.split_reused_placements(tokens)
+    assert kept == list(MapfileParser.generator_remove_reused_placements(tokens))
+    assert len(kept) + len(reused) == len(tokens)
+
+
+def test_parse_blocks():
+    """Die Abschnitte vor und nach der Memory Map werden im selben Durchlauf gelesen, auch lazy und parallel."""
+    mapfile_parser = MapfileParser(MAPFILE_SAMPLE)
+    mapfile_parser.parse()
+    blocks = mapfile_parser.get_blocks()
+
+    assert blocks.archive_members == [
+        ArchiveMember("/opt/lib/libc.a(lib_a-memcpy.o)", "CMakeFiles/app.dir/main.c.obj", "memcpy")]
+    assert blocks.common_symbols == [CommonSymbol("g_counter", 0x4, "CMakeFiles/app.dir/main.c.obj")]
+    assert [(i.name, i.size) for i in blocks.discarded] == [(".text", 0x0), (".text.unused_function", 0x10)]
+    assert blocks.discarded.strings is mapfile_parser.strings
+    assert blocks.memory_regions[:2] == [
+        MemoryRegion("FLASH", 0x08000000, 0x10000, "xr"),
+        MemoryRegion("RAM", 0x20000000, 0x5000, "xrw"),
+    ]
+    assert blocks.cross_references["memcpy"] == ["/opt/lib/libc.a(lib_a-memcpy.o)", "CMakeFiles/app.dir/main.c.obj"]
+
+    for kwargs in ({"lazy": True}, {"workers": 2}):
+        other = MapfileParser(MAPFILE_SAMPLE)
+        other.parse(**kwargs)
+        assert vars(other.get_blocks()).keys() == vars(blocks).keys()
+        assert other.get_blocks().memory_regions == blocks.memory_regions
+        assert other.get_blocks().cross_references == blocks.cross_references
+        assert list(other.get_blocks().discarded) == list(blocks.discarded)
+        # Die verworfenen Einträge verwenden die StringTable der Sektionen
+        assert other.get_blocks().discarded.strings is other.strings
+
+
+def test_get_memory_regions():
+    """Die Initialwerte von .data belegen zusätzlich Flash an der Ladeadresse."""
+    mapfile_parser = MapfileParser(MAPFILE_SAMPLE)
+    mapfile_parser.parse(lazy=True)
+
+    assert mapfile_parser._sec_dict[".data"]["load_address"] == 0x08000074
+    assert mapfile_parser.get_memory_regions() == [
+        RegionUsage("FLASH", 0x08000000, 0x10000, 0x7C, 0x10000 - 0x7C, 0x7C / 0x10000),
+        RegionUsage("RAM", 0x20000000, 0x5000, 0x1C, 0x5000 - 0x1C, 0x1C / 0x5000),
+    ]
+
+
+def test_parse_partial_map():
+    """Ein Map-File ohne Überschriften wird ohne Fehler gelesen, die fehlenden Abschnitte bleiben leer."""
+    partial = MAPFILE_SAMPLE[MAPFILE_SAMPLE.index(".isr_vector") : MAPFILE_SAMPLE.index("OUTPUT(")]
+    before, memory_map, after = MapfileParser.extract_memory_map(None, partial)
+    assert (before, memory_map, after) == ("", partial, "")
+
+    reference = MapfileParser(MAPFILE_SAMPLE)
+    reference.parse()
+    for lazy in (False, True):
+        mapfile_parser = MapfileParser(partial)
+        mapfile_parser.parse(lazy=lazy)
+        assert mapfile_parser.get_section_list() == reference.get_section_list()
+        assert mapfile_parser.get_class_info() == reference.get_class_info()
+        assert mapfile_parser.get_memory_regions() == []
+
+
+    # Mit den Abschnitten vor der Memory Map aber ohne deren Überschrift, die Memory Map beginnt mit der Kopfzeile
+    # einer Sektion oder einer LOAD Zeile
+    preamble = MAPFILE_SAMPLE[: MAPFILE_SAMPLE.index("Linker script and memory map")]
+    for start in (".isr_vector", "LOAD "):
+        partial = preamble + MAPFILE_SAMPLE[MAPFILE_SAMPLE.index(start) :]
+        for lazy in (False, True):
+            mapfile_parser = MapfileParser(partial)
+            mapfile_parser.parse(lazy=lazy)
+            assert mapfile_parser.get_section_list() == reference.get_section_list()
+            assert mapfile_parser.get_class_info() == reference.get_class_info()
+            assert mapfile_parser.get_memory_regions() == reference.get_memory_regions()
+            assert mapfile_parser.get_memory_regions() != []
+            assert mapfile_parser.get_blocks().common_symbols == reference.get_blocks().common_symbols
@@ -0,0 +1,68 @@
+import io
+import pytest
+
+from mapfile_parser import MapfileParser, ParseFilter
+from mapfile_parser_cli import IGNORE_SECTIONS, expand_paths, main, watch, write_batch, write_memory_regions
+from mapfile_writers import read_binary
+from test_mapfile_parser import MAPFILE_SAMPLE
+
+
+def test_expand_paths(tmp_path):
+    for name in ("b.map", "a.map", "c.txt"):
+        (tmp_path / name).write_text("")
+
+    paths = expand_paths([str(tmp_path / "*.map"), "missing.map"])
+    assert paths == [str(tmp_path / "a.map"), str(tmp_path / "b.map"), "missing.map"]
+
+
+def test_write_batch(tmp_path):
+    """Die Reports werden mit dem Pfad markiert, fehlerhafte Map-Files übersprungen."""
+    paths = []
+    for name in ("a.map", "b.map"):
+        path = tmp_path / name
+        path.write_text(MAPFILE_SAMPLE)
+        paths.append(str(path))
+    paths.append(str(tmp_path / "missing.map"))
+
+    outfile = io.StringIO()
+    failed = write_batch(paths, "sections", outfile, workers=2, parse_filter=ParseFilter(exclude=IGNORE_SECTIONS))
+    assert failed == [str(tmp_path / "missing.map")]
+
+    section_list = MapfileParser(MAPFILE_SAMPLE)
+    section_list.parse()
+    expected = ["%s;%s;%i;%i" % (path, *section) for path in paths[:2]
+                for section in section_list.get_section_list(IGNORE_SECTIONS)]
+    assert sorted(outfile.getvalue().splitlines()) == sorted(expected)
+
+
+def test_watch(tmp_path):
+    path = tmp_path / "app.map"
+    path.write_text(MAPFILE_SAMPLE)
+
+    # Die erste Periode stellt fest dass die Datei vollständig ist, die zweite liest sie ein
+    outfile = io.StringIO()
+    watch(str(path), outfile, "csv", interval=0, parse_filter=ParseFilter(include=[".text"]), iterations=2)
+    assert outfile.getvalue() == "section,address,size\n.text,134217744,92\n"
+
+
+def test_watch_binary(tmp_path, capsys):
+    """Die Binärdatei hätte bei jeder Änderung einen neuen Kopf, das Format wird deshalb abgelehnt."""
+    path = tmp_path / "app.map"
+    path.write_text(MAPFILE_SAMPLE)
+    with pytest.raises(SystemExit):
+        main(["watch", str(path), "-f", "binary"])
+    assert "watch mode does not support the binary format" in capsys.readouterr().err
+
+
+def test_write_memory_regions_overfull():
+    """Ein überfüllter Speicherbereich hat einen negativen freien Speicher, auch im Binärformat."""
+    content = MAPFILE_SAMPLE.replace("RAM              0x20000000         0x00005000",
+                                     "RAM              0x20000000         0x00000010")
+    mapfile_parser = MapfileParser(content)
+    mapfile_parser.parse(lazy=True)
+
+    outfile = io.TextIOWrapper(io.BytesIO())
+    write_memory_regions(mapfile_parser, outfile, "binary")
+    result = list(read_binary(io.BytesIO(outfile.buffer.getvalue())))
+    assert result[0] == ["region", "origin", "length", "used", "free", "used_percent"]
+    assert result[2] == ["RAM", 0x20000000, 0x10, 0x1C, -0xC, "175.00"]
@@ -0,0 +1,104 @@
+import os
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from mapfile_server import MapfileStore, create_server
+from test_mapfile_parser import MAPFILE_SAMPLE
+from test_mapfile_diff import MAPFILE_SAMPLE_NEW
+
+
+@pytest.fixture
+def server(tmp_path):
+    (tmp_path / "app.map").write_text(MAPFILE_SAMPLE)
+    server = create_server(MapfileStore(str(tmp_path)), port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def query(server, path):
+    url = "http://127.0.0.1:%i%s" % (server.server_address[1], path)
+    try:
+        with urllib.request.urlopen(url) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as error:
+        return error.code, json.loads(error.read())
+
+
+def test_server_queries(server):
+    status, sections = query(server, "/sections?map=app.map")
+    assert status == 200
+    assert sections[1] == {"section": ".text", "address": 0x08000010, "size": 0x5C}
+
+    status, symbols = query(server, "/lookup?map=app.map&address=0x08000024&address=0x30000000")
+    assert symbols[0]["symbol"] == "memcpy"
+    assert symbols[1] is None
+
+    status, top = query(server, "/top?map=app.map&n=1")
+    assert [(i["section"], i["size"]) for i in top] == [(".comment", 0x49)]
+
+    status, summary = query(server, "/summary?map=app.map&group_by=archive&section=.text&section=.bss")
+    assert summary == [{"key": "", "size": 0x44, "count": 6}, {"key": "/opt/lib/libc.a", "size": 0x2C, "count": 2}]
+
+    status, memory = query(server, "/memory?map=app.map")
+    assert [(i["name"], i["used"]) for i in memory] == [("FLASH", 0x7C), ("RAM", 0x1C)]
+
+    # Das Map-File wurde nur einmal eingelesen
+    assert query(server, "/stats")[1]["loads"] == 1
+
+
+def test_server_errors(server):
+    assert query(server, "/sections?map=missing.map")[0] == 404
+    assert query(server, "/sections?map=../outside.map")[0] == 403
+    assert query(server, "/sections")[0] == 400
+    assert query(server, "/unknown")[0] == 404
+
+
+def test_store_reload_and_evict(tmp_path):
+    path = tmp_path / "app.map"
+    path.write_text(MAPFILE_SAMPLE)
+    (tmp_path / "other.map").write_text(MAPFILE_SAMPLE)
+
+    store = MapfileStore(str(tmp_path), max_bytes=1)
+    assert store.get("app.map") is store.get("app.map")
+
+    # Eine geänderte Datei wird neu eingelesen
+    path.write_text(MAPFILE_SAMPLE_NEW)
+    os.utime(path, ns=(0, 0))
+    assert store.get("app.map").parser.get_section_list()[1][2] == 0x60
+    assert store.loads == 2
+
+    # Nur das zuletzt verwendete Map-File bleibt bei einer zu kleinen Grenze im Speicher
+    store.get("other.map")
+    assert store.stats()["mapfiles"] == [str(tmp_path / "other.map")]
+
+
+def test_store_counts_address_index(tmp_path):
+    """Der AddressIndex zählt nach dem Aufbau zum Speicherbedarf und kann andere Map-Files verdrängen."""
+    (tmp_path / "app.map").write_text(MAPFILE_SAMPLE)
+    (tmp_path / "other.map").write_text(MAPFILE_SAMPLE)
+
+    entry = MapfileStore(str(tmp_path)).get("app.map")
+    assert entry.nbytes == entry.parser.nbytes()
+    assert entry.nbytes > entry.parser.blocks.nbytes() > 0
+    index_nbytes = entry.parser.build_address_index().nbytes()
+
+    store = MapfileStore(str(tmp_path), max_bytes=2 * entry.nbytes + index_nbytes - 1)
+    app = store.get("app.map")
+    store.get("other.map")
+    assert store.stats()["bytes"] == 2 * entry.nbytes
+
+    address_index = store.address_index(app)
+    assert store.address_index(app) is address_index
+    assert address_index.nbytes() == index_nbytes
+    assert store.stats()["mapfiles"] == [str(tmp_path / "other.map")]
+
+    other = store.get("other.map")
+    store.address_index(other)
+    assert store.stats()["bytes"] == entry.nbytes + index_nbytes
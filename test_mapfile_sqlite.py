@@ -0,0 +1,32 @@
+import pytest
+
+from mapfile_sqlite import MapfileDatabase
+from test_mapfile_parser import MAPFILE_SAMPLE
+from test_mapfile_diff import MAPFILE_SAMPLE_NEW, parse
+
+
+def test_export(tmp_path):
+    """Zwei Builds teilen sich die Namen der Symbole und Objektdateien, die Einträge bleiben getrennt."""
+    old, new = parse(MAPFILE_SAMPLE), parse(MAPFILE_SAMPLE_NEW)
+    with MapfileDatabase(str(tmp_path / "builds.db")) as database:
+        assert database.export("1", old) == len(old.get_class_info())
+        database.export("2", new)
+        assert database.builds() == ["1", "2"]
+
+        # Bereits exportierte Builds werden nicht verändert
+        with pytest.raises(ValueError):
+            database.export("1", new)
+
+        connection = database.connection
+        rows = connection.execute(
+            "SELECT build_id, size FROM placements_view WHERE symbol = '.text.helper' ORDER BY build_id").fetchall()
+        assert rows == [("1", 0xE), ("2", 0x12)]
+
+        rows = connection.execute("SELECT section, objfile, address, symbol, classinfo FROM placements_view "
+                                  "WHERE build_id = '1' ORDER BY address, symbol").fetchall()
+        expected = sorted((section, i.objfile, i.address, i.name, i.classinfo)
+                          for section, table in old.iter_placement_tables() for i in table)
+        assert sorted(rows) == expected
+
+        assert connection.execute("SELECT COUNT(*) FROM symbols WHERE name = '.text.helper'").fetchone() == (1,)
+        assert connection.execute("SELECT COUNT(*) FROM builds").fetchone() == (2,)
@@ -0,0 +1,69 @@
+import io
+import csv
+import json
+
+from mapfile_parser import MapfileParser
+from mapfile_writers import WRITERS, BinaryWriter, read_binary
+from test_mapfile_parser import MAPFILE_SAMPLE
+
+
+def class_info():
+    mapfile_parser = MapfileParser(MAPFILE_SAMPLE)
+    mapfile_parser.parse()
+    return mapfile_parser.get_class_info()
+
+
+def write(output_format, rows, fp, batch_size=4):
+    writer = WRITERS[output_format](fp, MapfileParser.CLASS_INFO_COLUMNS, batch_size)
+    writer.write_rows(iter(rows))
+    writer.close()
+    return fp.getvalue()
+
+
+def test_text_writer():
+    rows = class_info()
+    assert write("text", rows, io.StringIO()) == "".join(";".join(str(x) for x in i) + "\n" for i in rows)
+
+
+def test_csv_and_jsonl_writer():
+    rows = class_info()
+
+    result = list(csv.reader(io.StringIO(write("csv", rows, io.StringIO()))))
+    assert result[0] == MapfileParser.CLASS_INFO_COLUMNS
+    assert result[1:] == [[str(x) for x in i] for i in rows]
+
+    result = [json.loads(i) for i in write("jsonl", rows, io.StringIO()).splitlines()]
+    assert result == [dict(zip(MapfileParser.CLASS_INFO_COLUMNS, i)) for i in rows]
+
+
+def test_binary_writer():
+    """Die Zeilen lassen sich aus dem Binärformat über mehrere Blöcke hinweg wieder lesen."""
+    rows = class_info()
+    data = write("binary", rows, io.BytesIO())
+
+    result = list(read_binary(io.BytesIO(data)))
+    assert result[0] == MapfileParser.CLASS_INFO_COLUMNS
+    assert result[1:] == rows
+
+    # Ohne Zeilen entsteht eine Datei die nur aus dem Kopf besteht
+    data = write("binary", [], io.BytesIO())
+    assert data.startswith(BinaryWriter.MAGIC)
+    assert list(read_binary(io.BytesIO(data))) == [MapfileParser.CLASS_INFO_COLUMNS]
+
+
+def test_binary_writer_signed():
+    """Negative Werte (z.B. size_mismatch) und Adressen ab 2**63 bleiben im Binärformat erhalten."""
+    rows = [
+        ["size_mismatch", "size_mismatch", 0xFFFFFFFF80000000, -0x10, "", ""],
+        ["gap", "gap", 0xFFFFFFFF80000010, 0x4, "", ""],
+        ["overlap", "overlap", 0x20000000, 0x8, ".data.g_config", "main.o"],
+    ]
+    for batch_size in (1, 4):
+        fp = io.BytesIO()
+        writer = WRITERS["binary"](fp, MapfileParser.INTEGRITY_COLUMNS, batch_size)
+        writer.write_rows(iter(rows))
+        writer.close()
+
+        result = list(read_binary(io.BytesIO(fp.getvalue())))
+        assert result[0] == MapfileParser.INTEGRITY_COLUMNS
+        assert result[1:] == rows